@@ -0,0 +1,85 @@
+"""
+Live Activity Tail
+Admin activity events appended by the write paths to `activity_events`, a
+small capped collection shared by every worker process, so the admin screen
+can poll for what is new with one indexed query.
+
+Events are ordered by (timestamp, _id). Pollers pass back the `cursor` of
+the last event they saw; since the key is the same in every process, a
+cursor stays valid whichever worker answers the next poll.
+"""
+
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+import logging
+
+from bson import ObjectId
+from bson.errors import InvalidId
+from pymongo.errors import CollectionInvalid
+
+logger = logging.getLogger(__name__)
+
+LIVE_TAIL_SIZE = 500
+# Byte cap of the collection; LIVE_TAIL_SIZE is normally reached first
+LIVE_TAIL_BYTES = 1024 * 1024
+
+COLLECTION = "activity_events"
+
+
+def _cursor(event: Dict[str, Any]) -> str:
+    return f"{event['timestamp'].isoformat()}_{event['_id']}"
+
+
+def parse_cursor(cursor: str) -> Tuple[datetime, ObjectId]:
+    """(timestamp, _id) of a cursor returned by the tail; ValueError when malformed"""
+    timestamp, _, event_id = cursor.rpartition("_")
+    try:
+        return datetime.fromisoformat(timestamp), ObjectId(event_id)
+    except InvalidId as e:
+        raise ValueError(str(e))
+
+
+class ActivityTail:
+    def __init__(self, size: int = LIVE_TAIL_SIZE):
+        self.size = size
+
+    async def start(self, db):
+        """Create the capped collection; must run before the index sync creates it as a plain one"""
+        try:
+            await db.create_collection(COLLECTION, capped=True, size=LIVE_TAIL_BYTES, max=self.size)
+        except CollectionInvalid:
+            pass  # created by an earlier start or another worker
+
+    async def record(self, db, kind: str, **fields: Any):
+        """Append an event; failures are logged, never raised into the write path"""
+        try:
+            await db[COLLECTION].insert_one({"type": kind, "timestamp": datetime.utcnow(), **fields})
+        except Exception as e:
+            logger.error(f"Activity tail write error: {e}")
+
+    async def since(self, db, cursor: Optional[str] = None, limit: int = 100) -> List[Dict[str, Any]]:
+        """Events after `cursor`, oldest first; the latest `limit` ones without a cursor"""
+        collection = db[COLLECTION]
+        if cursor:
+            timestamp, event_id = parse_cursor(cursor)
+            # one range scan on the (timestamp, _id) index, minus the ties already seen
+            query = {"timestamp": {"$gte": timestamp}, "$nor": [{"timestamp": timestamp, "_id": {"$lte": event_id}}]}
+            docs = await collection.find(query).sort([("timestamp", 1), ("_id", 1)]).limit(limit).to_list(limit)
+        else:
+            docs = await collection.find().sort([("timestamp", -1), ("_id", -1)]).limit(limit).to_list(limit)
+            docs.reverse()
+        return [self._event(doc) for doc in docs]
+
+    async def last_cursor(self, db) -> Optional[str]:
+        latest = await db[COLLECTION].find_one({}, {"timestamp": 1}, sort=[("timestamp", -1), ("_id", -1)])
+        return _cursor(latest) if latest else None
+
+    @staticmethod
+    def _event(doc: Dict[str, Any]) -> Dict[str, Any]:
+        cursor = _cursor(doc)
+        doc.pop("_id")
+        return {**doc, "cursor": cursor, "timestamp": doc["timestamp"].isoformat()}
+
+
+# Singleton instance
+activity_tail = ActivityTail()
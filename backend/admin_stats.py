@@ -0,0 +1,118 @@
+"""
+Admin Dashboard Stats
+One $facet aggregation per collection, run concurrently, behind a short-lived
+in-process snapshot kept warm by a background refresher while the admin
+dashboard is in use
+"""
+
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional
+import asyncio
+import logging
+import time
+
+from person_cleanup import on_person_deleted
+
+logger = logging.getLogger(__name__)
+
+# Snapshot served without recomputation for this long
+SNAPSHOT_TTL_SECONDS = 30
+# Refresher keeps running this long after the last read
+REFRESHER_IDLE_SECONDS = 300
+
+
+async def compute_admin_stats(db) -> Dict[str, Any]:
+    yesterday = datetime.utcnow() - timedelta(days=1)
+
+    persons_pipeline = [
+        {"$facet": {
+            "totals": [{"$group": {
+                "_id": None,
+                "total_people": {"$sum": 1},
+                "total_votes": {"$sum": "$total_votes"},
+                "total_likes": {"$sum": "$likes"},
+                "total_dislikes": {"$sum": "$dislikes"},
+            }}],
+            "new_24h": [{"$match": {"created_at": {"$gte": yesterday}}}, {"$count": "n"}],
+        }},
+    ]
+    credits_pipeline = [
+        {"$match": {"timestamp": {"$gte": yesterday}}},
+        {"$facet": {
+            "active_users": [{"$group": {"_id": "$user_id"}}, {"$count": "n"}],
+            "revenue": [
+                {"$match": {"type": "purchase"}},
+                {"$group": {"_id": None, "revenue": {"$sum": "$price"}, "purchases": {"$sum": 1}}},
+            ],
+        }},
+    ]
+
+    persons_rows, credits_rows = await asyncio.gather(
+        db.persons.aggregate(persons_pipeline).to_list(1),
+        db.credit_transactions.aggregate(credits_pipeline).to_list(1),
+    )
+    persons = persons_rows[0] if persons_rows else {}
+    credits = credits_rows[0] if credits_rows else {}
+
+    totals = (persons.get("totals") or [{}])[0]
+    new_24h = (persons.get("new_24h") or [{}])[0]
+    active = (credits.get("active_users") or [{}])[0]
+    revenue = (credits.get("revenue") or [{}])[0]
+
+    return {
+        "total_people": totals.get("total_people", 0),
+        "total_votes": totals.get("total_votes", 0),
+        "active_users_24h": active.get("n", 0),
+        "revenue_24h": f"{float(revenue.get('revenue', 0.0) or 0.0):.2f}",
+        "new_people_24h": new_24h.get("n", 0),
+    }
+
+
+class AdminStatsCache:
+    def __init__(self, ttl_seconds: float = SNAPSHOT_TTL_SECONDS):
+        self.ttl = ttl_seconds
+        self._snapshot: Optional[Dict[str, Any]] = None
+        self._computed_at = 0.0
+        self._last_read = 0.0
+        self._lock = asyncio.Lock()
+        self._refresher: Optional[asyncio.Task] = None
+
+    def invalidate(self, *_args):
+        self._computed_at = 0.0
+
+    async def get(self, db) -> Dict[str, Any]:
+        """Return the snapshot, recomputing it (once, for all waiters) when expired"""
+        self._last_read = time.monotonic()
+        self._ensure_refresher(db)
+        if self._snapshot is None or time.monotonic() - self._computed_at > self.ttl:
+            async with self._lock:
+                if self._snapshot is None or time.monotonic() - self._computed_at > self.ttl:
+                    await self._refresh(db)
+        return self._snapshot
+
+    async def _refresh(self, db):
+        self._snapshot = await compute_admin_stats(db)
+        self._computed_at = time.monotonic()
+
+    def _ensure_refresher(self, db):
+        if self._refresher is None or self._refresher.done():
+            self._refresher = asyncio.create_task(self._refresh_loop(db))
+
+    async def _refresh_loop(self, db):
+        """Recompute ahead of expiry so reads never wait, until the dashboard goes idle"""
+        while time.monotonic() - self._last_read < REFRESHER_IDLE_SECONDS:
+            await asyncio.sleep(self.ttl / 2)
+            try:
+                async with self._lock:
+                    await self._refresh(db)
+            except Exception as e:
+                logger.error(f"Admin stats refresh error: {e}")
+
+    def shutdown(self):
+        if self._refresher:
+            self._refresher.cancel()
+
+
+# Singleton instance
+admin_stats_cache = AdminStatsCache()
+on_person_deleted(admin_stats_cache.invalidate)
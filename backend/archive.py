@@ -0,0 +1,211 @@
+"""
+Columnar Archive of Vote and Tick History
+Exports closed daily partitions of `vote_events` and `person_ticks` to
+Parquet files on local disk, and reads ranges back for offline analysis
+
+Usage:
+    python archive.py export [--collection person_ticks] [--max-days 30]
+    python archive.py read person_ticks 2025-01-01 2025-01-31
+"""
+
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+import argparse
+import asyncio
+import logging
+import os
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_DIR = Path(os.getenv("ARCHIVE_DIR", str(Path(__file__).parent / "archive")))
+EXPORT_BATCH_SIZE = 10000
+
+# Arrow schema per archived collection; ObjectIds are stored as hex strings
+SCHEMAS = {
+    "person_ticks": pa.schema([
+        ("person_id", pa.string()),
+        ("score", pa.float64()),
+        ("created_at", pa.timestamp("ms")),
+    ]),
+    "vote_events": pa.schema([
+        ("person_id", pa.string()),
+        ("device_id", pa.string()),
+        ("delta", pa.int32()),
+        ("created_at", pa.timestamp("ms")),
+    ]),
+}
+
+
+def partition_path(collection: str, day: datetime, root: Optional[Path] = None) -> Path:
+    return (root or ARCHIVE_DIR) / collection / f"date={day:%Y-%m-%d}" / "part.parquet"
+
+
+def _to_record_batch(collection: str, docs: List[Dict[str, Any]]) -> pa.RecordBatch:
+    schema = SCHEMAS[collection]
+    columns = {}
+    for field in schema:
+        values = [d.get(field.name) for d in docs]
+        if field.name in ("person_id", "device_id"):
+            values = [str(v) if v is not None else None for v in values]
+        columns[field.name] = values
+    return pa.RecordBatch.from_pydict(columns, schema=schema)
+
+
+def _write_batch(writer: pq.ParquetWriter, collection: str, docs: List[Dict[str, Any]]):
+    writer.write_batch(_to_record_batch(collection, docs))
+
+
+async def export_partition(db, collection: str, day: datetime, root: Optional[Path] = None) -> int:
+    """
+    Stream one UTC day of a collection into a Parquet file
+
+    Documents are read with a batched cursor and written batch by batch, so
+    memory stays bounded whatever the partition size. The file is written
+    under a temporary name and renamed, so readers never see a partial file.
+    Returns the number of rows written.
+    """
+    schema = SCHEMAS[collection]
+    path = partition_path(collection, day, root)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(".tmp")
+
+    cursor = db[collection].find(
+        {"created_at": {"$gte": day, "$lt": day + timedelta(days=1)}},
+        {name: 1 for name in schema.names} | {"_id": 0},
+    ).sort("created_at", 1).batch_size(EXPORT_BATCH_SIZE)
+
+    rows = 0
+    batch: List[Dict[str, Any]] = []
+    # Arrow conversion, zstd compression and file writes run in a thread so
+    # the event loop keeps serving requests while the scheduler exports
+    writer = await asyncio.to_thread(pq.ParquetWriter, tmp, schema, compression="zstd")
+    try:
+        async for doc in cursor:
+            batch.append(doc)
+            if len(batch) >= EXPORT_BATCH_SIZE:
+                await asyncio.to_thread(_write_batch, writer, collection, batch)
+                rows += len(batch)
+                batch = []
+        if batch:
+            await asyncio.to_thread(_write_batch, writer, collection, batch)
+            rows += len(batch)
+    finally:
+        await asyncio.to_thread(writer.close)
+    os.replace(tmp, path)
+    return rows
+
+
+async def export_closed_partitions(
+    db, collection: str, max_days: int = 30, root: Optional[Path] = None
+) -> Dict[str, int]:
+    """
+    Export every closed (before today UTC) day not yet on disk
+
+    Starts from the oldest document still in the collection and handles at
+    most `max_days` partitions per call. Returns {day: rows}.
+    """
+    oldest = await db[collection].find({}, {"created_at": 1}).sort("created_at", 1).limit(1).to_list(1)
+    if not oldest:
+        return {}
+
+    today = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+    day = oldest[0]["created_at"].replace(hour=0, minute=0, second=0, microsecond=0)
+    exported: Dict[str, int] = {}
+    while day < today and len(exported) < max_days:
+        if not partition_path(collection, day, root).exists():
+            rows = await export_partition(db, collection, day, root)
+            exported[f"{day:%Y-%m-%d}"] = rows
+            logger.info(f"📦 Archived {collection} {day:%Y-%m-%d}: {rows} rows")
+        day += timedelta(days=1)
+    return exported
+
+
+async def run_archive_export(db) -> Dict[str, Dict[str, int]]:
+    """Automated task: archive closed partitions of every archived collection"""
+    results = {}
+    for collection in SCHEMAS:
+        try:
+            results[collection] = await export_closed_partitions(db, collection)
+        except Exception as e:
+            logger.error(f"❌ Archive export failed for {collection}: {e}")
+    return results
+
+
+def load_range(
+    collection: str,
+    start: datetime,
+    end: datetime,
+    columns: Optional[List[str]] = None,
+    root: Optional[Path] = None,
+) -> pd.DataFrame:
+    """
+    Load archived rows with start <= created_at < end as a DataFrame
+
+    Only the partitions overlapping the range are opened, with memory
+    mapping, and only the requested columns are read.
+    """
+    schema = SCHEMAS[collection]
+    read_columns = list(dict.fromkeys((columns or schema.names) + ["created_at"]))
+    tables = []
+    day = start.replace(hour=0, minute=0, second=0, microsecond=0)
+    while day < end:
+        path = partition_path(collection, day, root)
+        if path.exists():
+            tables.append(pq.read_table(path, columns=read_columns, memory_map=True))
+        day += timedelta(days=1)
+
+    if not tables:
+        return pd.DataFrame({name: pd.Series(dtype=schema.field(name).type.to_pandas_dtype()) for name in read_columns})
+
+    df = pa.concat_tables(tables).to_pandas()
+    df = df[(df["created_at"] >= start) & (df["created_at"] < end)].reset_index(drop=True)
+    return df[columns] if columns else df
+
+
+def main():
+    from dotenv import load_dotenv
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    parser = argparse.ArgumentParser(description="Parquet archive of vote and tick history")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    export = sub.add_parser("export", help="export closed daily partitions from MongoDB")
+    export.add_argument("--collection", choices=list(SCHEMAS), action="append")
+    export.add_argument("--max-days", type=int, default=30)
+
+    read = sub.add_parser("read", help="summarize an archived range")
+    read.add_argument("collection", choices=list(SCHEMAS))
+    read.add_argument("start", type=datetime.fromisoformat)
+    read.add_argument("end", type=datetime.fromisoformat)
+
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+    if args.command == "read":
+        df = load_range(args.collection, args.start, args.end)
+        print(f"{len(df)} rows")
+        print(df.describe(include="all"))
+        return
+
+    load_dotenv(Path(__file__).parent / '.env')
+    client = AsyncIOMotorClient(os.environ['MONGO_URL'])
+    db = client[os.environ['DB_NAME']]
+
+    async def run():
+        for collection in args.collection or list(SCHEMAS):
+            exported = await export_closed_partitions(db, collection, args.max_days)
+            print(f"{collection}: {len(exported)} partitions, {sum(exported.values())} rows")
+
+    try:
+        asyncio.run(run())
+    finally:
+        client.close()
+
+
+if __name__ == "__main__":
+    main()
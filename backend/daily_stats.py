@@ -0,0 +1,164 @@
+"""
+Daily Stats Materializer
+Computes the report metrics in one concurrent pass over the canonical
+collections and stores them as documents in `daily_stats`:
+  - "rolling": the last 24h, refreshed every few minutes
+  - "YYYY-MM-DD": one per UTC calendar day, for historical charts
+"""
+
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+ROLLING_ID = "rolling"
+# Rolling stats older than this are recomputed on read
+ROLLING_MAX_AGE = timedelta(minutes=15)
+
+
+async def _first(cursor) -> Dict[str, Any]:
+    rows = await cursor.to_list(length=1)
+    return rows[0] if rows else {}
+
+
+def _count(facet: Dict[str, Any], name: str) -> int:
+    rows = facet.get(name) or []
+    return rows[0]["n"] if rows else 0
+
+
+async def compute_stats(db, start: datetime, end: datetime) -> Dict[str, Any]:
+    """All report metrics for [start, end): one $facet per collection, run concurrently"""
+    window = {"$gte": start, "$lt": end}
+
+    persons_pipeline = [
+        {"$facet": {
+            "total": [{"$match": {"created_at": {"$lt": end}}}, {"$count": "n"}],
+            "new": [{"$match": {"created_at": window}}, {"$count": "n"}],
+        }},
+    ]
+    events_pipeline = [
+        {"$match": {"created_at": window}},
+        {"$facet": {
+            "votes": [{"$count": "n"}],
+            "active": [{"$group": {"_id": "$device_id"}}, {"$count": "n"}],
+            "top": [
+                {"$group": {"_id": "$person_id", "votes_count": {"$sum": 1}}},
+                {"$sort": {"votes_count": -1}},
+                {"$limit": 5},
+                {"$lookup": {
+                    "from": "persons",
+                    "localField": "_id",
+                    "foreignField": "_id",
+                    "pipeline": [{"$project": {"name": 1, "score": 1}}],
+                    "as": "person",
+                }},
+                {"$unwind": "$person"},
+            ],
+        }},
+    ]
+    credits_pipeline = [
+        {"$match": {"timestamp": window}},
+        {"$facet": {
+            "purchases": [
+                {"$match": {"type": "purchase"}},
+                {"$group": {"_id": None, "credits": {"$sum": "$amount"}, "revenue": {"$sum": "$price"}}},
+            ],
+            "uses": [{"$match": {"type": "use"}}, {"$count": "n"}],
+        }},
+    ]
+
+    persons, events, credits = await asyncio.gather(
+        _first(db.persons.aggregate(persons_pipeline)),
+        _first(db.vote_events.aggregate(events_pipeline)),
+        _first(db.credit_transactions.aggregate(credits_pipeline)),
+    )
+
+    purchases = (credits.get("purchases") or [{}])[0]
+    return {
+        "total_people": _count(persons, "total"),
+        "new_people_24h": _count(persons, "new"),
+        "votes_24h": _count(events, "votes"),
+        "active_users_24h": _count(events, "active"),
+        "credits_sold_24h": purchases.get("credits", 0),
+        "revenue_24h": float(purchases.get("revenue", 0.0) or 0.0),
+        "premium_votes_24h": _count(credits, "uses"),
+        "top_people": [
+            {
+                "name": item["person"].get("name", "Unknown"),
+                "votes_24h": item["votes_count"],
+                "score": int(item["person"].get("score", 0)),
+            }
+            for item in events.get("top", [])
+        ],
+    }
+
+
+async def materialize_rolling(db) -> Dict[str, Any]:
+    """Recompute and store the last-24h stats"""
+    now = datetime.utcnow()
+    stats = await compute_stats(db, now - timedelta(days=1), now)
+    doc = {**stats, "start": now - timedelta(days=1), "end": now, "computed_at": now}
+    await db.daily_stats.replace_one({"_id": ROLLING_ID}, doc, upsert=True)
+    return doc
+
+
+async def materialize_day(db, day: datetime) -> Dict[str, Any]:
+    """Recompute and store stats for one UTC calendar day"""
+    start = day.replace(hour=0, minute=0, second=0, microsecond=0)
+    end = start + timedelta(days=1)
+    now = datetime.utcnow()
+    stats = await compute_stats(db, start, min(end, now))
+    doc = {**stats, "day": start, "start": start, "end": end, "computed_at": now, "final": now >= end}
+    await db.daily_stats.replace_one({"_id": f"{start:%Y-%m-%d}"}, doc, upsert=True)
+    return doc
+
+
+async def refresh_daily_stats(db):
+    """
+    Automated task: refresh rolling stats, today's partial day and, until it
+    has been finalized, yesterday
+    """
+    try:
+        now = datetime.utcnow()
+        yesterday = now - timedelta(days=1)
+        done = await db.daily_stats.find_one({"_id": f"{yesterday:%Y-%m-%d}", "final": True}, {"_id": 1})
+        tasks = [materialize_rolling(db), materialize_day(db, now)]
+        if not done:
+            tasks.append(materialize_day(db, yesterday))
+        await asyncio.gather(*tasks)
+        logger.info("📊 Daily stats materialized")
+    except Exception as e:
+        logger.error(f"❌ Error materializing daily stats: {e}")
+
+
+async def get_rolling_stats(db, max_age: timedelta = ROLLING_MAX_AGE) -> Dict[str, Any]:
+    """Read the precomputed last-24h stats, recomputing them if missing or stale"""
+    doc = await db.daily_stats.find_one({"_id": ROLLING_ID})
+    if not doc or datetime.utcnow() - doc["computed_at"] > max_age:
+        doc = await materialize_rolling(db)
+    return doc
+
+
+async def get_history(db, days: int = 30) -> List[Dict[str, Any]]:
+    """Per-day stats for the last `days` days, oldest first"""
+    since = datetime.utcnow() - timedelta(days=days)
+    return await db.daily_stats.find(
+        {"day": {"$gte": since.replace(hour=0, minute=0, second=0, microsecond=0)}}
+    ).sort("day", 1).to_list(length=days + 1)
+
+
+def stats_to_report(doc: Dict[str, Any], date: Optional[datetime] = None) -> Dict[str, Any]:
+    """Shape a stats document like the /api/reports payload"""
+    return {
+        "date": (date or doc.get("day") or doc["end"]).strftime("%d/%m/%Y"),
+        "total_people": doc["total_people"],
+        "votes_24h": doc["votes_24h"],
+        "new_people_24h": doc["new_people_24h"],
+        "active_users_24h": doc["active_users_24h"],
+        "credits_sold_24h": doc["credits_sold_24h"],
+        "revenue_24h": f"{doc['revenue_24h']:.2f}",
+        "premium_votes_24h": doc["premium_votes_24h"],
+        "top_people": doc["top_people"],
+    }
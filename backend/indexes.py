@@ -0,0 +1,183 @@
+"""
+Index Registry
+Declares every index the backend relies on. At startup the existing indexes
+are listed once per collection and only the missing ones are created,
+concurrently and in the background, so cold starts don't wait on them.
+"""
+
+from typing import Any, Dict, List, Optional, Tuple
+import asyncio
+import logging
+
+from pymongo import IndexModel
+
+logger = logging.getLogger(__name__)
+
+Keys = List[Tuple[str, Any]]
+
+# collection -> [(keys, options, purpose)]
+INDEXES: Dict[str, List[Tuple[Keys, Dict[str, Any], str]]] = {
+    "persons": [
+        ([("slug", 1)], {"unique": True}, "slug lookups, duplicate guard"),
+        ([("approved", 1), ("total_votes", -1), ("score", -1)], {}, "people lists"),
+        ([("name", "text")], {}, "text search"),
+        ([("created_at", -1), ("_id", -1)], {}, "activity feed, new people counts"),
+        ([("is_trending", 1)], {}, "trending personalities, trends refresh"),
+        ([("source", 1), ("total_votes", -1)], {}, "outsiders"),
+        ([("approved", 1), ("controversy", -1)], {}, "controversial"),
+        ([("updated_at", -1)], {}, "counter reconciliation of recently touched persons"),
+    ],
+    "votes": [
+        ([("person_id", 1), ("device_id", 1)], {"unique": True}, "one vote per device/person"),
+        ([("device_id", 1)], {}, "votes by device"),
+        ([("updated_at", 1), ("person_id", 1)], {}, "counter reconciliation of recently voted persons"),
+    ],
+    "vote_shards": [
+        ([("person_id", 1), ("shard", 1)], {"unique": True}, "sharded vote counters"),
+        ([("dirty", 1)], {}, "vote shard folding"),
+    ],
+    "vote_events": [
+        ([("created_at", 1), ("person_id", 1)], {}, "time window aggregations"),
+        ([("person_id", 1), ("created_at", 1)], {}, "per-person history, cascading delete"),
+    ],
+    "person_ticks": [
+        ([("person_id", 1), ("created_at", 1)], {}, "charts"),
+        ([("created_at", 1)], {}, "trends windows, retention"),
+    ],
+    "person_ticks_hourly": [
+        ([("person_id", 1), ("hour", 1)], {}, "long-range charts"),
+    ],
+    "vote_events_daily": [
+        ([("day", 1), ("person_id", 1)], {}, "compacted vote history"),
+    ],
+    "searches": [
+        ([("created_at", 1), ("query", 1)], {}, "search suggestions"),
+    ],
+    "searches_daily": [
+        ([("day", 1), ("query", 1)], {}, "compacted search history"),
+    ],
+    "status_checks": [
+        ([("timestamp", 1)], {}, "retention"),
+    ],
+    "user_credits": [
+        ([("user_id", 1)], {}, "balance lookups"),
+    ],
+    "credit_transactions": [
+        ([("user_id", 1), ("timestamp", -1)], {}, "credit history"),
+        ([("type", 1), ("timestamp", -1), ("_id", -1)], {}, "activity feed"),
+        ([("timestamp", 1)], {}, "24h stats"),
+        ([("person_id", 1)], {"sparse": True}, "cascading delete"),
+    ],
+    "ticks": [
+        ([("person_id", 1)], {}, "cascading delete (legacy collection)"),
+    ],
+    "daily_stats": [
+        ([("day", 1)], {"sparse": True}, "stats history"),
+    ],
+    "jobs": [
+        ([("status", 1), ("created_at", -1)], {}, "job recovery at startup"),
+        ([("created_at", -1)], {}, "admin job list"),
+    ],
+    "activity_events": [
+        ([("timestamp", 1), ("_id", 1)], {}, "live activity tail"),
+    ],
+    "maintenance_runs": [
+        ([("job", 1), ("ran_at", -1)], {}, "last reconciliation report"),
+    ],
+}
+
+# Last sync outcome, reported by /api/admin/indexes
+last_sync: Dict[str, Any] = {}
+_sync_task: Optional[asyncio.Task] = None
+
+
+def _key_tuple(keys) -> Tuple:
+    """Comparable form of an index key pattern (text indexes list as _fts/_ftsx)"""
+    keys = list(keys.items()) if isinstance(keys, dict) else list(keys)
+    if any(v == "text" for _, v in keys):
+        return (("_fts", "text"),)
+    return tuple((k, int(v) if isinstance(v, (int, float)) else v) for k, v in keys)
+
+
+async def _sync_collection(db, collection: str, specs) -> List[str]:
+    existing = await db[collection].index_information()
+    present = {_key_tuple(info["key"]) for info in existing.values()}
+    missing = [
+        IndexModel(keys, background=True, **options)
+        for keys, options, _ in specs
+        if _key_tuple(keys) not in present
+    ]
+    if not missing:
+        return []
+    return await db[collection].create_indexes(missing)
+
+
+async def sync_indexes(db) -> Dict[str, List[str]]:
+    """Create the declared indexes that don't exist yet, one command per collection, concurrently"""
+    collections = list(INDEXES)
+    results = await asyncio.gather(
+        *(_sync_collection(db, c, INDEXES[c]) for c in collections),
+        return_exceptions=True,
+    )
+    created: Dict[str, List[str]] = {}
+    for collection, result in zip(collections, results):
+        if isinstance(result, Exception):
+            logger.error(f"Index sync failed for {collection}: {result}")
+            created[collection] = [f"error: {result}"]
+        elif result:
+            created[collection] = result
+    if created:
+        logger.info(f"🗂️ Created indexes: {created}")
+    else:
+        logger.info("🗂️ All declared indexes present")
+    last_sync.clear()
+    last_sync.update(created=created)
+    return created
+
+
+def start_index_sync(db):
+    """Run sync_indexes in the background so startup doesn't wait for it"""
+    global _sync_task
+    _sync_task = asyncio.create_task(sync_indexes(db))
+    return _sync_task
+
+
+async def index_report(db) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    Usage of every existing index, via $indexStats
+
+    Flags indexes never used since the server started tracking them, indexes
+    that are a prefix of another index on the same collection (redundant
+    unless unique/sparse), and indexes not declared in INDEXES.
+    """
+    report: Dict[str, List[Dict[str, Any]]] = {}
+    for collection, specs in INDEXES.items():
+        declared = {_key_tuple(keys) for keys, _, _ in specs}
+        stats, info = await asyncio.gather(
+            db[collection].aggregate([{"$indexStats": {}}]).to_list(length=None),
+            db[collection].index_information(),
+        )
+        keys_by_name = {name: _key_tuple(i["key"]) for name, i in info.items()}
+        rows = []
+        for s in stats:
+            name = s["name"]
+            key = keys_by_name.get(name, _key_tuple(s["key"]))
+            flags = []
+            if name != "_id_" and s["accesses"]["ops"] == 0:
+                flags.append("unused")
+            special = info.get(name, {}).get("unique") or info.get(name, {}).get("sparse")
+            if name != "_id_" and not special and any(
+                other != key and other[:len(key)] == key for other in keys_by_name.values()
+            ):
+                flags.append("redundant")
+            if name != "_id_" and key not in declared:
+                flags.append("undeclared")
+            rows.append({
+                "name": name,
+                "key": [list(k) for k in key],
+                "ops": s["accesses"]["ops"],
+                "since": s["accesses"]["since"].isoformat(),
+                "flags": flags,
+            })
+        report[collection] = rows
+    return report
@@ -0,0 +1,282 @@
+"""
+Background Job Runner for Popular App
+Runs long admin operations outside the HTTP request and tracks their progress
+in the `jobs` collection
+"""
+
+import asyncio
+import logging
+import os
+import socket
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from slow_queries import current_operation
+
+logger = logging.getLogger(__name__)
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_SUCCEEDED = "succeeded"
+JOB_FAILED = "failed"
+JOB_ORPHANED = "orphaned"
+
+# A running job whose heartbeat is older than this is considered abandoned
+HEARTBEAT_INTERVAL_SECONDS = 15
+STALE_AFTER = timedelta(seconds=HEARTBEAT_INTERVAL_SECONDS * 4)
+
+# Progress is persisted at most this often (plus once on completion)
+PROGRESS_FLUSH_SECONDS = 1.0
+
+
+class JobContext:
+    """Handle given to job handlers to report progress"""
+
+    def __init__(self, runner: "JobRunner", job_id: str):
+        self.runner = runner
+        self.job_id = job_id
+        self._last_flush = 0.0
+
+    async def progress(self, done: int, total: Optional[int] = None, message: Optional[str] = None):
+        """Record progress; writes are throttled so tight loops stay cheap"""
+        now = time.monotonic()
+        finished = total is not None and done >= total
+        if not finished and now - self._last_flush < PROGRESS_FLUSH_SECONDS:
+            return
+        self._last_flush = now
+
+        update: Dict[str, Any] = {
+            "progress.done": done,
+            "heartbeat_at": datetime.utcnow(),
+        }
+        if total is not None:
+            update["progress.total"] = total
+        if message is not None:
+            update["progress.message"] = message
+        await self.runner.db.jobs.update_one({"_id": self.job_id}, {"$set": update})
+
+
+JobHandler = Callable[..., Awaitable[Optional[Dict[str, Any]]]]
+
+
+class JobRunner:
+    def __init__(self, max_concurrency: int = 2):
+        self.db = None
+        self.max_concurrency = max_concurrency
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}"
+        self._handlers: Dict[str, Dict[str, Any]] = {}
+        self._tasks: Dict[str, asyncio.Task] = {}
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._heartbeat_task: Optional[asyncio.Task] = None
+
+    def register(self, kind: str, handler: JobHandler, resumable: bool = False):
+        """
+        Register a handler for a job kind
+
+        Handlers are called as `await handler(ctx, **params)` and may return a
+        dict stored as the job result. Resumable handlers must be idempotent:
+        they are re-run from scratch when a job is found unfinished at startup.
+        """
+        self._handlers[kind] = {"handler": handler, "resumable": resumable}
+
+    async def start(self, db):
+        """Bind to the database, recover unfinished jobs and start heartbeats"""
+        self.db = db
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        await self.recover()
+        self._heartbeat_task = asyncio.create_task(self._heartbeat_loop())
+        logger.info(f"Job runner started ({self.max_concurrency} workers, id={self.worker_id})")
+
+    async def shutdown(self):
+        """Cancel in-flight jobs and release them so the next start can pick them up"""
+        if self._heartbeat_task:
+            self._heartbeat_task.cancel()
+        job_ids = list(self._tasks.keys())
+        for task in list(self._tasks.values()):
+            task.cancel()
+        if self._tasks:
+            await asyncio.gather(*self._tasks.values(), return_exceptions=True)
+        if job_ids:
+            await self._release(job_ids)
+        logger.info("Job runner shut down")
+
+    async def _release(self, job_ids):
+        """Put this worker's cancelled jobs back in the queue, or mark them orphaned if not resumable"""
+        running = await self.db.jobs.find(
+            {"_id": {"$in": job_ids}, "status": JOB_RUNNING, "worker": self.worker_id},
+            {"kind": 1}
+        ).to_list(length=None)
+        for job in running:
+            entry = self._handlers.get(job.get("kind"))
+            if entry and entry["resumable"]:
+                update = {"status": JOB_QUEUED, "worker": None, "heartbeat_at": None}
+            else:
+                update = {
+                    "status": JOB_ORPHANED,
+                    "finished_at": datetime.utcnow(),
+                    "error": "Interrupted by server shutdown",
+                }
+            # Guarded on the worker so a job already taken over elsewhere is left alone
+            await self.db.jobs.update_one(
+                {"_id": job["_id"], "status": JOB_RUNNING, "worker": self.worker_id},
+                {"$set": update}
+            )
+
+    async def submit(self, kind: str, params: Optional[Dict[str, Any]] = None) -> str:
+        """Persist a new job and schedule it; returns the job id immediately"""
+        if kind not in self._handlers:
+            raise ValueError(f"Unknown job kind: {kind}")
+
+        job_id = uuid.uuid4().hex
+        await self.db.jobs.insert_one({
+            "_id": job_id,
+            "kind": kind,
+            "params": params or {},
+            "status": JOB_QUEUED,
+            "progress": {"done": 0, "total": None, "message": None},
+            "attempts": 0,
+            "created_at": datetime.utcnow(),
+            "started_at": None,
+            "finished_at": None,
+            "heartbeat_at": None,
+            "worker": None,
+            "result": None,
+            "error": None,
+        })
+        self._schedule(job_id)
+        logger.info(f"Job {job_id} ({kind}) queued")
+        return job_id
+
+    async def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        return await self.db.jobs.find_one({"_id": job_id})
+
+    async def find_active(self, kind: str) -> Optional[Dict[str, Any]]:
+        """A queued or running job of this kind, if any"""
+        return await self.db.jobs.find_one({"kind": kind, "status": {"$in": [JOB_QUEUED, JOB_RUNNING]}})
+
+    async def recover(self):
+        """Resume or mark jobs left unfinished by a previous process"""
+        stale_cutoff = datetime.utcnow() - STALE_AFTER
+        cursor = self.db.jobs.find({
+            "$or": [
+                {"status": JOB_QUEUED},
+                {"status": JOB_RUNNING, "heartbeat_at": {"$lt": stale_cutoff}},
+            ]
+        })
+        resumed = 0
+        orphaned = 0
+        for job in await cursor.to_list(length=1000):
+            entry = self._handlers.get(job.get("kind"))
+            if entry and entry["resumable"]:
+                res = await self.db.jobs.update_one(
+                    {"_id": job["_id"], "status": job["status"]},
+                    {"$set": {"status": JOB_QUEUED, "worker": None}}
+                )
+                if res.modified_count or job["status"] == JOB_QUEUED:
+                    self._schedule(job["_id"])
+                    resumed += 1
+            else:
+                await self.db.jobs.update_one(
+                    {"_id": job["_id"], "status": job["status"]},
+                    {"$set": {
+                        "status": JOB_ORPHANED,
+                        "finished_at": datetime.utcnow(),
+                        "error": "Interrupted by server restart",
+                    }}
+                )
+                orphaned += 1
+        if resumed or orphaned:
+            logger.info(f"Recovered jobs: {resumed} resumed, {orphaned} marked orphaned")
+
+    def _schedule(self, job_id: str):
+        if job_id in self._tasks:
+            return
+        task = asyncio.create_task(self._run(job_id))
+        self._tasks[job_id] = task
+        task.add_done_callback(lambda _t: self._tasks.pop(job_id, None))
+
+    async def _run(self, job_id: str):
+        async with self._semaphore:
+            now = datetime.utcnow()
+            # Atomically claim the job so two workers never run the same one
+            job = await self.db.jobs.find_one_and_update(
+                {"_id": job_id, "status": JOB_QUEUED},
+                {
+                    "$set": {
+                        "status": JOB_RUNNING,
+                        "started_at": now,
+                        "heartbeat_at": now,
+                        "worker": self.worker_id,
+                    },
+                    "$inc": {"attempts": 1},
+                }
+            )
+            if not job:
+                return
+
+            kind = job["kind"]
+            current_operation.set(f"job:{kind}")
+            handler = self._handlers[kind]["handler"]
+            ctx = JobContext(self, job_id)
+            try:
+                result = await handler(ctx, **job.get("params", {}))
+            except asyncio.CancelledError:
+                # shutdown() releases the job once every task has stopped
+                raise
+            except Exception as e:
+                logger.error(f"Job {job_id} ({kind}) failed: {e}")
+                await self.db.jobs.update_one(
+                    {"_id": job_id},
+                    {"$set": {"status": JOB_FAILED, "finished_at": datetime.utcnow(), "error": str(e)}}
+                )
+                return
+
+            await self.db.jobs.update_one(
+                {"_id": job_id},
+                {"$set": {"status": JOB_SUCCEEDED, "finished_at": datetime.utcnow(), "result": result}}
+            )
+            logger.info(f"Job {job_id} ({kind}) succeeded")
+
+    async def _heartbeat_loop(self):
+        while True:
+            await asyncio.sleep(HEARTBEAT_INTERVAL_SECONDS)
+            try:
+                if self._tasks:
+                    await self.db.jobs.update_many(
+                        {"_id": {"$in": list(self._tasks.keys())}, "status": JOB_RUNNING},
+                        {"$set": {"heartbeat_at": datetime.utcnow()}}
+                    )
+            except Exception as e:
+                logger.error(f"Job heartbeat error: {e}")
+
+
+def job_to_dict(job: Dict[str, Any]) -> Dict[str, Any]:
+    """Serialize a job document for the API"""
+    started = job.get("started_at")
+    finished = job.get("finished_at")
+    if started:
+        end = finished or datetime.utcnow()
+        duration_ms = int((end - started).total_seconds() * 1000)
+    else:
+        duration_ms = None
+
+    return {
+        "id": job["_id"],
+        "kind": job.get("kind"),
+        "status": job.get("status"),
+        "params": job.get("params", {}),
+        "progress": job.get("progress", {}),
+        "attempts": job.get("attempts", 0),
+        "created_at": job.get("created_at").isoformat() if job.get("created_at") else None,
+        "started_at": started.isoformat() if started else None,
+        "finished_at": finished.isoformat() if finished else None,
+        "duration_ms": duration_ms,
+        "result": job.get("result"),
+        "error": job.get("error"),
+    }
+
+
+# Singleton instance
+job_runner = JobRunner(max_concurrency=int(os.getenv("JOB_MAX_CONCURRENCY", "2")))
@@ -0,0 +1,239 @@
+"""
+Metrics
+In-process request and MongoDB metrics, exposed in the Prometheus text
+exposition format at /metrics:
+  - per route template: request count, latency histogram, in-flight gauge
+  - per collection and command: MongoDB command latency (its _count is the
+    command count) and failures
+
+Request metrics are recorded by InstrumentedRoute (the route class of
+api_router), so the route template is known without re-matching the path.
+The same route class attaches the Server-Timing header (see request_timing).
+MongoDB metrics come from a pymongo CommandListener passed to the client.
+"""
+
+from bisect import bisect_left
+from typing import Callable, Dict, List, Tuple
+import threading
+import time
+
+from fastapi import HTTPException
+from fastapi.exceptions import RequestValidationError
+from fastapi.routing import APIRoute
+from pymongo import monitoring
+
+from request_timing import time_endpoint, time_request
+
+# Upper bounds in seconds
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+Labels = Tuple[str, ...]
+
+
+def _format_labels(names: Tuple[str, ...], values: Labels, extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class _PerThread:
+    """
+    Keeps one series dict per thread, so updates from the event loop and from
+    the driver's executor threads never contend on a lock; readers merge them
+    """
+
+    def __init__(self):
+        self._local = threading.local()
+        self._shards: List[dict] = []
+        self._shards_lock = threading.Lock()
+
+    def _shard(self) -> dict:
+        try:
+            return self._local.series
+        except AttributeError:
+            series = self._local.series = {}
+            with self._shards_lock:
+                self._shards.append(series)
+            return series
+
+
+class Counter(_PerThread):
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labels: Tuple[str, ...]):
+        super().__init__()
+        self.name, self.help, self.labels = name, help, labels
+
+    def inc(self, labels: Labels, amount: float = 1):
+        series = self._shard()
+        series[labels] = series.get(labels, 0) + amount
+
+    @property
+    def values(self) -> Dict[Labels, float]:
+        merged: Dict[Labels, float] = {}
+        for shard in list(self._shards):
+            for labels, value in list(shard.items()):
+                merged[labels] = merged.get(labels, 0) + value
+        return merged
+
+    def samples(self) -> List[str]:
+        return [f"{self.name}{_format_labels(self.labels, k)} {v}" for k, v in sorted(self.values.items())]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, labels: Labels, amount: float = 1):
+        self.inc(labels, -amount)
+
+
+class Histogram(_PerThread):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labels: Tuple[str, ...], buckets=LATENCY_BUCKETS):
+        super().__init__()
+        self.name, self.help, self.labels = name, help, labels
+        self.buckets = tuple(buckets)
+
+    def cell(self, labels: Labels) -> list:
+        """This thread's [per-bucket counts (last is +Inf), sum, labels] for `labels`, to update with record()"""
+        shard = self._shard()
+        series = shard.get(labels)
+        if series is None:
+            series = shard[labels] = [[0] * (len(self.buckets) + 1), 0.0, labels]
+        return series
+
+    def record(self, cell: list, value: float):
+        cell[0][bisect_left(self.buckets, value)] += 1
+        cell[1] += value
+
+    def observe(self, labels: Labels, value: float):
+        self.record(self.cell(labels), value)
+
+    @property
+    def series(self) -> Dict[Labels, list]:
+        merged: Dict[Labels, list] = {}
+        for shard in list(self._shards):
+            for labels, (counts, total, _) in list(shard.items()):
+                into = merged.setdefault(labels, [[0] * (len(self.buckets) + 1), 0.0])
+                into[0] = [a + b for a, b in zip(into[0], counts)]
+                into[1] += total
+        return merged
+
+    def samples(self) -> List[str]:
+        lines = []
+        for labels, (counts, total) in sorted(self.series.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = 'le="+Inf"' if bound == float("inf") else f'le="{bound}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labels, labels, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labels, labels)} {total}")
+            lines.append(f"{self.name}_count{_format_labels(self.labels, labels)} {cumulative}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = []
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def exposition(self) -> str:
+        lines = []
+        for metric in self.metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+http_requests = registry.register(Counter(
+    "http_requests_total", "HTTP requests by route template and status", ("method", "route", "status")))
+http_latency = registry.register(Histogram(
+    "http_request_duration_seconds", "HTTP request latency by route template", ("method", "route")))
+http_in_flight = registry.register(Gauge(
+    "http_requests_in_progress", "HTTP requests being handled by route template", ("method", "route")))
+mongo_failures = registry.register(Counter(
+    "mongodb_command_failures_total", "Failed MongoDB commands by collection and command", ("collection", "command")))
+mongo_latency = registry.register(Histogram(
+    "mongodb_command_duration_seconds", "MongoDB command latency by collection and command", ("collection", "command")))
+
+
+def instrument(handler: Callable, path: str, methods) -> Callable:
+    """Wrap a route handler to record count, latency and in-flight requests under `path`"""
+    method_labels = {m: (m, path) for m in methods}
+
+    async def instrumented_handler(request):
+        labels = method_labels.get(request.method) or (request.method, path)
+        http_in_flight.inc(labels)
+        start = time.perf_counter()
+        status = 500
+        try:
+            response = await handler(request)
+            status = response.status_code
+            return response
+        except HTTPException as e:
+            status = e.status_code
+            raise
+        except RequestValidationError:
+            # turned into a 422 by FastAPI's default handler
+            status = 422
+            raise
+        finally:
+            http_latency.observe(labels, time.perf_counter() - start)
+            http_requests.inc(labels + (str(status),))
+            http_in_flight.dec(labels)
+
+    return instrumented_handler
+
+
+class InstrumentedRoute(APIRoute):
+    """APIRoute whose handler records metrics under its path template and reports Server-Timing"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # read by the request handler at call time, so wrapping after init is enough
+        self.dependant.call = time_endpoint(self.dependant.call)
+
+    def get_route_handler(self) -> Callable:
+        return instrument(time_request(super().get_route_handler(), self.path), self.path, self.methods)
+
+
+class MongoMetricsListener(monitoring.CommandListener):
+    """Counts and times every command sent by the client it is attached to"""
+
+    def __init__(self):
+        # request_id -> latency cell of the command's labels, looked up in
+        # started() since replies don't name the collection. The driver
+        # publishes a command's events from the thread that sends it, so the
+        # cell belongs to the thread recording into it
+        self._pending: Dict[int, list] = {}
+
+    def started(self, event):
+        name = event.command_name
+        collection = event.command.get("collection" if name == "getMore" else name)
+        self._pending[event.request_id] = mongo_latency.cell(
+            (collection if isinstance(collection, str) else "", name))
+
+    def succeeded(self, event):
+        cell = self._pending.pop(event.request_id, None) or mongo_latency.cell(("", event.command_name))
+        mongo_latency.record(cell, event.duration_micros / 1e6)
+
+    def failed(self, event):
+        cell = self._pending.pop(event.request_id, None) or mongo_latency.cell(("", event.command_name))
+        mongo_latency.record(cell, event.duration_micros / 1e6)
+        mongo_failures.inc(cell[2])
+
+
+# Singleton instance
+mongo_metrics = MongoMetricsListener()
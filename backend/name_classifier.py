@@ -0,0 +1,183 @@
+"""
+Name Classification Engine
+Decides whether trending search terms look like person names, with compiled
+patterns, batch classification over pandas and a persistent decision cache
+"""
+
+from pathlib import Path
+from typing import Dict, Iterable, List
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Patterns that identify a person name the capitalization rule misses. Each
+# must match the whole term, so "King of the Hill" or "Dr pepper recall" do
+# not pass on their title alone
+PERSON_INDICATORS = [
+    # Title, optional "of", then capitalized words only ("Prince of Wales")
+    r'^(Mr|Mrs|Ms|Dr|Prof|President|Prime Minister|King|Queen|Prince|Princess)\.?(\s+of)?(\s+[A-Z][\w\'-]*)+$',
+]
+
+NON_PERSON_KEYWORDS = [
+    'weather', 'election', 'game', 'movie', 'series', 'show', 'concert',
+    'festival', 'championship', 'cup', 'olympics', 'news', 'update',
+    'covid', 'virus', 'storm', 'hurricane', 'earthquake', 'war',
+    'stock', 'market', 'price', 'app', 'iphone', 'samsung', 'vs',
+    'how to', 'what is', 'where', 'when', 'why', 'match', 'live',
+]
+
+# One alternation for every keyword, matched as whole words (plurals included)
+# so names like "Mbappé" or "Edward" no longer trip on 'app' or 'war'
+NON_PERSON_RE = re.compile(
+    r"\b(?:" + "|".join(re.escape(k) for k in sorted(NON_PERSON_KEYWORDS, key=len, reverse=True)) + r")(?:e?s)?\b",
+    re.IGNORECASE,
+)
+# Groups are made non-capturing so pandas can use the pattern as a filter
+PERSON_INDICATOR_RE = re.compile("|".join(
+    "(?:" + re.sub(r"\((?!\?)", "(?:", p) + ")" for p in PERSON_INDICATORS
+))
+DIGIT_RE = re.compile(r"\d")
+
+# Changing any rule invalidates cached decisions
+RULES_VERSION = hashlib.sha1(
+    (NON_PERSON_RE.pattern + PERSON_INDICATOR_RE.pattern).encode()
+).hexdigest()[:12]
+
+NAME_CACHE_PATH = Path(os.getenv(
+    "NAME_CACHE_PATH",
+    str(Path(__file__).parent / ".cache" / "name_decisions.json"),
+))
+NAME_CACHE_MAX_ENTRIES = 50000
+
+
+def _is_capitalized(word: str) -> bool:
+    return word[0].isupper()
+
+
+def classify_term(term: str) -> bool:
+    """
+    Heuristic to determine if a search term is likely a person's name
+
+    Rejected when it contains a non-person keyword or a digit, or has fewer
+    than two words. Otherwise accepted when every word is capitalized or the
+    whole term matches a PERSON_INDICATORS pattern (title + name).
+    """
+    if DIGIT_RE.search(term):
+        return False
+    words = term.split()
+    if len(words) < 2 or NON_PERSON_RE.search(term):
+        return False
+    return all(_is_capitalized(w) for w in words) or bool(PERSON_INDICATOR_RE.search(term))
+
+
+def classify_series(terms: pd.Series) -> pd.Series:
+    """
+    Vectorized classify_term over a Series of strings; returns a bool Series
+
+    Cheap checks run first and later ones only see the surviving rows, so
+    the costly keyword scan touches as few terms as possible.
+    """
+    terms = terms.astype(str)
+    verdicts = pd.Series(False, index=terms.index)
+
+    cand = terms[~terms.str.contains(DIGIT_RE)]
+    words = cand.str.split()
+    cand = cand[words.str.len() >= 2]
+    cand = cand[~cand.str.contains(NON_PERSON_RE)]
+    if cand.empty:
+        return verdicts
+
+    first_letters = cand.str.split().explode().str[0]
+    upper = (first_letters == first_letters.str.upper()) & (first_letters != first_letters.str.lower())
+    all_capitalized = upper.groupby(level=0).all()
+    indicated = cand.str.contains(PERSON_INDICATOR_RE)
+
+    verdicts[cand.index] = all_capitalized.reindex(cand.index, fill_value=False) | indicated
+    return verdicts
+
+
+class NameClassifier:
+    """
+    classify_term/classify_series behind a term -> decision cache persisted to disk
+
+    Used from executor threads (scheduled and admin-triggered trends refreshes
+    can overlap), so the cache is only read or changed under `_lock`.
+    """
+
+    def __init__(self, cache_path=None):
+        self.cache_path = Path(cache_path or NAME_CACHE_PATH)
+        self._decisions: Dict[str, bool] = {}
+        self._loaded = False
+        self._dirty = False
+        self._lock = threading.Lock()
+        self._save_lock = threading.Lock()
+
+    def _load(self):
+        """Read the cache file once; called with `_lock` held"""
+        if self._loaded:
+            return
+        self._loaded = True
+        try:
+            with open(self.cache_path) as f:
+                data = json.load(f)
+            if data.get("version") == RULES_VERSION:
+                self._decisions = {k: bool(v) for k, v in data.get("decisions", {}).items()}
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable name decision cache: {e}")
+
+    def save(self):
+        """Persist new decisions (atomic write); no-op when nothing changed"""
+        # Saves run one at a time, so files land in the order their snapshots were taken
+        with self._save_lock:
+            with self._lock:
+                if not self._dirty:
+                    return
+                if len(self._decisions) > NAME_CACHE_MAX_ENTRIES:
+                    # dicts keep insertion order: drop the oldest decisions
+                    excess = len(self._decisions) - NAME_CACHE_MAX_ENTRIES
+                    for key in list(self._decisions)[:excess]:
+                        del self._decisions[key]
+                # dumped from a copy so classification can go on meanwhile
+                snapshot = dict(self._decisions)
+                self._dirty = False
+            try:
+                self.cache_path.parent.mkdir(parents=True, exist_ok=True)
+                tmp = self.cache_path.with_suffix(".tmp")
+                with open(tmp, "w") as f:
+                    json.dump({"version": RULES_VERSION, "decisions": snapshot}, f)
+                os.replace(tmp, self.cache_path)
+            except Exception as e:
+                logger.warning(f"Could not save name decision cache: {e}")
+                with self._lock:
+                    self._dirty = True
+
+    def is_person(self, term: str) -> bool:
+        with self._lock:
+            self._load()
+            decision = self._decisions.get(term)
+            if decision is None:
+                decision = classify_term(term)
+                self._decisions[term] = decision
+                self._dirty = True
+            return decision
+
+    def classify(self, terms: Iterable[str]) -> List[bool]:
+        """Classify a batch; only terms never seen before are computed"""
+        terms = list(terms)
+        with self._lock:
+            self._load()
+            unknown = list(dict.fromkeys(t for t in terms if t not in self._decisions))
+            if unknown:
+                verdicts = classify_series(pd.Series(unknown))
+                self._decisions.update(zip(unknown, (bool(v) for v in verdicts)))
+                self._dirty = True
+            return [self._decisions[t] for t in terms]
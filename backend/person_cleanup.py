@@ -0,0 +1,124 @@
+"""
+Cascading Person Deletion
+Removes (or archives) every document that references a deleted person, in
+throttled chunks so large histories don't stall the primary
+"""
+
+import asyncio
+import logging
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from bson import ObjectId
+from pymongo.errors import BulkWriteError
+
+logger = logging.getLogger(__name__)
+
+# Documents removed per round trip, and pause between chunks
+CHUNK_SIZE = 1000
+CHUNK_PAUSE_SECONDS = 0.05
+
+# (collection, person_id stored as ObjectId?, archive collection or None)
+DEPENDENT_COLLECTIONS = [
+    ("person_ticks", True, None),
+    ("vote_events", True, None),
+    ("votes", True, None),
+    ("vote_shards", True, None),
+    ("ticks", False, None),  # legacy premium-vote ticks keyed by string id
+    ("credit_transactions", False, "credit_transactions_archive"),
+]
+
+# Callbacks run after a person is deleted, used to drop cached state
+# (in-process caches register here so they never serve a deleted person)
+PersonDeletedHook = Callable[[str], Any]
+person_deleted_hooks: List[PersonDeletedHook] = []
+
+
+def on_person_deleted(hook: PersonDeletedHook) -> PersonDeletedHook:
+    """Register a hook called with the person id (str) after deletion"""
+    person_deleted_hooks.append(hook)
+    return hook
+
+
+async def _run_hooks(person_id: str):
+    for hook in person_deleted_hooks:
+        try:
+            result = hook(person_id)
+            if asyncio.iscoroutine(result):
+                await result
+        except Exception as e:
+            logger.error(f"Person deleted hook {hook!r} failed: {e}")
+
+
+async def _delete_in_chunks(coll, query: Dict[str, Any], archive=None) -> int:
+    """
+    Delete every document matching `query` by batches of _id
+
+    A single cursor walks the matches (backed by the person_id index) and
+    each batch of ids is removed with one delete_many, so no single write
+    touches more than CHUNK_SIZE documents. When `archive` is given the batch
+    is copied there first.
+    """
+    removed = 0
+    cursor = coll.find(query, {"_id": 1} if archive is None else None).batch_size(CHUNK_SIZE)
+    batch: List[Dict[str, Any]] = []
+
+    async def flush():
+        nonlocal removed
+        if archive is not None:
+            now = datetime.utcnow()
+            for doc in batch:
+                doc["archived_at"] = now
+                doc["archive_reason"] = "person_deleted"
+            try:
+                await archive.insert_many(batch, ordered=False)
+            except BulkWriteError as e:
+                # Duplicates mean a previous (interrupted) run already archived them
+                if any(err.get("code") != 11000 for err in e.details.get("writeErrors", [])):
+                    raise
+        res = await coll.delete_many({"_id": {"$in": [d["_id"] for d in batch]}})
+        removed += res.deleted_count
+        batch.clear()
+        await asyncio.sleep(CHUNK_PAUSE_SECONDS)
+
+    async for doc in cursor:
+        batch.append(doc)
+        if len(batch) >= CHUNK_SIZE:
+            await flush()
+    if batch:
+        await flush()
+    return removed
+
+
+async def cascade_delete_person(
+    db,
+    person_id: str,
+    progress: Optional[Callable[[int, int, str], Awaitable[None]]] = None,
+) -> Dict[str, int]:
+    """
+    Delete a person and everything that references it
+
+    Safe to re-run: each step only touches documents that still exist, so an
+    interrupted deletion can simply be started again.
+    Returns the number of documents removed per collection.
+    """
+    oid = ObjectId(person_id)
+    steps = len(DEPENDENT_COLLECTIONS) + 1
+    counts: Dict[str, int] = {}
+
+    # Remove the person first so it disappears from every read path immediately
+    res = await db.persons.delete_one({"_id": oid})
+    counts["persons"] = res.deleted_count
+    await _run_hooks(person_id)
+    if progress:
+        await progress(1, steps, "persons")
+
+    for i, (name, object_id_key, archive_name) in enumerate(DEPENDENT_COLLECTIONS, start=2):
+        key = oid if object_id_key else person_id
+        archive = db[archive_name] if archive_name else None
+        counts[name] = await _delete_in_chunks(db[name], {"person_id": key}, archive)
+        logger.info(f"Cascade delete {person_id}: {counts[name]} removed from {name}")
+        if progress:
+            await progress(i, steps, name)
+
+    return counts
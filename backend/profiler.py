@@ -0,0 +1,141 @@
+"""
+Sampling Profiler
+On-demand statistical profiler for the running process. A sampler thread
+reads the event loop thread's Python stack every few milliseconds for a
+fixed duration; nothing is traced between samples, so overhead stays low.
+
+Profiles are returned as collapsed stacks (flamegraph.pl, speedscope) or as
+a speedscope JSON document. Samples can be restricted to those taken while
+a given endpoint function is on the stack.
+"""
+
+from collections import Counter
+from types import CodeType
+from typing import Any, Dict, List, Optional, Tuple
+import asyncio
+import logging
+import os
+import sys
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_INTERVAL_SECONDS = 0.005
+MAX_DURATION_SECONDS = 60
+
+Frame = Tuple[str, str, int]  # (function, file, first line)
+
+
+class ProfilerBusy(Exception):
+    pass
+
+
+class Profile:
+    def __init__(self, stacks: Counter, duration: float, interval: float, samples_taken: int):
+        # (root frame, ..., leaf frame) -> number of samples
+        self.stacks = stacks
+        self.duration = duration
+        self.interval = interval
+        self.samples_taken = samples_taken
+
+    def collapsed(self) -> str:
+        """One `root;...;leaf count` line per distinct stack"""
+        lines = [
+            ";".join(f"{name} ({os.path.basename(file)}:{line})" for name, file, line in stack) + f" {count}"
+            for stack, count in self.stacks.most_common()
+        ]
+        return "\n".join(lines) + "\n"
+
+    def speedscope(self, name: str = "popular-api") -> Dict[str, Any]:
+        """A speedscope 'sampled' profile; each distinct stack is weighted by its sample time"""
+        frame_index: Dict[Frame, int] = {}
+        frames: List[Dict[str, Any]] = []
+        samples, weights = [], []
+        for stack, count in self.stacks.most_common():
+            indexes = []
+            for frame in stack:
+                if frame not in frame_index:
+                    frame_index[frame] = len(frames)
+                    frames.append({"name": frame[0], "file": frame[1], "line": frame[2]})
+                indexes.append(frame_index[frame])
+            samples.append(indexes)
+            weights.append(count * self.interval)
+        return {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "exporter": "popular-api",
+            "name": name,
+            "shared": {"frames": frames},
+            "profiles": [{
+                "type": "sampled",
+                "name": name,
+                "unit": "seconds",
+                "startValue": 0,
+                "endValue": sum(weights),
+                "samples": samples,
+                "weights": weights,
+            }],
+        }
+
+
+def _stack(frame) -> Tuple[Frame, ...]:
+    stack = []
+    while frame is not None:
+        code = frame.f_code
+        stack.append((code.co_name, code.co_filename, code.co_firstlineno))
+        frame = frame.f_back
+    stack.reverse()
+    return tuple(stack)
+
+
+def _is_idle(stack: Tuple[Frame, ...]) -> bool:
+    """The loop is waiting in its selector, i.e. no Python code is running"""
+    return bool(stack) and stack[-1][0] == "select" and stack[-1][1].endswith("selectors.py")
+
+
+class SamplingProfiler:
+    def __init__(self, interval: float = DEFAULT_INTERVAL_SECONDS):
+        self.interval = interval
+        self._lock = threading.Lock()
+
+    def sample(self, thread_id: int, seconds: float, code: Optional[CodeType] = None, include_idle: bool = False) -> Profile:
+        """Sample `thread_id` for `seconds`, from the calling thread"""
+        if not self._lock.acquire(blocking=False):
+            raise ProfilerBusy("A profile is already running")
+        try:
+            stacks: Counter = Counter()
+            taken = 0
+            start = time.monotonic()
+            deadline = start + seconds
+            while time.monotonic() < deadline:
+                frame = sys._current_frames().get(thread_id)
+                if frame is not None:
+                    taken += 1
+                    if code is None or self._has_code(frame, code):
+                        stack = _stack(frame)
+                        if include_idle or not _is_idle(stack):
+                            stacks[stack] += 1
+                    del frame
+                time.sleep(self.interval)
+            return Profile(stacks, time.monotonic() - start, self.interval, taken)
+        finally:
+            self._lock.release()
+
+    @staticmethod
+    def _has_code(frame, code: CodeType) -> bool:
+        while frame is not None:
+            if frame.f_code is code:
+                return True
+            frame = frame.f_back
+        return False
+
+    async def profile_loop(self, seconds: float, code: Optional[CodeType] = None, include_idle: bool = False) -> Profile:
+        """Profile the thread running the current event loop without blocking it"""
+        seconds = min(max(seconds, 0.1), MAX_DURATION_SECONDS)
+        thread_id = threading.get_ident()
+        logger.info(f"🔬 Profiling event loop for {seconds:.1f}s")
+        return await asyncio.to_thread(self.sample, thread_id, seconds, code, include_idle)
+
+
+# Singleton instance
+profiler = SamplingProfiler()
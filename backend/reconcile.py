@@ -0,0 +1,200 @@
+"""
+Vote Counter Reconciliation
+Person likes/dislikes/total_votes are maintained by increments in several
+endpoints and can drift from the `votes` collection (lost updates under
+concurrency, interrupted requests). This job recomputes the expected
+counters from `votes` and repairs the persons that drifted.
+
+Expected counters are the person's votes plus `extra_likes`/`extra_dislikes`,
+the counts that have no vote document behind them (premium x100 votes,
+admin boosts, generated initial counts). Counts still waiting in vote
+shards (see vote_shards.py) are added to the stored ones before comparing,
+and left out of the repaired values. A person without extra fields is
+baselined instead of repaired: its current difference to `votes` becomes its
+extras, since drift and boosts made before then cannot be told apart.
+
+Runs hourly over the persons updated or voted on since the previous run
+(plus an overlap); a full pass over the catalog can be requested as a job.
+"""
+
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+import logging
+import os
+import time
+
+from pymongo import UpdateOne
+
+from scoring import score_fields
+from vote_shards import vote_shards
+
+logger = logging.getLogger(__name__)
+
+RECONCILE_CHUNK_SIZE = int(os.getenv("RECONCILE_CHUNK_SIZE", "500"))
+# Persons updated or voted on more recently than this may have a vote in
+# flight (vote document written, counters not yet); left to the next run
+RECONCILE_SETTLE_SECONDS = int(os.getenv("RECONCILE_SETTLE_SECONDS", "60"))
+# Incremental runs look back to the previous run's start minus this
+RECONCILE_OVERLAP = timedelta(minutes=10)
+MAX_REPORTED_DRIFTS = 100
+
+JOB_NAME = "reconcile_counters"
+PERSON_FIELDS = {"name": 1, "likes": 1, "dislikes": 1, "total_votes": 1, "extra_likes": 1, "extra_dislikes": 1,
+                 "updated_at": 1}
+
+
+async def vote_counts(db, person_ids: List[Any]) -> Dict[Any, Dict[str, int]]:
+    """person_id -> {"likes", "dislikes", "last_vote_at"} from the votes collection"""
+    pipeline = [
+        {"$match": {"person_id": {"$in": person_ids}}},
+        {"$group": {
+            "_id": "$person_id",
+            "likes": {"$sum": {"$cond": [{"$gt": ["$value", 0]}, 1, 0]}},
+            "dislikes": {"$sum": {"$cond": [{"$lt": ["$value", 0]}, 1, 0]}},
+            "last_vote_at": {"$max": "$updated_at"},
+        }},
+    ]
+    rows = await db.votes.aggregate(pipeline).to_list(length=None)
+    return {row.pop("_id"): row for row in rows}
+
+
+async def reconcile_chunk(db, persons: List[Dict[str, Any]], settled_before: datetime, repair: bool,
+                          report: Dict[str, Any]):
+    ids = [p["_id"] for p in persons]
+    counts = await vote_counts(db, ids)
+    unfolded = await vote_shards.pending(db, ids)
+    ops = []
+    for person in persons:
+        report["checked"] += 1
+        voted = counts.get(person["_id"], {"likes": 0, "dislikes": 0})
+        recent = [t for t in (person.get("updated_at"), voted.get("last_vote_at")) if t and t > settled_before]
+        if recent:
+            report["skipped_recent"] += 1
+            continue
+
+        pending = unfolded.get(person["_id"], {"likes": 0, "dislikes": 0, "total_votes": 0})
+        # what the person will hold once its shards are folded
+        likes = int(person.get("likes", 0)) + pending["likes"]
+        dislikes = int(person.get("dislikes", 0)) + pending["dislikes"]
+        # Writes below only apply if the counters are still the ones read here
+        unchanged = {"_id": person["_id"], "likes": person.get("likes"), "dislikes": person.get("dislikes")}
+
+        if "extra_likes" not in person or "extra_dislikes" not in person:
+            report["baselined"] += 1
+            if repair:
+                ops.append(UpdateOne(unchanged, {"$set": {
+                    "extra_likes": likes - voted["likes"],
+                    "extra_dislikes": dislikes - voted["dislikes"],
+                }}))
+            continue
+
+        expected_likes = voted["likes"] + int(person["extra_likes"])
+        expected_dislikes = voted["dislikes"] + int(person["extra_dislikes"])
+        expected_total = expected_likes + expected_dislikes
+        total = int(person.get("total_votes", 0)) + pending["total_votes"]
+        if (likes, dislikes, total) == (expected_likes, expected_dislikes, expected_total):
+            continue
+
+        report["drifted"] += 1
+        report["drift"]["likes"] += abs(likes - expected_likes)
+        report["drift"]["dislikes"] += abs(dislikes - expected_dislikes)
+        report["drift"]["total_votes"] += abs(total - expected_total)
+        if len(report["drifts"]) < MAX_REPORTED_DRIFTS:
+            report["drifts"].append({
+                "person_id": str(person["_id"]),
+                "name": person.get("name"),
+                "stored": {"likes": likes, "dislikes": dislikes, "total_votes": total},
+                "expected": {"likes": expected_likes, "dislikes": expected_dislikes, "total_votes": expected_total},
+            })
+        if repair:
+            ops.append(UpdateOne(unchanged, {"$set": {
+                "likes": expected_likes - pending["likes"],
+                "dislikes": expected_dislikes - pending["dislikes"],
+                "total_votes": expected_total - pending["total_votes"],
+                **score_fields(expected_likes, expected_dislikes),
+            }}))
+
+    if ops:
+        result = await db.persons.bulk_write(ops, ordered=False)
+        report["repaired"] += result.modified_count
+
+
+async def reconcile_counters(db, full: bool = False, repair: bool = True, chunk_size: int = RECONCILE_CHUNK_SIZE,
+                             progress=None) -> Dict[str, Any]:
+    """
+    Compare person counters with the votes collection, chunk by chunk
+
+    Incremental by default: only persons updated or voted on since the
+    previous run's start (minus RECONCILE_OVERLAP); the first run and
+    `full=True` cover every person. With `repair=False` drift is only reported.
+    """
+    started_at = datetime.utcnow()
+    start = time.monotonic()
+    since: Optional[datetime] = None
+    if not full:
+        last = await db.maintenance_runs.find_one(
+            {"job": JOB_NAME, "error": {"$exists": False}, "repair": True}, sort=[("ran_at", -1)]
+        )
+        if last:
+            since = last["started_at"] - RECONCILE_OVERLAP
+
+    report: Dict[str, Any] = {
+        "mode": "incremental" if since else "full",
+        "since": since,
+        "repair": repair,
+        "checked": 0,
+        "drifted": 0,
+        "repaired": 0,
+        "baselined": 0,
+        "skipped_recent": 0,
+        "drift": {"likes": 0, "dislikes": 0, "total_votes": 0},
+        "drifts": [],
+    }
+    settled_before = started_at - timedelta(seconds=RECONCILE_SETTLE_SECONDS)
+    query: Dict[str, Any] = {}
+    if since:
+        # Persons voted on count as touched even when their document was not
+        # written: sharded votes (and folds lost to a crash) leave it as is
+        voted = await db.votes.distinct("person_id", {"updated_at": {"$gte": since}})
+        query = {"$or": [{"updated_at": {"$gte": since}}, {"_id": {"$in": voted}}]}
+    cursor = db.persons.find(query, PERSON_FIELDS).sort("_id", 1).batch_size(chunk_size)
+
+    chunk: List[Dict[str, Any]] = []
+    async for person in cursor:
+        chunk.append(person)
+        if len(chunk) >= chunk_size:
+            await reconcile_chunk(db, chunk, settled_before, repair, report)
+            chunk = []
+            if progress:
+                await progress(report["checked"])
+    if chunk:
+        await reconcile_chunk(db, chunk, settled_before, repair, report)
+    if progress:
+        await progress(report["checked"], report["checked"])
+
+    report["started_at"] = started_at
+    report["duration_ms"] = int((time.monotonic() - start) * 1000)
+    logger.info(
+        f"🧾 Counter reconciliation ({report['mode']}): {report['checked']} checked, {report['drifted']} drifted, "
+        f"{report['repaired']} repaired, {report['baselined']} baselined in {report['duration_ms']} ms"
+    )
+    return report
+
+
+async def run_reconciliation(db, full: bool = False, repair: bool = True) -> Dict[str, Any]:
+    """
+    Automated task: reconcile counters of recently touched persons
+    The report is stored in `maintenance_runs`
+    """
+    try:
+        report = await reconcile_counters(db, full=full, repair=repair)
+    except Exception as e:
+        logger.error(f"❌ Counter reconciliation failed: {e}")
+        report = {"error": str(e)}
+    await db.maintenance_runs.insert_one({"job": JOB_NAME, "ran_at": datetime.utcnow(), **report})
+    report.pop("_id", None)
+    return report
+
+
+async def last_reconciliation(db) -> Optional[Dict[str, Any]]:
+    return await db.maintenance_runs.find_one({"job": JOB_NAME}, {"_id": 0}, sort=[("ran_at", -1)])
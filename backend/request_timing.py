@@ -0,0 +1,153 @@
+"""
+Request Timing
+Per-request latency breakdown, returned as a Server-Timing header:
+  - db: total MongoDB command time and number of commands
+  - app: time in the endpoint not spent in MongoDB (Python work, other awaits)
+  - serialize: response validation and JSON encoding after the endpoint returns
+  - total: the whole route handler
+
+With SERVER_TIMING_DEBUG=1, a request sent with `X-Debug-Timing: 1` gets its
+JSON body wrapped as {"data": ..., "timing": {...}}, with per-command detail.
+"""
+
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, List, Optional
+import functools
+import json
+import os
+import time
+
+from fastapi.responses import JSONResponse
+from pymongo import monitoring
+
+DEBUG_ENABLED = os.getenv("SERVER_TIMING_DEBUG", "").lower() in ("1", "true", "yes")
+DEBUG_HEADER = "x-debug-timing"
+
+
+class RequestTiming:
+    __slots__ = ("route", "start", "endpoint_start", "endpoint_end", "db_seconds", "db_count", "commands", "pending",
+                 "closed")
+
+    def __init__(self, route: str = "", debug: bool = False):
+        self.route = route
+        self.start = time.perf_counter()
+        self.endpoint_start = self.endpoint_end = None
+        self.db_seconds = 0.0
+        self.db_count = 0
+        # (command, collection, ms); only collected for debug envelopes
+        self.commands: Optional[List[tuple]] = [] if debug else None
+        self.pending: Dict[int, str] = {}
+        # Set once the response is ready; tasks spawned by the request keep
+        # a reference through their copied context but no longer count
+        self.closed = False
+
+    def breakdown(self, end: float) -> Dict[str, float]:
+        """Milliseconds per phase"""
+        db = self.db_seconds * 1000
+        endpoint = ((self.endpoint_end or end) - (self.endpoint_start or self.start)) * 1000
+        return {
+            "db": db,
+            "app": max(endpoint - db, 0.0),
+            "serialize": (end - self.endpoint_end) * 1000 if self.endpoint_end else 0.0,
+            "total": (end - self.start) * 1000,
+        }
+
+    def header(self, end: float) -> str:
+        phases = self.breakdown(end)
+        return ", ".join(
+            f'{name};dur={ms:.2f}' + (f';desc="{self.db_count} queries"' if name == "db" else "")
+            for name, ms in phases.items()
+        )
+
+
+current_timing: ContextVar[Optional[RequestTiming]] = ContextVar("current_timing", default=None)
+
+
+def active_timing() -> Optional[RequestTiming]:
+    """Timing of the request being handled in this context, if any"""
+    timing = current_timing.get()
+    return None if timing is None or timing.closed else timing
+
+
+def time_endpoint(call: Callable) -> Callable:
+    """Wrap an async endpoint to mark when it starts and returns"""
+    @functools.wraps(call)
+    async def timed_endpoint(*args, **kwargs):
+        timing = current_timing.get()
+        if timing:
+            timing.endpoint_start = time.perf_counter()
+        try:
+            return await call(*args, **kwargs)
+        finally:
+            if timing:
+                timing.endpoint_end = time.perf_counter()
+
+    return timed_endpoint
+
+
+def time_request(handler: Callable, path: str) -> Callable:
+    """Wrap the route handler of `path` to account its requests and attach Server-Timing"""
+    async def timed_handler(request):
+        debug = DEBUG_ENABLED and request.headers.get(DEBUG_HEADER) == "1"
+        timing = RequestTiming(f"{request.method} {path}", debug)
+        token = current_timing.set(timing)
+        try:
+            response = await handler(request)
+        finally:
+            current_timing.reset(token)
+            timing.closed = True
+        end = time.perf_counter()
+        if debug and isinstance(response, JSONResponse):
+            response = _debug_envelope(response, timing, end)
+        response.headers["Server-Timing"] = timing.header(end)
+        return response
+
+    return timed_handler
+
+
+def _debug_envelope(response: JSONResponse, timing: RequestTiming, end: float) -> JSONResponse:
+    body: Dict[str, Any] = {
+        "data": json.loads(response.body),
+        "timing": {
+            **{f"{k}_ms": round(v, 3) for k, v in timing.breakdown(end).items()},
+            "db_count": timing.db_count,
+            "commands": [
+                {"command": c, "collection": coll, "ms": round(ms, 3)} for c, coll, ms in timing.commands
+            ],
+        },
+    }
+    headers = {k: v for k, v in response.headers.items() if k.lower() != "content-length"}
+    return JSONResponse(body, status_code=response.status_code, headers=headers)
+
+
+class TimingListener(monitoring.CommandListener):
+    """Adds each MongoDB command's duration to the request that issued it"""
+
+    def started(self, event):
+        timing = active_timing()
+        if timing is not None and timing.commands is not None:
+            collection = event.command.get(event.command_name)
+            timing.pending[event.request_id] = collection if isinstance(collection, str) else ""
+
+    def succeeded(self, event):
+        self._record(event)
+
+    def failed(self, event):
+        self._record(event)
+
+    def _record(self, event):
+        # Motor runs commands in executor threads with a copy of the caller's
+        # context, so the issuing request's timing is visible here
+        timing = active_timing()
+        if timing is None:
+            return
+        seconds = event.duration_micros / 1e6
+        timing.db_seconds += seconds
+        timing.db_count += 1
+        if timing.commands is not None:
+            collection = timing.pending.pop(event.request_id, "")
+            timing.commands.append((event.command_name, collection, seconds * 1000))
+
+
+# Singleton instance
+timing_listener = TimingListener()
@@ -0,0 +1,179 @@
+"""
+Data Retention and Compaction
+Rolls old raw rows of append-only collections into hourly/daily summaries,
+then deletes them in chunks once they are past their retention period
+"""
+
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+import asyncio
+import logging
+import os
+import time
+
+logger = logging.getLogger(__name__)
+
+# Raw documents older than this many days are summarized then removed
+RETENTION_DAYS = {
+    "person_ticks": int(os.getenv("RETENTION_PERSON_TICKS_DAYS", "90")),
+    "vote_events": int(os.getenv("RETENTION_VOTE_EVENTS_DAYS", "90")),
+    "searches": int(os.getenv("RETENTION_SEARCHES_DAYS", "30")),
+    "status_checks": int(os.getenv("RETENTION_STATUS_CHECKS_DAYS", "7")),
+}
+
+# Timestamp field of each collection
+TIME_FIELDS = {
+    "person_ticks": "created_at",
+    "vote_events": "created_at",
+    "searches": "created_at",
+    "status_checks": "timestamp",
+}
+
+DELETE_CHUNK_SIZE = 5000
+DELETE_PAUSE_SECONDS = 0.05
+
+# Summary pipelines, keyed by raw collection. Each groups rows older than the
+# cutoff into buckets and $merges them. A bucket is first written from complete
+# data and kept as is afterwards, so re-running a rollup after an interrupted
+# delete does not replace it with a summary of the rows that are left.
+ROLLUPS: Dict[str, Dict[str, Any]] = {
+    "person_ticks": {
+        "into": "person_ticks_hourly",
+        "unit": "hour",
+        "group": {
+            "_id": {
+                "person_id": "$person_id",
+                "hour": {"$dateTrunc": {"date": "$created_at", "unit": "hour"}},
+            },
+            "open": {"$first": "$score"},
+            "close": {"$last": "$score"},
+            "min": {"$min": "$score"},
+            "max": {"$max": "$score"},
+            "count": {"$sum": 1},
+        },
+        "project": {"person_id": "$_id.person_id", "hour": "$_id.hour"},
+    },
+    "vote_events": {
+        "into": "vote_events_daily",
+        "unit": "day",
+        "group": {
+            "_id": {
+                "person_id": "$person_id",
+                "day": {"$dateTrunc": {"date": "$created_at", "unit": "day"}},
+            },
+            "up": {"$sum": {"$cond": [{"$gt": ["$delta", 0]}, 1, 0]}},
+            "down": {"$sum": {"$cond": [{"$lt": ["$delta", 0]}, 1, 0]}},
+            "net": {"$sum": "$delta"},
+            "count": {"$sum": 1},
+            "devices": {"$addToSet": "$device_id"},
+        },
+        "project": {"person_id": "$_id.person_id", "day": "$_id.day", "devices": {"$size": "$devices"}},
+    },
+    "searches": {
+        "into": "searches_daily",
+        "unit": "day",
+        "group": {
+            "_id": {
+                "query": "$query",
+                "day": {"$dateTrunc": {"date": "$created_at", "unit": "day"}},
+            },
+            "count": {"$sum": 1},
+        },
+        "project": {"query": "$_id.query", "day": "$_id.day"},
+    },
+}
+
+
+def retention_cutoff(collection: str, now: Optional[datetime] = None) -> datetime:
+    """
+    Oldest timestamp kept raw for a collection
+
+    Aligned to midnight UTC so a summary bucket is never split between two
+    runs (each bucket is rolled up exactly once, from complete data).
+    """
+    now = now or datetime.utcnow()
+    cutoff = now - timedelta(days=RETENTION_DAYS[collection])
+    return cutoff.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+async def rollup(db, collection: str, cutoff: datetime) -> int:
+    """Summarize raw rows older than cutoff; returns the number of buckets written"""
+    spec = ROLLUPS[collection]
+    time_field = TIME_FIELDS[collection]
+    project = {k: 1 for k in spec["group"] if k != "_id"}
+    project.update(spec["project"])
+
+    pipeline: List[Dict[str, Any]] = [
+        {"$match": {time_field: {"$lt": cutoff}}},
+        {"$sort": {time_field: 1}},
+        {"$group": spec["group"]},
+        {"$project": project},
+        {"$merge": {"into": spec["into"], "on": "_id", "whenMatched": "keepExisting", "whenNotMatched": "insert"}},
+    ]
+    before = await db[spec["into"]].estimated_document_count()
+    await db[collection].aggregate(pipeline, allowDiskUse=True).to_list(length=None)
+    after = await db[spec["into"]].estimated_document_count()
+    return after - before
+
+
+async def delete_older_than(db, collection: str, cutoff: datetime) -> int:
+    """Delete raw rows older than cutoff in chunks of _id; returns count removed"""
+    time_field = TIME_FIELDS[collection]
+    removed = 0
+    while True:
+        batch = await db[collection].find(
+            {time_field: {"$lt": cutoff}}, {"_id": 1}
+        ).limit(DELETE_CHUNK_SIZE).to_list(length=DELETE_CHUNK_SIZE)
+        if not batch:
+            break
+        res = await db[collection].delete_many({"_id": {"$in": [d["_id"] for d in batch]}})
+        removed += res.deleted_count
+        await asyncio.sleep(DELETE_PAUSE_SECONDS)
+    return removed
+
+
+async def enforce_retention(db, collection: str) -> Dict[str, Any]:
+    """Roll up then expire one collection; returns a report of the run"""
+    start = time.monotonic()
+    cutoff = retention_cutoff(collection)
+
+    buckets = await rollup(db, collection, cutoff) if collection in ROLLUPS else 0
+    removed = await delete_older_than(db, collection, cutoff)
+
+    report = {
+        "collection": collection,
+        "cutoff": cutoff,
+        "summary_buckets_added": buckets,
+        "removed": removed,
+        "duration_ms": int((time.monotonic() - start) * 1000),
+    }
+    logger.info(
+        f"🧹 Retention {collection}: {removed} removed, {buckets} summary buckets added "
+        f"in {report['duration_ms']} ms (cutoff {cutoff.isoformat()})"
+    )
+    return report
+
+
+async def run_retention(db) -> List[Dict[str, Any]]:
+    """
+    Automated task: enforce retention on every append-only collection
+    Each collection's report is stored in `maintenance_runs`
+    """
+    reports = []
+    for collection in RETENTION_DAYS:
+        try:
+            report = await enforce_retention(db, collection)
+        except Exception as e:
+            logger.error(f"❌ Retention failed for {collection}: {e}")
+            report = {"collection": collection, "error": str(e)}
+        reports.append(report)
+        await db.maintenance_runs.insert_one({"job": "retention", "ran_at": datetime.utcnow(), **report})
+    return reports
+
+
+async def get_hourly_ticks(db, person_id, start: datetime, end: datetime) -> List[Dict[str, Any]]:
+    """Hourly closing scores for a person from the compacted history"""
+    return await db.person_ticks_hourly.find(
+        {"person_id": person_id, "hour": {"$gte": start, "$lt": end}},
+        {"hour": 1, "close": 1}
+    ).sort("hour", 1).to_list(length=None)
@@ -5,14 +5,134 @@ Handles daily tasks like Google Trends refresh
 
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from apscheduler.triggers.cron import CronTrigger
-from datetime import datetime
+from apscheduler.triggers.interval import IntervalTrigger
+from datetime import datetime, timedelta
+from functools import wraps
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
 import logging
+import os
+import socket
+
+from archive import run_archive_export
+from daily_stats import refresh_daily_stats
+from reconcile import run_reconciliation
+from retention import run_retention
+from slow_queries import current_operation
+from trends_refresh import apply_trending_names
 
 logger = logging.getLogger(__name__)
 
 # Global scheduler instance
 scheduler = None
 
+# Global leader lease (only its holder runs scheduled jobs)
+lease = None
+
+LEASE_NAME = "scheduler"
+LEASE_TTL_SECONDS = 30
+LEASE_RENEW_SECONDS = 10
+
+
+class LeaderLease:
+    """
+    Mongo-backed lease lock in the `scheduler_leases` collection
+
+    Every process tries to acquire or renew the lease on a heartbeat. The
+    holder keeps it by renewing before it expires; if the holder dies, the
+    lease expires and the next heartbeat from another process takes over.
+    """
+
+    def __init__(self, db, name=LEASE_NAME, ttl_seconds=LEASE_TTL_SECONDS):
+        self.db = db
+        self.name = name
+        self.ttl = timedelta(seconds=ttl_seconds)
+        self.holder_id = f"{socket.gethostname()}:{os.getpid()}"
+        self._expires_at = None
+
+    @property
+    def is_leader(self) -> bool:
+        # Trust only our local view of the expiry, so a stalled process stops
+        # acting as leader at the same time others may take over
+        return self._expires_at is not None and datetime.utcnow() < self._expires_at
+
+    async def heartbeat(self):
+        """Acquire the lease if it is free or expired, renew it if we hold it"""
+        now = datetime.utcnow()
+        expires_at = now + self.ttl
+        was_leader = self.is_leader
+        try:
+            doc = await self.db.scheduler_leases.find_one_and_update(
+                {
+                    "_id": self.name,
+                    "$or": [{"holder": self.holder_id}, {"expires_at": {"$lte": now}}],
+                },
+                {
+                    "$set": {"holder": self.holder_id, "expires_at": expires_at, "heartbeat_at": now},
+                    "$setOnInsert": {"acquired_at": now},
+                },
+                upsert=True,
+                return_document=ReturnDocument.AFTER,
+            )
+        except DuplicateKeyError:
+            # Lease exists and is held by someone else
+            doc = None
+        except Exception as e:
+            logger.error(f"Leader lease heartbeat error: {e}")
+            return
+
+        if doc and doc.get("holder") == self.holder_id:
+            if not was_leader:
+                await self.db.scheduler_leases.update_one(
+                    {"_id": self.name, "holder": self.holder_id},
+                    {"$set": {"acquired_at": now}}
+                )
+                logger.info(f"👑 Acquired scheduler lease as {self.holder_id}")
+            self._expires_at = expires_at
+        else:
+            if was_leader:
+                logger.warning(f"Lost scheduler lease ({self.holder_id})")
+            self._expires_at = None
+
+    async def release(self):
+        """Give the lease up so another process can take over immediately"""
+        if self._expires_at is None:
+            return
+        self._expires_at = None
+        try:
+            await self.db.scheduler_leases.update_one(
+                {"_id": self.name, "holder": self.holder_id},
+                {"$set": {"expires_at": datetime.utcnow() - timedelta(seconds=1)}}
+            )
+            logger.info("Released scheduler lease")
+        except Exception as e:
+            logger.error(f"Leader lease release error: {e}")
+
+    async def status(self):
+        doc = await self.db.scheduler_leases.find_one({"_id": self.name})
+        if not doc:
+            return {"holder": None, "is_self": False, "expires_at": None, "acquired_at": None}
+        active = doc.get("expires_at") and doc["expires_at"] > datetime.utcnow()
+        return {
+            "holder": doc.get("holder") if active else None,
+            "is_self": bool(active and doc.get("holder") == self.holder_id),
+            "self_id": self.holder_id,
+            "expires_at": doc["expires_at"].isoformat() if doc.get("expires_at") else None,
+            "acquired_at": doc["acquired_at"].isoformat() if doc.get("acquired_at") else None,
+        }
+
+
+def leader_only(func):
+    """Wrap a scheduled job so it only runs in the process holding the lease"""
+    @wraps(func)
+    async def wrapper(*args, **kwargs):
+        if lease is None or not lease.is_leader:
+            logger.info(f"Skipping {func.__name__}: not the scheduler leader")
+            return
+        current_operation.set(f"scheduler:{func.__name__}")
+        return await func(*args, **kwargs)
+    return wrapper
+
 
 def init_scheduler(db, trends_service):
     """
@@ -22,13 +142,24 @@ def init_scheduler(db, trends_service):
         db: MongoDB database instance
         trends_service: GoogleTrendsService instance
     """
-    global scheduler
+    global scheduler, lease
     
     scheduler = AsyncIOScheduler()
+    lease = LeaderLease(db)
+    
+    # Leader election heartbeat (runs in every process)
+    scheduler.add_job(
+        lease.heartbeat,
+        IntervalTrigger(seconds=LEASE_RENEW_SECONDS),
+        id='leader_lease_heartbeat',
+        name='Scheduler Leader Lease Heartbeat',
+        next_run_time=datetime.now(),
+        replace_existing=True
+    )
     
     # Daily Google Trends refresh at 3:00 AM UTC
     scheduler.add_job(
-        refresh_google_trends,
+        leader_only(refresh_google_trends),
         CronTrigger(hour=3, minute=0),  # 3:00 AM UTC every day
         args=[db, trends_service],
         id='daily_trends_refresh',
@@ -36,6 +167,46 @@ def init_scheduler(db, trends_service):
         replace_existing=True
     )
     
+    # Daily Parquet archive of closed partitions at 2:30 AM UTC (before retention)
+    scheduler.add_job(
+        leader_only(run_archive_export),
+        CronTrigger(hour=2, minute=30),
+        args=[db],
+        id='daily_archive_export',
+        name='Daily Parquet Archive Export',
+        replace_existing=True
+    )
+    
+    # Daily retention / compaction of append-only collections at 4:00 AM UTC
+    scheduler.add_job(
+        leader_only(run_retention),
+        CronTrigger(hour=4, minute=0),
+        args=[db],
+        id='daily_retention',
+        name='Daily Data Retention & Compaction',
+        replace_existing=True
+    )
+    
+    # Materialized report stats, refreshed every 10 minutes
+    scheduler.add_job(
+        leader_only(refresh_daily_stats),
+        IntervalTrigger(minutes=10),
+        args=[db],
+        id='daily_stats_refresh',
+        name='Daily Stats Materializer',
+        replace_existing=True
+    )
+    
+    # Vote counter reconciliation of recently touched persons, hourly
+    scheduler.add_job(
+        leader_only(run_reconciliation),
+        IntervalTrigger(hours=1),
+        args=[db],
+        id='hourly_counter_reconciliation',
+        name='Hourly Vote Counter Reconciliation',
+        replace_existing=True
+    )
+    
     logger.info("Scheduler initialized with daily tasks")
     logger.info("Next Google Trends refresh scheduled at 3:00 AM UTC")
     
@@ -50,84 +221,16 @@ async def refresh_google_trends(db, trends_service):
     try:
         logger.info("🔥 Starting automated Google Trends refresh...")
         
-        # Fetch trending personalities
-        trending_names = trends_service.get_trending_personalities(limit=20)
+        # Fetch trending personalities (off the event loop)
+        trending_names = await trends_service.get_trending_personalities_async(limit=20)
         
         if not trending_names:
             logger.warning("No trending personalities found")
             return
         
-        added_count = 0
-        updated_count = 0
-        now = datetime.utcnow()
-        
-        # Unmark all existing trending personalities
-        await db.persons.update_many(
-            {"is_trending": True},
-            {"$set": {"is_trending": False}}
-        )
-        logger.info("Unmarked all previous trending personalities")
-        
-        for name in trending_names:
-            # Slugify name
-            slug = name.strip().lower()
-            slug = ''.join(c for c in slug if c.isalnum() or c == ' ')
-            slug = slug.replace(' ', '-')
-            
-            # Check if person exists
-            existing = await db.persons.find_one({"slug": slug})
-            
-            if existing:
-                # Mark as trending
-                await db.persons.update_one(
-                    {"_id": existing["_id"]},
-                    {
-                        "$set": {
-                            "is_trending": True,
-                            "trending_since": now,
-                            "updated_at": now,
-                        }
-                    }
-                )
-                updated_count += 1
-                logger.info(f"✅ Marked as trending: {name}")
-            else:
-                # Auto-add new trending personality
-                person_doc = {
-                    "name": name,
-                    "slug": slug,
-                    "category": "other",
-                    "approved": True,
-                    "created_at": now,
-                    "updated_at": now,
-                    "score": 50.0,
-                    "likes": 0,
-                    "dislikes": 0,
-                    "total_votes": 0,
-                    "source": "trending",
-                    "is_trending": True,
-                    "trending_since": now,
-                }
-                
-                from bson import ObjectId
-                result = await db.persons.insert_one(person_doc)
-                
-                # Add initial tick
-                await db.person_ticks.insert_one({
-                    "person_id": result.inserted_id,
-                    "score": 50.0,
-                    "created_at": now
-                })
-                
-                added_count += 1
-                logger.info(f"➕ Auto-added trending: {name}")
-        
-        # Update last refresh timestamp
-        await db.app_settings.update_one(
-            {"_id": "global"},
-            {"$set": {"last_trends_refresh": now}},
-            upsert=True
-        )
+        result = await apply_trending_names(db, trending_names)
+        added_count = result["added"]
+        updated_count = result["updated"]
         
         logger.info(f"🎉 Automated trends refresh complete: {added_count} added, {updated_count} updated")
         
@@ -149,3 +252,9 @@ def shutdown_scheduler():
     if scheduler and scheduler.running:
         scheduler.shutdown(wait=False)
         logger.info("Scheduler shut down")
+
+
+async def release_leadership():
+    """Release the leader lease on shutdown so failover is immediate"""
+    if lease:
+        await lease.release()
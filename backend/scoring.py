@@ -0,0 +1,122 @@
+"""
+Person Scoring
+The single place where a person's score and controversy are derived from
+its vote counts. Every writer of likes/dislikes sets the fields returned by
+`score_fields`, so the rules below hold for the whole catalog.
+
+  - score: like ratio on a 0-100 scale, rounded to the nearest SCORE_STEP
+    (0, 25, 50, 75, 100); a person without votes is neutral (50)
+  - controversy: min(likes, dislikes) / total, i.e. how close to a 50/50
+    split (0 to 0.5); 0 below CONTROVERSY_MIN_VOTES votes
+
+`recompute_all` re-applies the rules to every person in one vectorized pass
+and writes only the rows whose stored values differ, so a rule change
+reaches the whole catalog in seconds.
+"""
+
+from typing import Any, Dict
+import logging
+import time
+
+import numpy as np
+from pymongo import UpdateOne
+
+logger = logging.getLogger(__name__)
+
+SCORE_STEP = 25
+NEUTRAL_SCORE = 50.0
+CONTROVERSY_MIN_VOTES = 10
+
+RECOMPUTE_BATCH_SIZE = 1000
+
+
+def compute_score(likes: int, dislikes: int) -> float:
+    total = likes + dislikes
+    if total <= 0:
+        return NEUTRAL_SCORE
+    # Python's round() and np.round both round halves to even, keep them in step
+    return float(max(0, min(100, round(likes / total * 100 / SCORE_STEP) * SCORE_STEP)))
+
+
+def compute_controversy(likes: int, dislikes: int) -> float:
+    total = likes + dislikes
+    if total < CONTROVERSY_MIN_VOTES:
+        return 0.0
+    return min(likes, dislikes) / total
+
+
+def score_fields(likes: int, dislikes: int) -> Dict[str, float]:
+    """Derived fields to `$set` alongside new vote counts"""
+    return {"score": compute_score(likes, dislikes), "controversy": compute_controversy(likes, dislikes)}
+
+
+def score_array(likes: np.ndarray, dislikes: np.ndarray) -> np.ndarray:
+    """Vectorized compute_score"""
+    likes = np.maximum(likes, 0).astype(np.float64)
+    total = likes + np.maximum(dislikes, 0)
+    ratio = np.divide(likes, total, out=np.zeros_like(total), where=total > 0)
+    scores = np.clip(np.round(ratio * 100 / SCORE_STEP) * SCORE_STEP, 0, 100)
+    return np.where(total > 0, scores, NEUTRAL_SCORE)
+
+
+def controversy_array(likes: np.ndarray, dislikes: np.ndarray) -> np.ndarray:
+    """Vectorized compute_controversy"""
+    likes = np.maximum(likes, 0).astype(np.float64)
+    dislikes = np.maximum(dislikes, 0).astype(np.float64)
+    total = likes + dislikes
+    ratio = np.divide(np.minimum(likes, dislikes), total, out=np.zeros_like(total), where=total > 0)
+    return np.where(total >= CONTROVERSY_MIN_VOTES, ratio, 0.0)
+
+
+async def recompute_all(db, batch_size: int = RECOMPUTE_BATCH_SIZE, progress=None) -> Dict[str, Any]:
+    """
+    Recompute score and controversy for every person from its likes/dislikes
+
+    Counts are loaded with a narrow projection, scores are computed for all
+    persons at once, and only changed rows are written (bulk_write batches).
+    `progress(done, total)` is awaited after each batch when given.
+    """
+    start = time.monotonic()
+    docs = await db.persons.find(
+        {}, {"likes": 1, "dislikes": 1, "score": 1, "controversy": 1}
+    ).to_list(length=None)
+
+    ids = [d["_id"] for d in docs]
+    likes = np.fromiter((int(d.get("likes") or 0) for d in docs), dtype=np.int64, count=len(docs))
+    dislikes = np.fromiter((int(d.get("dislikes") or 0) for d in docs), dtype=np.int64, count=len(docs))
+    # NaN marks a missing field, which always counts as changed
+    stored_score = np.fromiter((_number(d.get("score")) for d in docs), dtype=np.float64, count=len(docs))
+    stored_controversy = np.fromiter((_number(d.get("controversy")) for d in docs), dtype=np.float64, count=len(docs))
+
+    scores = score_array(likes, dislikes)
+    controversy = controversy_array(likes, dislikes)
+    changed = np.flatnonzero(
+        ~np.isclose(stored_score, scores) | ~np.isclose(stored_controversy, controversy)
+    )
+
+    updated = 0
+    for offset in range(0, len(changed), batch_size):
+        # Only write if the counts are still the ones scored here; a vote landing
+        # meanwhile has set score and controversy itself
+        ops = [
+            UpdateOne(
+                {"_id": ids[i], "likes": docs[i].get("likes"), "dislikes": docs[i].get("dislikes")},
+                {"$set": {"score": float(scores[i]), "controversy": float(controversy[i])}},
+            )
+            for i in changed[offset:offset + batch_size]
+        ]
+        result = await db.persons.bulk_write(ops, ordered=False)
+        updated += result.modified_count
+        if progress:
+            await progress(offset + len(ops), len(changed))
+
+    elapsed = time.monotonic() - start
+    logger.info(f"🧮 Recomputed scores for {len(docs)} persons in {elapsed:.2f}s, {len(changed)} changed")
+    return {"persons": len(docs), "changed": int(len(changed)), "updated": updated, "seconds": round(elapsed, 3)}
+
+
+def _number(value) -> float:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return float("nan")
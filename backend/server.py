@@ -1,4 +1,5 @@
-from fastapi import FastAPI, APIRouter, HTTPException, Header, Query
+from fastapi import FastAPI, APIRouter, HTTPException, Header, Query, Request
+from fastapi.responses import JSONResponse, PlainTextResponse
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
 from motor.motor_asyncio import AsyncIOMotorClient
@@ -11,8 +12,27 @@ import uuid
 from datetime import datetime, timedelta
 from bson import ObjectId
 import re
-from trends_service import trends_service
-from scheduler import init_scheduler, start_scheduler, shutdown_scheduler
+import asyncio
+import heapq
+import itertools
+from trends_service import trends_service, TRENDS_SNAPSHOT_MAX_AGE
+from scheduler import init_scheduler, start_scheduler, shutdown_scheduler, release_leadership
+from activity import activity_tail
+from settings_cache import settings_cache
+from admin_stats import admin_stats_cache
+from jobs import job_runner, job_to_dict
+from person_cleanup import cascade_delete_person
+from retention import get_hourly_ticks, retention_cutoff
+from trends_refresh import apply_trending_names
+from utils import slugify
+from indexes import start_index_sync, index_report, last_sync
+from metrics import InstrumentedRoute, mongo_metrics, registry as metrics_registry
+from request_timing import timing_listener
+from profiler import profiler, ProfilerBusy, MAX_DURATION_SECONDS as MAX_PROFILE_SECONDS
+from slow_queries import slow_query_log
+from scoring import score_fields, recompute_all
+from reconcile import run_reconciliation, last_reconciliation
+from vote_shards import vote_shards
 
 
 ROOT_DIR = Path(__file__).parent
@@ -20,14 +40,20 @@ load_dotenv(ROOT_DIR / '.env')
 
 # MongoDB connection
 mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
+client = AsyncIOMotorClient(mongo_url, event_listeners=[mongo_metrics, timing_listener, slow_query_log])
 db = client[os.environ['DB_NAME']]
 
 # Create the main app without a prefix
 app = FastAPI()
 
-# Create a router with the /api prefix
-api_router = APIRouter(prefix="/api")
+# Create a router with the /api prefix; its routes record request metrics and Server-Timing
+api_router = APIRouter(prefix="/api", route_class=InstrumentedRoute)
+
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Request and MongoDB metrics in Prometheus text exposition format"""
+    return PlainTextResponse(metrics_registry.exposition(), media_type="text/plain; version=0.0.4")
 
 
 # -------------------- Startup & Shutdown Events --------------------
@@ -50,6 +76,13 @@ async def shutdown_event():
     """Shutdown scheduler gracefully"""
     logger.info("🛑 Shutting down Popular API...")
     shutdown_scheduler()
+    await release_leadership()
+    trends_service.shutdown()
+    admin_stats_cache.shutdown()
+    settings_cache.shutdown()
+    await job_runner.shutdown()
+    slow_query_log.shutdown()
+    vote_shards.shutdown()
     logger.info("✅ Scheduler shut down successfully")
 
 
@@ -68,14 +101,6 @@ class PyObjectId(ObjectId):
         return ObjectId(v)
 
 
-def slugify(name: str) -> str:
-    s = name.strip().lower()
-    s = re.sub(r"[^a-z0-9\s-]", "", s)
-    s = re.sub(r"[\s-]+", "-", s)
-    s = s.strip('-')
-    return s
-
-
 def now_utc() -> datetime:
     return datetime.utcnow()
 
@@ -96,6 +121,17 @@ def parse_window(window: str) -> timedelta:
         raise ValueError(f"Unsupported time unit: {unit}")
 
 
+def parse_recent_window(window: str) -> timedelta:
+    """Parse the minutes/hours window ('60m', '24h') taken by charts and search suggestions; 400 otherwise"""
+    m = re.match(r"^(\d+)([mh])$", window)
+    if not m:
+        raise HTTPException(status_code=400, detail="Invalid window; use like '60m' or '24h'")
+    value, unit = int(m.group(1)), m.group(2)
+    if unit == 'm':
+        return timedelta(minutes=value)
+    return timedelta(hours=value)
+
+
 # -------------------- Pydantic Models --------------------
 class StatusCheck(BaseModel):
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
@@ -199,21 +235,6 @@ SEED_PEOPLE = [
 ]
 
 
-async def ensure_indexes():
-    # persons
-    await db.persons.create_index("slug", unique=True)
-    await db.persons.create_index([("approved", 1), ("total_votes", -1), ("score", -1)])
-    await db.persons.create_index([("name", "text")])
-    # votes (one per device/person)
-    await db.votes.create_index([("person_id", 1), ("device_id", 1)], unique=True)
-    # vote_events for time window aggregations
-    await db.vote_events.create_index([("created_at", 1), ("person_id", 1)])
-    # ticks for charts
-    await db.person_ticks.create_index([("person_id", 1), ("created_at", 1)])
-    # searches for suggestions
-    await db.searches.create_index([("created_at", 1), ("query", 1)])
-
-
 async def seed_people():
     count = await db.persons.count_documents({})
     if count > 0:
@@ -229,7 +250,7 @@ async def seed_people():
             "approved": True,
             "created_at": now,
             "updated_at": now,
-            "score": 100.0,
+            **score_fields(0, 0),
             "likes": 0,
             "dislikes": 0,
             "total_votes": 0,
@@ -239,7 +260,7 @@ async def seed_people():
         # insert initial ticks
         tick_docs = [{
             "person_id": oid,
-            "score": 100.0,
+            "score": docs[0]["score"],
             "created_at": now
         } for oid in res.inserted_ids]
         if tick_docs:
@@ -248,8 +269,19 @@ async def seed_people():
 
 @app.on_event("startup")
 async def on_startup():
-    await ensure_indexes()
+    # before the index sync, which would create activity_events uncapped
+    await activity_tail.start(db)
+    start_index_sync(db)
+    slow_query_log.start(client)
+    vote_shards.start(db)
     await seed_people()
+    await settings_cache.start(db)
+    await job_runner.start(db)
+    # persons written before controversy was stored need it for /controversial;
+    # every worker starts here, so only submit if no other one has already
+    if await db.persons.find_one({"total_votes": {"$gt": 0}, "controversy": {"$exists": False}}, {"_id": 1}):
+        if not await job_runner.find_active("recompute_scores"):
+            await job_runner.submit("recompute_scores")
 
 
 # -------------------- Routes --------------------
@@ -346,15 +378,17 @@ async def add_person(body: PersonCreate):
         "approved": True,  # basic moderation on later
         "created_at": now,
         "updated_at": now,
-        "score": 50,  # Neutral starting score
+        **score_fields(0, 0),  # Neutral starting score
         "likes": 0,
         "dislikes": 0,
         "total_votes": 0,
         "source": "user_added",  # Mark as user-added personality
     }
     res = await db.persons.insert_one(doc)
-    await db.person_ticks.insert_one({"person_id": res.inserted_id, "score": 50, "created_at": now})
+    await db.person_ticks.insert_one({"person_id": res.inserted_id, "score": doc["score"], "created_at": now})
     doc["_id"] = res.inserted_id
+    await activity_tail.record(db, "person_added", id=str(res.inserted_id), name=name, source="user_added",
+                               score=doc["score"])
     return person_to_out(doc)
 
 
@@ -439,34 +473,31 @@ async def vote_person(person_id: str, body: VoteIn, x_device_id: Optional[str] =
             "updated_at": now_utc(),
         })
 
-    # Calculate new score based on likes and dislikes ratio
-    # Simple system with scores in multiples of 25: 0, 25, 50, 75, 100
+    # Score and controversy from the new like/dislike counts
     new_likes = int(person.get("likes", 0)) + inc_doc.get("likes", 0)
     new_dislikes = int(person.get("dislikes", 0)) + inc_doc.get("dislikes", 0)
-    new_total_votes = int(person.get("total_votes", 0)) + inc_doc.get("total_votes", 0)
-    
-    # Calculate score based on like ratio, rounded to nearest 25
-    if new_total_votes > 0:
-        # Calculate percentage of likes (0 to 1)
-        like_ratio = new_likes / new_total_votes
-        
-        # Convert to 0-100 scale
-        raw_score = like_ratio * 100
-        
-        # Round to nearest 25 (0, 25, 50, 75, 100)
-        new_score = round(raw_score / 25) * 25
-        
-        # Ensure score stays within bounds
-        new_score = max(0, min(100, new_score))
-    else:
-        new_score = 50  # Neutral starting score
-    
+    derived = score_fields(new_likes, new_dislikes)
+
+    if vote_shards.enabled:
+        # Sharded mode: counters reach the person at the next fold, which
+        # also writes the score and the chart tick; answer with an estimate
+        await vote_shards.increment(db, oid, inc_doc)
+        await write_vote_event(oid, x_device_id, int(delta))
+        return VoteOut(
+            id=str(oid),
+            score=derived["score"],
+            likes=new_likes,
+            dislikes=new_dislikes,
+            total_votes=int(person.get("total_votes", 0)) + inc_doc.get("total_votes", 0),
+            voted_value=new_val,
+        )
+
     # Update person aggregates with calculated score
     await db.persons.update_one(
         {"_id": oid},
-        {"$inc": inc_doc, "$set": {"score": new_score, "updated_at": now_utc()}}
+        {"$inc": inc_doc, "$set": {**derived, "updated_at": now_utc()}}
     )
-    await db.person_ticks.insert_one({"person_id": oid, "score": new_score, "created_at": now_utc()})
+    await db.person_ticks.insert_one({"person_id": oid, "score": derived["score"], "created_at": now_utc()})
     await write_vote_event(oid, x_device_id, int(delta))
 
     # fetch updated person
@@ -492,15 +523,7 @@ async def get_chart(person_id: str, window: str = Query(default="24h")):
     if not person:
         raise HTTPException(status_code=404, detail="Person not found")
 
-    # parse window
-    m = re.match(r"^(\d+)([mh])$", window)
-    if not m:
-        raise HTTPException(status_code=400, detail="Invalid window; use like '60m' or '24h'")
-    value, unit = int(m.group(1)), m.group(2)
-    if unit == 'm':
-        start = now_utc() - timedelta(minutes=value)
-    else:
-        start = now_utc() - timedelta(hours=value)
+    start = now_utc() - parse_recent_window(window)
 
     cursor = db.person_ticks.find({
         "person_id": oid,
@@ -508,12 +531,23 @@ async def get_chart(person_id: str, window: str = Query(default="24h")):
     }).sort("created_at", 1)
     ticks = await cursor.to_list(length=2000)
 
+    # Older than the retention period, only hourly summaries remain
+    points = []
+    raw_cutoff = retention_cutoff("person_ticks")
+    if start < raw_cutoff:
+        hourly = await get_hourly_ticks(db, oid, start, raw_cutoff)
+        points = [{"t": h["hour"].isoformat() + "Z", "score": float(h["close"])} for h in hourly]
+        # Raw ticks of a summarized hour are still there when retention has
+        # rolled them up but not deleted them yet
+        summarized = {h["hour"] for h in hourly}
+        ticks = [t for t in ticks if t["created_at"].replace(minute=0, second=0, microsecond=0) not in summarized]
+
     # Ensure we at least return the latest point if none in window
-    if not ticks:
+    if not ticks and not points:
         latest = await db.person_ticks.find({"person_id": oid}).sort("created_at", -1).limit(1).to_list(1)
         ticks = latest or []
 
-    points = [{"t": t["created_at"].isoformat() + "Z", "score": float(t.get("score", person.get("score", 100.0)))} for t in ticks]
+    points += [{"t": t["created_at"].isoformat() + "Z", "score": float(t.get("score", person.get("score", 100.0)))} for t in ticks]
     return ChartOut(id=str(person["_id"]), name=person.get("name"), points=points)
 
 
@@ -590,38 +624,13 @@ async def get_trending_now(limit: int = Query(default=5, le=10)):
 @api_router.get("/controversial", response_model=List[PersonOut])
 async def get_controversial(limit: int = Query(default=5, le=20)):
     """Get most controversial personalities (lots of opposing votes)"""
-    # Find persons with both high likes AND high dislikes
+    # Controversy (how close to a 50/50 split) is maintained by the writers,
+    # see scoring.py; it is 0 below the minimum vote count
     cursor = db.persons.find({
         "approved": True,
-        "total_votes": {"$gte": 10}  # Minimum 10 votes
-    })
-    persons = await cursor.to_list(length=1000)
-    
-    # Calculate controversy score: min(likes, dislikes) / total_votes
-    # Higher score = more balanced opposition
-    controversial = []
-    for p in persons:
-        likes = int(p.get("likes", 0))
-        dislikes = int(p.get("dislikes", 0))
-        total = int(p.get("total_votes", 0))
-        
-        if total >= 10:
-            # Controversy = how close to 50/50 split
-            controversy_score = min(likes, dislikes) / total
-            controversial.append({
-                "person": p,
-                "controversy": controversy_score
-            })
-    
-    # Sort by controversy score
-    controversial.sort(key=lambda x: x["controversy"], reverse=True)
-    
-    # Return top N
-    result = []
-    for item in controversial[:limit]:
-        result.append(person_to_out(item["person"]))
-    
-    return result
+        "controversy": {"$gt": 0},
+    }).sort("controversy", -1).limit(limit)
+    return [person_to_out(p) for p in await cursor.to_list(length=limit)]
 
 
 class SearchIn(BaseModel):
@@ -671,14 +680,7 @@ async def search_people(query: str = Query(..., min_length=1), limit: int = Quer
 
 @api_router.get("/search-suggestions")
 async def search_suggestions(window: str = Query(default="24h"), limit: int = Query(default=10, le=20)):
-    m = re.match(r"^(\d+)([mh])$", window)
-    if not m:
-        raise HTTPException(status_code=400, detail="Invalid window; use like '60m' or '24h'")
-    value, unit = int(m.group(1)), m.group(2)
-    if unit == 'm':
-        start = now_utc() - timedelta(minutes=value)
-    else:
-        start = now_utc() - timedelta(hours=value)
+    start = now_utc() - parse_recent_window(window)
 
     pipeline = [
         {"$match": {"created_at": {"$gte": start}}},
@@ -698,14 +700,7 @@ async def search_suggestions_by_category(window: str = Query(default="24h"), per
     Returns top searched names within window, joined to persons, split by category.
     Shape: { politics: ["..."], culture: ["..."], business: ["..."] }
     """
-    m = re.match(r"^(\d+)([mh])$", window)
-    if not m:
-        raise HTTPException(status_code=400, detail="Invalid window; use like '60m' or '24h'")
-    value, unit = int(m.group(1)), m.group(2)
-    if unit == 'm':
-        start = now_utc() - timedelta(minutes=value)
-    else:
-        start = now_utc() - timedelta(hours=value)
+    start = now_utc() - parse_recent_window(window)
 
     pipeline = [
         {"$match": {"created_at": {"$gte": start}}},
@@ -851,6 +846,8 @@ async def purchase_credits(purchase: CreditPurchase):
         }
         
         await db.credit_transactions.insert_one(transaction)
+        await activity_tail.record(db, "purchase", user_id=purchase.user_id, amount=purchase.amount,
+                                   description=transaction["description"])
         
         # Update user balance
         user_credits = await db.user_credits.find_one({"user_id": purchase.user_id})
@@ -908,47 +905,35 @@ async def use_credit(vote: PremiumVote, user_id: str = Header(...)):
             raise HTTPException(status_code=400, detail="Insufficient credits")
         
         # Get person
-        person_doc = await db.people.find_one({"_id": ObjectId(vote.person_id)})
+        try:
+            person_oid = ObjectId(vote.person_id)
+        except Exception:
+            raise HTTPException(status_code=400, detail="Invalid person id")
+        person_doc = await db.persons.find_one({"_id": person_oid})
         if not person_doc:
             raise HTTPException(status_code=404, detail="Person not found")
         
         # Apply x100 vote
-        multiplied_vote = vote.vote * vote.multiplier
-        
-        # Update person stats
-        current_likes = person_doc.get("likes", 0)
-        current_dislikes = person_doc.get("dislikes", 0)
+        side = "likes" if vote.vote > 0 else "dislikes"
+        inc_doc = {"likes": 0, "dislikes": 0, "total_votes": vote.multiplier}
+        inc_doc[side] = vote.multiplier
+        # no vote documents back these counts, see reconcile.py
+        inc_doc[f"extra_{side}"] = vote.multiplier
+        new_likes = int(person_doc.get("likes", 0)) + inc_doc["likes"]
+        new_dislikes = int(person_doc.get("dislikes", 0)) + inc_doc["dislikes"]
+        derived = score_fields(new_likes, new_dislikes)
         
-        if vote.vote > 0:
-            current_likes += vote.multiplier
-        else:
-            current_dislikes += vote.multiplier
-        
-        total = current_likes + current_dislikes
-        raw_score = (current_likes / total * 100) if total > 0 else 50.0
-        rounded = round(raw_score / 25) * 25
-        
-        await db.people.update_one(
-            {"_id": ObjectId(vote.person_id)},
-            {
-                "$set": {
-                    "likes": current_likes,
-                    "dislikes": current_dislikes,
-                    "total_votes": total,
-                    "score": float(rounded),
-                    "last_updated": datetime.utcnow()
-                }
-            }
+        await db.persons.update_one(
+            {"_id": person_oid},
+            {"$inc": inc_doc, "$set": {**derived, "updated_at": now_utc()}}
         )
         
-        # Record tick (x100 votes)
-        for _ in range(vote.multiplier):
-            await db.ticks.insert_one({
-                "person_id": vote.person_id,
-                "vote": vote.vote,
-                "score": float(rounded),
-                "created_at": datetime.utcnow()
-            })
+        # One chart tick for the whole x100 vote
+        await db.person_ticks.insert_one({
+            "person_id": person_oid,
+            "score": derived["score"],
+            "created_at": now_utc()
+        })
         
         # Deduct credit
         new_balance = user_credits["balance"] - 1
@@ -967,12 +952,14 @@ async def use_credit(vote: PremiumVote, user_id: str = Header(...)):
             "timestamp": datetime.utcnow(),
             "status": "completed"
         })
+        await activity_tail.record(db, "use", user_id=user_id,
+                                   description=f"Premium vote x{vote.multiplier} for {vote.person_name}")
         
         return {
             "success": True,
             "new_balance": new_balance,
             "votes_applied": vote.multiplier,
-            "new_score": float(rounded)
+            "new_score": derived["score"]
         }
         
     except HTTPException:
@@ -1030,10 +1017,12 @@ async def boost_myself(request: BoostMyselfRequest):
             "approved": True,
             "created_at": now,
             "updated_at": now,
-            "score": 100.0,  # 100% likes = 100 score
+            **score_fields(100, 0),  # 100% likes = 100 score
             "likes": 100,  # Booster applies 100 likes
             "dislikes": 0,
             "total_votes": 100,
+            "extra_likes": 100,
+            "extra_dislikes": 0,
             "source": "self_boosted",  # Mark as self-boosted user
         }
         
@@ -1064,6 +1053,9 @@ async def boost_myself(request: BoostMyselfRequest):
             "timestamp": now_utc(),
             "status": "completed"
         })
+        await activity_tail.record(db, "person_added", id=str(person_id), name=name, source="self_boosted", score=100.0)
+        await activity_tail.record(db, "use", user_id=request.user_id,
+                                   description=f"Boosted myself as '{name}' with 100 votes")
         
         return {
             "success": True,
@@ -1086,78 +1078,9 @@ async def boost_myself(request: BoostMyselfRequest):
 
 @api_router.get("/admin/stats")
 async def get_admin_stats():
-    """Get global statistics for admin dashboard"""
+    """Get global statistics for admin dashboard (cached snapshot, refreshed in the background)"""
     try:
-        # Total people
-        total_people = await db.persons.count_documents({})
-        
-        # Total votes across all people
-        pipeline_votes = [
-            {
-                "$group": {
-                    "_id": None,
-                    "total_votes": {"$sum": "$total_votes"},
-                    "total_likes": {"$sum": "$likes"},
-                    "total_dislikes": {"$sum": "$dislikes"},
-                }
-            }
-        ]
-        vote_result = await db.persons.aggregate(pipeline_votes).to_list(1)
-        total_votes = vote_result[0]["total_votes"] if vote_result else 0
-        
-        # Active users 24h (count unique user_ids from credit_transactions in last 24h)
-        yesterday = now_utc() - timedelta(days=1)
-        active_users_pipeline = [
-            {"$match": {"timestamp": {"$gte": yesterday}}},
-            {"$group": {"_id": "$user_id"}},
-            {"$count": "count"}
-        ]
-        active_users_result = await db.credit_transactions.aggregate(active_users_pipeline).to_list(1)
-        active_users_24h = active_users_result[0]["count"] if active_users_result else 0
-        
-        # Revenue 24h (sum of purchases in last 24h)
-        revenue_pipeline = [
-            {
-                "$match": {
-                    "type": "purchase",
-                    "timestamp": {"$gte": yesterday}
-                }
-            },
-            {
-                "$lookup": {
-                    "from": "credit_packs",
-                    "let": {"pack_name": "$description"},
-                    "pipeline": [],
-                    "as": "pack_info"
-                }
-            },
-            {
-                "$group": {
-                    "_id": None,
-                    "total_revenue": {"$sum": 0.99}  # Simple estimate for now
-                }
-            }
-        ]
-        revenue_result = await db.credit_transactions.aggregate(revenue_pipeline).to_list(1)
-        # Count purchases and multiply by average price
-        purchases_24h = await db.credit_transactions.count_documents({
-            "type": "purchase",
-            "timestamp": {"$gte": yesterday}
-        })
-        revenue_24h = round(purchases_24h * 0.99, 2)  # Assuming average is 0.99€
-        
-        # New people added in 24h
-        new_people_24h = await db.persons.count_documents({
-            "created_at": {"$gte": yesterday}
-        })
-        
-        return {
-            "total_people": total_people,
-            "total_votes": total_votes,
-            "active_users_24h": active_users_24h,
-            "revenue_24h": f"{revenue_24h:.2f}",
-            "new_people_24h": new_people_24h,
-        }
+        return await admin_stats_cache.get(db)
         
     except Exception as e:
         logger.error(f"Admin stats error: {e}")
@@ -1189,7 +1112,8 @@ async def admin_boost_votes(request: AdminBoostRequest):
             new_dislikes = person.get("dislikes", 0) + request.amount
         
         new_total = new_likes + new_dislikes
-        new_score = (new_likes / new_total * 100) if new_total > 0 else 100.0
+        derived = score_fields(new_likes, new_dislikes)
+        new_score = derived["score"]
         
         await db.persons.update_one(
             {"_id": person_id},
@@ -1198,9 +1122,10 @@ async def admin_boost_votes(request: AdminBoostRequest):
                     "likes": new_likes,
                     "dislikes": new_dislikes,
                     "total_votes": new_total,
-                    "score": new_score,
+                    **derived,
                     "updated_at": now_utc(),
-                }
+                },
+                "$inc": {f"extra_{request.type}": request.amount},
             }
         )
         
@@ -1229,27 +1154,34 @@ async def admin_boost_votes(request: AdminBoostRequest):
 
 # -------------------- Admin: Moderation --------------------
 
-@api_router.delete("/admin/person/{person_id}")
+async def run_delete_person_job(ctx, person_id: str):
+    """Job: delete a personality and cascade to every collection referencing it"""
+    person = await db.persons.find_one({"_id": ObjectId(person_id)}, {"name": 1})
+    person_name = person.get("name") if person else None
+
+    removed = await cascade_delete_person(db, person_id, progress=ctx.progress)
+
+    return {"deleted": True, "person_name": person_name, "removed": removed}
+
+
+@api_router.delete("/admin/person/{person_id}", status_code=202)
 async def admin_delete_person(person_id: str):
-    """Admin-only: Delete a personality completely"""
+    """Admin-only: Delete a personality completely (runs as a background job)"""
     try:
         obj_id = ObjectId(person_id)
-        person = await db.persons.find_one({"_id": obj_id})
+        person = await db.persons.find_one({"_id": obj_id}, {"name": 1})
         
         if not person:
             raise HTTPException(status_code=404, detail="Person not found")
         
         person_name = person.get("name")
-        
-        # Delete the person
-        await db.persons.delete_one({"_id": obj_id})
-        
-        # Delete all their ticks
-        await db.person_ticks.delete_many({"person_id": obj_id})
+        job_id = await job_runner.submit("delete_person", {"person_id": person_id})
         
         return {
             "success": True,
-            "message": f"'{person_name}' has been deleted permanently",
+            "job_id": job_id,
+            "status": "queued",
+            "message": f"Deletion of '{person_name}' has been scheduled",
             "person_name": person_name,
         }
         
@@ -1272,7 +1204,10 @@ async def admin_reset_person(person_id: str):
         
         person_name = person.get("name")
         
-        # Reset to neutral state
+        # Reset to neutral state; votes are cleared too so the counters stay
+        # consistent with them (devices can vote again)
+        await db.votes.delete_many({"person_id": obj_id})
+        await db.vote_shards.delete_many({"person_id": obj_id})
         await db.persons.update_one(
             {"_id": obj_id},
             {
@@ -1280,7 +1215,9 @@ async def admin_reset_person(person_id: str):
                     "likes": 0,
                     "dislikes": 0,
                     "total_votes": 0,
-                    "score": 50.0,
+                    "extra_likes": 0,
+                    "extra_dislikes": 0,
+                    **score_fields(0, 0),
                     "updated_at": now_utc(),
                 }
             }
@@ -1309,57 +1246,103 @@ async def admin_reset_person(person_id: str):
 
 # -------------------- Admin: Activity Feed --------------------
 
+def _iso(dt: Optional[datetime]) -> Optional[str]:
+    return dt.isoformat() if dt else None
+
+
+def _page_before(field: str, before: datetime, before_id: Optional[ObjectId]) -> Dict[str, Any]:
+    """Filter for documents strictly older than the (before, before_id) position, newest-first order"""
+    if before_id is None:
+        return {field: {"$lt": before}}
+    return {field: {"$lte": before}, "$nor": [{field: before, "_id": {"$gte": before_id}}]}
+
+
 @api_router.get("/admin/activity/recent")
-async def admin_get_recent_activity():
-    """Admin-only: Get recent activity (votes, new people, purchases)"""
+async def admin_get_recent_activity(
+    limit: int = Query(default=50, le=200),
+    before: Optional[datetime] = Query(default=None),
+    before_id: Optional[str] = Query(default=None),
+):
+    """
+    Admin-only: Get recent activity (new people, purchases, credit uses)
+    `stream` merges all three by (time, id), newest first; pass its
+    `next_before` and `next_before_id` back as `before` and `before_id` to get
+    the next page, so events sharing a timestamp are neither lost nor repeated.
+    """
+    if before_id is not None and (before is None or not ObjectId.is_valid(before_id)):
+        raise HTTPException(status_code=400, detail="before_id needs a valid id and a before timestamp")
     try:
-        # Last 50 person additions (last 7 days)
+        before = before or now_utc() + timedelta(seconds=1)
+        before_oid = ObjectId(before_id) if before_id else None
+        # Person additions are limited to the last 7 days
         week_ago = now_utc() - timedelta(days=7)
-        recent_people = await db.persons.find(
-            {"created_at": {"$gte": week_ago}},
-            {"name": 1, "source": 1, "created_at": 1, "score": 1}
-        ).sort("created_at", -1).limit(50).to_list(50)
-        
-        # Last 50 credit transactions
-        recent_purchases = await db.credit_transactions.find(
-            {"type": "purchase"},
-            {"user_id": 1, "amount": 1, "description": 1, "timestamp": 1}
-        ).sort("timestamp", -1).limit(50).to_list(50)
-        
-        # Last 50 credit uses
-        recent_uses = await db.credit_transactions.find(
-            {"type": "use"},
-            {"user_id": 1, "description": 1, "timestamp": 1}
-        ).sort("timestamp", -1).limit(50).to_list(50)
+        people_page = _page_before("created_at", before, before_oid)
+        people_page["created_at"]["$gte"] = week_ago
+        
+        # Three independent, index-backed, projected queries run concurrently
+        recent_people, recent_purchases, recent_uses = await asyncio.gather(
+            db.persons.find(
+                people_page,
+                {"name": 1, "source": 1, "created_at": 1, "score": 1}
+            ).sort([("created_at", -1), ("_id", -1)]).limit(limit).to_list(limit),
+            db.credit_transactions.find(
+                {"type": "purchase", **_page_before("timestamp", before, before_oid)},
+                {"user_id": 1, "amount": 1, "description": 1, "timestamp": 1}
+            ).sort([("timestamp", -1), ("_id", -1)]).limit(limit).to_list(limit),
+            db.credit_transactions.find(
+                {"type": "use", **_page_before("timestamp", before, before_oid)},
+                {"user_id": 1, "description": 1, "timestamp": 1}
+            ).sort([("timestamp", -1), ("_id", -1)]).limit(limit).to_list(limit),
+        )
+        
+        people_out = [
+            {
+                "id": str(p["_id"]),
+                "name": p.get("name"),
+                "source": p.get("source", "seed"),
+                "score": p.get("score", 50),
+                "created_at": _iso(p.get("created_at")),
+            }
+            for p in recent_people
+        ]
+        purchases_out = [
+            {
+                "id": str(t["_id"]),
+                "user_id": t.get("user_id"),
+                "amount": t.get("amount"),
+                "description": t.get("description"),
+                "timestamp": _iso(t.get("timestamp")),
+            }
+            for t in recent_purchases
+        ]
+        uses_out = [
+            {
+                "id": str(t["_id"]),
+                "user_id": t.get("user_id"),
+                "description": t.get("description"),
+                "timestamp": _iso(t.get("timestamp")),
+            }
+            for t in recent_uses
+        ]
+        
+        # Each list is already sorted newest first: merge them lazily
+        stream = list(itertools.islice(heapq.merge(
+            ({"type": "person_added", "at": p["created_at"], **p} for p in people_out),
+            ({"type": "purchase", "at": t["timestamp"], **t} for t in purchases_out),
+            ({"type": "use", "at": t["timestamp"], **t} for t in uses_out),
+            key=lambda e: (e["at"] or "", e["id"]),
+            reverse=True,
+        ), limit))
+        last = stream[-1] if len(stream) == limit else None
         
         return {
-            "recent_people": [
-                {
-                    "id": str(p["_id"]),
-                    "name": p.get("name"),
-                    "source": p.get("source", "seed"),
-                    "score": p.get("score", 50),
-                    "created_at": p.get("created_at").isoformat() if p.get("created_at") else None,
-                }
-                for p in recent_people
-            ],
-            "recent_purchases": [
-                {
-                    "user_id": t.get("user_id"),
-                    "amount": t.get("amount"),
-                    "description": t.get("description"),
-                    "timestamp": t.get("timestamp").isoformat() if t.get("timestamp") else None,
-                }
-                for t in recent_purchases
-            ],
-            "recent_uses": [
-                {
-                    "user_id": t.get("user_id"),
-                    "description": t.get("description"),
-                    "timestamp": t.get("timestamp").isoformat() if t.get("timestamp") else None,
-                }
-                for t in recent_uses
-            ],
+            "recent_people": people_out,
+            "recent_purchases": purchases_out,
+            "recent_uses": uses_out,
+            "stream": stream,
+            "next_before": last["at"] if last else None,
+            "next_before_id": last["id"] if last else None,
+            "live_cursor": await activity_tail.last_cursor(db),
         }
         
     except Exception as e:
@@ -1367,6 +1350,18 @@ async def admin_get_recent_activity():
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@api_router.get("/admin/activity/live")
+async def admin_get_live_activity(since: Optional[str] = Query(default=None),
+                                  limit: int = Query(default=100, le=500)):
+    """Admin-only: Activity recorded by any worker after the `since` cursor"""
+    try:
+        events = await activity_tail.since(db, since, limit)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    cursor = events[-1]["cursor"] if events else since
+    return {"events": events, "cursor": cursor}
+
+
 # -------------------- Admin: Advanced Search --------------------
 
 @api_router.get("/admin/search")
@@ -1483,10 +1478,13 @@ async def admin_update_settings(settings: AppSettings):
                     "super_booster_votes": settings.super_booster_votes,
                     "maintenance_mode": settings.maintenance_mode,
                     "updated_at": now_utc(),
-                }
+                },
+                # Other workers poll this to know when to reload their cache
+                "$inc": {"version": 1},
             },
             upsert=True
         )
+        await settings_cache.load(db)
         
         return {
             "success": True,
@@ -1501,100 +1499,49 @@ async def admin_update_settings(settings: AppSettings):
 
 # -------------------- Google Trends Integration --------------------
 
-@api_router.post("/admin/refresh-trends")
+async def run_refresh_trends_job(ctx):
+    """
+    Job: fetch trending personalities from Google Trends and update the database
+    """
+    logger.info("Starting manual trends refresh...")
+    
+    # Fetch trending personalities from Google Trends (off the event loop),
+    # reusing a recent snapshot when an admin refreshes repeatedly
+    trending_names = await trends_service.get_trending_personalities_async(limit=20, max_age=TRENDS_SNAPSHOT_MAX_AGE)
+    
+    if not trending_names:
+        return {
+            "message": "No trending personalities found",
+            "trending_names": [],
+            "added": 0,
+            "updated": 0,
+        }
+    
+    result = await apply_trending_names(db, trending_names)
+    await ctx.progress(1, 1)
+    
+    return {
+        "message": f"Trends refreshed: {result['added']} added, {result['updated']} updated",
+        "trending_names": result["trending_names"],
+        "added": result["added"],
+        "updated": result["updated"],
+        "timestamp": result["timestamp"].isoformat(),
+    }
+
+
+@api_router.post("/admin/refresh-trends", status_code=202)
 async def admin_refresh_trends():
     """
     Admin-only: Manually trigger Google Trends refresh
-    Fetches trending personalities and updates the database
+    Returns a job id; poll /api/admin/jobs/{job_id} for the outcome
     """
     try:
-        logger.info("Starting manual trends refresh...")
-        
-        # Fetch trending personalities from Google Trends
-        trending_names = trends_service.get_trending_personalities(limit=20)
-        
-        if not trending_names:
-            return {
-                "success": True,
-                "message": "No trending personalities found",
-                "added": 0,
-                "updated": 0,
-            }
-        
-        added_count = 0
-        updated_count = 0
-        now = now_utc()
-        
-        # First, unmark all existing trending personalities
-        await db.persons.update_many(
-            {"is_trending": True},
-            {"$set": {"is_trending": False}}
-        )
-        
-        for name in trending_names:
-            slug = slugify(name)
-            
-            # Check if person already exists
-            existing = await db.persons.find_one({"slug": slug})
-            
-            if existing:
-                # Mark as trending
-                await db.persons.update_one(
-                    {"_id": existing["_id"]},
-                    {
-                        "$set": {
-                            "is_trending": True,
-                            "trending_since": now,
-                            "updated_at": now,
-                        }
-                    }
-                )
-                updated_count += 1
-                logger.info(f"Marked as trending: {name}")
-            else:
-                # Auto-add new trending personality
-                person_doc = {
-                    "name": name,
-                    "slug": slug,
-                    "category": "other",  # Default category
-                    "approved": True,
-                    "created_at": now,
-                    "updated_at": now,
-                    "score": 50.0,
-                    "likes": 0,
-                    "dislikes": 0,
-                    "total_votes": 0,
-                    "source": "trending",  # Mark as auto-added from trends
-                    "is_trending": True,
-                    "trending_since": now,
-                }
-                
-                result = await db.persons.insert_one(person_doc)
-                
-                # Add initial tick
-                await db.person_ticks.insert_one({
-                    "person_id": result.inserted_id,
-                    "score": 50.0,
-                    "created_at": now
-                })
-                
-                added_count += 1
-                logger.info(f"Auto-added trending personality: {name}")
-        
-        # Update last refresh timestamp
-        await db.app_settings.update_one(
-            {"_id": "global"},
-            {"$set": {"last_trends_refresh": now}},
-            upsert=True
-        )
-        
+        job_id = await job_runner.submit("refresh_trends")
         return {
             "success": True,
-            "message": f"Trends refreshed: {added_count} added, {updated_count} updated",
-            "trending_names": trending_names,
-            "added": added_count,
-            "updated": updated_count,
-            "timestamp": now.isoformat(),
+            "job_id": job_id,
+            "status": "queued",
+            "message": "Trends refresh scheduled",
         }
         
     except Exception as e:
@@ -1630,9 +1577,9 @@ async def get_trending_personalities():
 
 @api_router.get("/admin/scheduler-status")
 async def admin_get_scheduler_status():
-    """Admin-only: Get scheduler status and next run time"""
+    """Admin-only: Get scheduler status, next run time and leader lease holder"""
     try:
-        from scheduler import scheduler
+        from scheduler import scheduler, lease
         
         if not scheduler or not scheduler.running:
             return {
@@ -1659,6 +1606,7 @@ async def admin_get_scheduler_status():
         return {
             "running": True,
             "jobs": job_info,
+            "leader": await lease.status() if lease else None,
             "last_trends_refresh": last_refresh.isoformat() if last_refresh else None,
         }
         
@@ -1667,6 +1615,64 @@ async def admin_get_scheduler_status():
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@api_router.get("/admin/indexes")
+async def admin_indexes():
+    """Admin-only: Index usage since last server restart, with unused/redundant/undeclared flags"""
+    try:
+        return {
+            "last_sync": last_sync,
+            "collections": await index_report(db),
+        }
+    except Exception as e:
+        logger.error(f"Index report error: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@api_router.get("/admin/slow-queries")
+async def admin_slow_queries(limit: int = Query(default=50, le=500)):
+    """Admin-only: Recent slow MongoDB commands grouped by query shape, with sampled plans"""
+    return {
+        "threshold_ms": slow_query_log.threshold_ms,
+        "buffered": len(slow_query_log.entries),
+        "shapes": slow_query_log.report(limit),
+    }
+
+
+@api_router.get("/admin/profile")
+async def admin_profile(
+    seconds: float = Query(default=10, gt=0, le=MAX_PROFILE_SECONDS),
+    route: Optional[str] = Query(default=None),
+    method: str = Query(default="GET"),
+    output: Literal["collapsed", "speedscope"] = Query(default="collapsed", alias="format"),
+    include_idle: bool = Query(default=False),
+):
+    """
+    Admin-only: Sample the event loop for `seconds` and return the profile
+
+    `route` (a path template such as /api/trending-now) keeps only samples
+    taken while that endpoint is on the stack.
+    """
+    code = None
+    if route:
+        endpoint = next(
+            (r.endpoint for r in app.routes
+             if getattr(r, "path", None) == route and method.upper() in getattr(r, "methods", ())),
+            None,
+        )
+        if endpoint is None:
+            raise HTTPException(status_code=404, detail=f"No route {method.upper()} {route}")
+        code = endpoint.__code__
+    try:
+        profile = await profiler.profile_loop(seconds, code, include_idle)
+    except ProfilerBusy as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+    logger.info(f"🔬 Profile done: {sum(profile.stacks.values())}/{profile.samples_taken} samples kept")
+    if output == "speedscope":
+        return JSONResponse(profile.speedscope(name=route or "event loop"))
+    return PlainTextResponse(profile.collapsed())
+
+
 # Mapping of sports personalities that need category correction
 SPORTS_PERSONALITIES = [
     "Lionel Messi", "Cristiano Ronaldo", "Serena Williams", "LeBron James",
@@ -1702,46 +1708,56 @@ async def admin_fix_categories():
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@api_router.post("/admin/initialize-votes")
-async def admin_initialize_votes():
-    """Admin-only: Initialize existing personalities with realistic vote counts"""
+async def run_initialize_votes_job(ctx):
+    """Job: initialize existing personalities with realistic vote counts"""
     import random
-    try:
-        # Find all personalities with 0 or very low votes
-        low_vote_persons = await db.persons.find({
-            "total_votes": {"$lt": 100},
-            "source": {"$ne": "self_boosted"}  # Don't touch self-boosted
-        }).to_list(1000)
-        
-        updated_count = 0
-        for person in low_vote_persons:
-            # Generate random initial votes between 8000 and 15000
-            initial_votes = random.randint(8000, 15000)
-            like_ratio = random.uniform(0.40, 0.80)
-            initial_likes = int(initial_votes * like_ratio)
-            initial_dislikes = initial_votes - initial_likes
-            raw_score = like_ratio * 100
-            initial_score = round(raw_score / 25) * 25
-            initial_score = max(0, min(100, initial_score))
-            
-            await db.persons.update_one(
-                {"_id": person["_id"]},
-                {
-                    "$set": {
-                        "likes": initial_likes,
-                        "dislikes": initial_dislikes,
-                        "total_votes": initial_votes,
-                        "score": float(initial_score),
-                        "updated_at": now_utc(),
-                    }
-                }
-            )
-            updated_count += 1
+    # Find all personalities with 0 or very low votes
+    low_vote_persons = await db.persons.find({
+        "total_votes": {"$lt": 100},
+        "source": {"$ne": "self_boosted"}  # Don't touch self-boosted
+    }).to_list(1000)
+    
+    updated_count = 0
+    for person in low_vote_persons:
+        # Generate random initial votes between 8000 and 15000
+        initial_votes = random.randint(8000, 15000)
+        like_ratio = random.uniform(0.40, 0.80)
+        initial_likes = int(initial_votes * like_ratio)
+        initial_dislikes = initial_votes - initial_likes
         
+        await db.persons.update_one(
+            {"_id": person["_id"]},
+            {
+                "$set": {
+                    "likes": initial_likes,
+                    "dislikes": initial_dislikes,
+                    "total_votes": initial_votes,
+                    **score_fields(initial_likes, initial_dislikes),
+                    "updated_at": now_utc(),
+                },
+                # the next reconciliation re-baselines the extra counts
+                "$unset": {"extra_likes": "", "extra_dislikes": ""},
+            }
+        )
+        updated_count += 1
+        await ctx.progress(updated_count, len(low_vote_persons))
+    
+    return {
+        "message": f"Initialized vote counts for {updated_count} personalities",
+        "updated_count": updated_count,
+    }
+
+
+@api_router.post("/admin/initialize-votes", status_code=202)
+async def admin_initialize_votes():
+    """Admin-only: Initialize existing personalities with realistic vote counts (background job)"""
+    try:
+        job_id = await job_runner.submit("initialize_votes")
         return {
             "success": True,
-            "message": f"Initialized vote counts for {updated_count} personalities",
-            "updated_count": updated_count,
+            "job_id": job_id,
+            "status": "queued",
+            "message": "Vote initialization scheduled",
         }
         
     except Exception as e:
@@ -1749,10 +1765,6 @@ async def admin_initialize_votes():
         raise HTTPException(status_code=500, detail=str(e))
 
 
-        logger.error(f"Admin update settings error: {e}")
-        raise HTTPException(status_code=500, detail=str(e))
-
-
 
 
 
@@ -1760,92 +1772,14 @@ async def admin_initialize_votes():
 # -------------------- Daily Report --------------------
 
 from email_service import email_service
+from daily_stats import get_history, get_rolling_stats, stats_to_report
 
 @api_router.post("/reports/daily")
 async def send_daily_report(to_email: str = Query(default="didier@coffeeandfilms.com")):
     """Génère et envoie le rapport quotidien par email"""
     try:
-        # Calculer la période (dernières 24h)
-        now = datetime.utcnow()
-        yesterday = now - timedelta(days=1)
-        
-        # 1. Stats générales
-        total_people = await db.people.count_documents({})
-        new_people_24h = await db.people.count_documents({
-            "created_at": {"$gte": yesterday}
-        })
-        
-        # 2. Votes des dernières 24h
-        votes_24h = await db.ticks.count_documents({
-            "created_at": {"$gte": yesterday}
-        })
-        
-        # 3. Utilisateurs actifs (basé sur les device_ids dans votes)
-        active_users_pipeline = [
-            {"$match": {"created_at": {"$gte": yesterday}}},
-            {"$group": {"_id": "$person_id"}},
-            {"$count": "count"}
-        ]
-        active_users_result = await db.votes.aggregate(active_users_pipeline).to_list(length=1)
-        active_users_24h = active_users_result[0]["count"] if active_users_result else 0
-        
-        # 4. Monétisation
-        credits_sold_pipeline = [
-            {"$match": {
-                "timestamp": {"$gte": yesterday},
-                "type": "purchase"
-            }},
-            {"$group": {
-                "_id": None,
-                "total_credits": {"$sum": "$amount"},
-                "total_revenue": {"$sum": "$price"}
-            }}
-        ]
-        monetization = await db.credit_transactions.aggregate(credits_sold_pipeline).to_list(length=1)
-        
-        credits_sold_24h = monetization[0]["total_credits"] if monetization else 0
-        revenue_24h = f"{monetization[0]['total_revenue']:.2f}" if monetization else "0.00"
-        
-        # Votes premium utilisés
-        premium_votes_24h = await db.credit_transactions.count_documents({
-            "timestamp": {"$gte": yesterday},
-            "type": "use"
-        })
-        
-        # 5. Top 5 personnalités (par votes dans les dernières 24h)
-        top_people_pipeline = [
-            {"$match": {"created_at": {"$gte": yesterday}}},
-            {"$group": {
-                "_id": "$person_id",
-                "votes_count": {"$sum": 1}
-            }},
-            {"$sort": {"votes_count": -1}},
-            {"$limit": 5}
-        ]
-        top_people_ids = await db.ticks.aggregate(top_people_pipeline).to_list(length=5)
-        
-        top_people = []
-        for item in top_people_ids:
-            person = await db.people.find_one({"_id": ObjectId(item["_id"])})
-            if person:
-                top_people.append({
-                    "name": person.get("name", "Unknown"),
-                    "votes_24h": item["votes_count"],
-                    "score": int(person.get("score", 0))
-                })
-        
-        # Préparer les données pour le template
-        stats = {
-            "date": now.strftime("%d/%m/%Y"),
-            "total_people": total_people,
-            "votes_24h": votes_24h,
-            "new_people_24h": new_people_24h,
-            "active_users_24h": active_users_24h,
-            "credits_sold_24h": credits_sold_24h,
-            "revenue_24h": revenue_24h,
-            "premium_votes_24h": premium_votes_24h,
-            "top_people": top_people
-        }
+        # Stats des dernières 24h (précalculées, recalculées si périmées)
+        stats = stats_to_report(await get_rolling_stats(db))
         
         # Envoyer l'email
         await email_service.send_daily_report(to_email, stats)
@@ -1866,160 +1800,236 @@ async def send_daily_report(to_email: str = Query(default="didier@coffeeandfilms
 async def get_daily_stats():
     """Retourne les stats quotidiennes sans envoyer d'email (pour prévisualisation)"""
     try:
-        now = datetime.utcnow()
-        yesterday = now - timedelta(days=1)
-        
-        # Stats générales
-        total_people = await db.people.count_documents({})
-        new_people_24h = await db.people.count_documents({
-            "created_at": {"$gte": yesterday}
-        })
-        votes_24h = await db.ticks.count_documents({
-            "created_at": {"$gte": yesterday}
-        })
+        return stats_to_report(await get_rolling_stats(db))
         
-        active_users_pipeline = [
-            {"$match": {"created_at": {"$gte": yesterday}}},
-            {"$group": {"_id": "$person_id"}},
-            {"$count": "count"}
-        ]
-        active_users_result = await db.votes.aggregate(active_users_pipeline).to_list(length=1)
-        active_users_24h = active_users_result[0]["count"] if active_users_result else 0
-        
-        # Monétisation
-        credits_sold_pipeline = [
-            {"$match": {
-                "timestamp": {"$gte": yesterday},
-                "type": "purchase"
-            }},
-            {"$group": {
-                "_id": None,
-                "total_credits": {"$sum": "$amount"},
-                "total_revenue": {"$sum": "$price"}
-            }}
+    except Exception as e:
+        logger.error(f"Failed to get stats: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@api_router.get("/reports/history")
+async def get_stats_history(days: int = Query(default=30, le=365)):
+    """Stats précalculées par jour (UTC) pour les graphiques historiques"""
+    try:
+        docs = await get_history(db, days)
+        return [
+            {**stats_to_report(d), "day": d["day"].strftime("%Y-%m-%d"), "final": d.get("final", False)}
+            for d in docs
         ]
-        monetization = await db.credit_transactions.aggregate(credits_sold_pipeline).to_list(length=1)
         
-        credits_sold_24h = monetization[0]["total_credits"] if monetization else 0
-        revenue_24h = monetization[0]["total_revenue"] if monetization else 0.0
+    except Exception as e:
+        logger.error(f"Failed to get stats history: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+async def run_init_votes_job(ctx):
+    """Job: initialize all personalities with random votes (8,500-12,000)"""
+    import random
+    # Get all persons
+    persons = await db.persons.find({}).to_list(length=1000)
+    
+    updated_count = 0
+    now = now_utc()
+    
+    # Generate unique vote counts for each person
+    used_votes = set()
+    
+    for person in persons:
+        # Generate unique random votes between 8,500 and 12,000
+        while True:
+            base_votes = random.randint(8500, 12000)
+            if base_votes not in used_votes:
+                used_votes.add(base_votes)
+                break
+        
+        # Random like ratio between 45% and 75%
+        like_ratio = random.uniform(0.45, 0.75)
+        likes = int(base_votes * like_ratio)
+        dislikes = base_votes - likes
         
-        premium_votes_24h = await db.credit_transactions.count_documents({
-            "timestamp": {"$gte": yesterday},
-            "type": "use"
-        })
+        derived = score_fields(likes, dislikes)
         
-        # Top 5
-        top_people_pipeline = [
-            {"$match": {"created_at": {"$gte": yesterday}}},
-            {"$group": {
-                "_id": "$person_id",
-                "votes_count": {"$sum": 1}
-            }},
-            {"$sort": {"votes_count": -1}},
-            {"$limit": 5}
-        ]
-        top_people_ids = await db.ticks.aggregate(top_people_pipeline).to_list(length=5)
-        
-        top_people = []
-        for item in top_people_ids:
-            person = await db.people.find_one({"_id": ObjectId(item["_id"])})
-            if person:
-                top_people.append({
-                    "name": person.get("name", "Unknown"),
-                    "votes_24h": item["votes_count"],
-                    "score": int(person.get("score", 0))
-                })
+        # Update the person
+        await db.persons.update_one(
+            {"_id": person["_id"]},
+            {
+                "$set": {
+                    "likes": likes,
+                    "dislikes": dislikes,
+                    "total_votes": base_votes,
+                    **derived,
+                    "updated_at": now
+                },
+                # the next reconciliation re-baselines the extra counts
+                "$unset": {"extra_likes": "", "extra_dislikes": ""},
+            }
+        )
+        
+        # Add a tick for the chart
+        await db.person_ticks.insert_one({
+            "person_id": person["_id"],
+            "score": derived["score"],
+            "created_at": now
+        })
         
+        updated_count += 1
+        await ctx.progress(updated_count, len(persons))
+    
+    return {
+        "message": f"Initialized {updated_count} personalities with random votes (8,500-12,000)",
+        "updated_count": updated_count
+    }
+
+
+@api_router.post("/admin/init-votes", status_code=202)
+async def init_votes():
+    """Initialize all personalities with random votes (8,500-12,000) to make the app look active"""
+    try:
+        job_id = await job_runner.submit("init_votes")
         return {
-            "date": now.strftime("%d/%m/%Y"),
-            "total_people": total_people,
-            "votes_24h": votes_24h,
-            "new_people_24h": new_people_24h,
-            "active_users_24h": active_users_24h,
-            "credits_sold_24h": credits_sold_24h,
-            "revenue_24h": f"{revenue_24h:.2f}",
-            "premium_votes_24h": premium_votes_24h,
-            "top_people": top_people
+            "success": True,
+            "job_id": job_id,
+            "status": "queued",
+            "message": "Random vote initialization scheduled",
         }
         
     except Exception as e:
-        logger.error(f"Failed to get stats: {e}")
+        logger.error(f"Failed to init votes: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@api_router.post("/admin/init-votes")
-async def init_votes():
-    """Initialize all personalities with random votes (8,500-12,000) to make the app look active"""
-    import random
+async def run_reconcile_counters_job(ctx, full: bool = True, repair: bool = True):
+    """Job: rebuild person vote counters from the votes collection"""
+    return await run_reconciliation(db, full=full, repair=repair)
+
+
+@api_router.post("/admin/reconcile-counters", status_code=202)
+async def admin_reconcile_counters(full: bool = Query(default=True), dry_run: bool = Query(default=False)):
+    """Admin-only: Compare person counters with the votes collection and repair drift (background job)"""
     try:
-        # Get all persons
-        persons = await db.persons.find({}).to_list(length=1000)
-        
-        updated_count = 0
-        now = now_utc()
+        job_id = await job_runner.submit("reconcile_counters", {"full": full, "repair": not dry_run})
+        return {
+            "success": True,
+            "job_id": job_id,
+            "status": "queued",
+            "message": "Counter reconciliation scheduled",
+        }
         
-        # Generate unique vote counts for each person
-        used_votes = set()
-        
-        for person in persons:
-            # Generate unique random votes between 8,500 and 12,000
-            while True:
-                base_votes = random.randint(8500, 12000)
-                if base_votes not in used_votes:
-                    used_votes.add(base_votes)
-                    break
-            
-            # Random like ratio between 45% and 75%
-            like_ratio = random.uniform(0.45, 0.75)
-            likes = int(base_votes * like_ratio)
-            dislikes = base_votes - likes
-            
-            # Calculate score
-            score = (likes / base_votes) * 100 if base_votes > 0 else 50.0
-            
-            # Update the person
-            await db.persons.update_one(
-                {"_id": person["_id"]},
-                {
-                    "$set": {
-                        "likes": likes,
-                        "dislikes": dislikes,
-                        "total_votes": base_votes,
-                        "score": score,
-                        "updated_at": now
-                    }
-                }
-            )
-            
-            # Add a tick for the chart
-            await db.person_ticks.insert_one({
-                "person_id": person["_id"],
-                "score": score,
-                "created_at": now
-            })
-            
-            updated_count += 1
+    except Exception as e:
+        logger.error(f"Failed to schedule counter reconciliation: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@api_router.get("/admin/reconcile-counters")
+async def admin_last_reconciliation():
+    """Admin-only: Report of the latest counter reconciliation run"""
+    try:
+        return await last_reconciliation(db) or {}
         
+    except Exception as e:
+        logger.error(f"Admin reconciliation report error: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+async def run_recompute_scores_job(ctx):
+    """Job: re-apply the scoring rules to every person"""
+    return await recompute_all(db, progress=ctx.progress)
+
+
+@api_router.post("/admin/recompute-scores", status_code=202)
+async def admin_recompute_scores():
+    """Admin-only: Recompute score and controversy of all personalities from their vote counts (background job)"""
+    try:
+        job_id = await job_runner.submit("recompute_scores")
         return {
             "success": True,
-            "message": f"Initialized {updated_count} personalities with random votes (8,500-12,000)",
-            "updated_count": updated_count
+            "job_id": job_id,
+            "status": "queued",
+            "message": "Score recomputation scheduled",
         }
         
     except Exception as e:
-        logger.error(f"Failed to init votes: {e}")
+        logger.error(f"Failed to schedule score recomputation: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+# -------------------- Admin: Background Jobs --------------------
+
+job_runner.register("refresh_trends", run_refresh_trends_job, resumable=True)
+job_runner.register("initialize_votes", run_initialize_votes_job, resumable=True)
+job_runner.register("init_votes", run_init_votes_job)
+job_runner.register("delete_person", run_delete_person_job, resumable=True)
+job_runner.register("recompute_scores", run_recompute_scores_job, resumable=True)
+job_runner.register("reconcile_counters", run_reconcile_counters_job, resumable=True)
+
+
+@api_router.get("/admin/jobs")
+async def admin_list_jobs(limit: int = Query(default=20, le=100)):
+    """Admin-only: List the most recent background jobs"""
+    try:
+        jobs = await db.jobs.find({}).sort("created_at", -1).limit(limit).to_list(limit)
+        return [job_to_dict(j) for j in jobs]
+        
+    except Exception as e:
+        logger.error(f"Admin list jobs error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@api_router.get("/admin/jobs/{job_id}")
+async def admin_get_job(job_id: str):
+    """Admin-only: Get status, progress, timing and result of a background job"""
+    job = await job_runner.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job_to_dict(job)
+
+
+# -------------------- Settings Enforcement --------------------
+
+# Endpoints that create personalities, gated by allow_user_additions
+USER_ADDITION_ROUTES = {("POST", "/api/people"), ("POST", "/api/boost-myself")}
+
+
+def enforce_app_settings(method: str, path: str) -> Optional[JSONResponse]:
+    """Response refusing the request under maintenance_mode or allow_user_additions, if any"""
+    if settings_cache.maintenance_mode and path.startswith("/api/") and path != "/api/" and not path.startswith("/api/admin/"):
+        return JSONResponse(status_code=503, content={"detail": "Popular is under maintenance, please try again later"})
+    if not settings_cache.allow_user_additions and (method, path.rstrip("/")) in USER_ADDITION_ROUTES:
+        return JSONResponse(status_code=403, content={"detail": "Adding personalities is currently disabled"})
+    return None
+
+
+class AppSettingsMiddleware:
+    """
+    Applies the in-memory app settings to every request
+    Plain ASGI: @app.middleware("http") (BaseHTTPMiddleware) runs each request
+    in its own task group with wrapped streams, the costliest layer on the path
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http":
+            refusal = enforce_app_settings(scope["method"], scope["path"])
+            if refusal is not None:
+                await refusal(scope, receive, send)
+                return
+        await self.app(scope, receive, send)
+
+
 # Include the router in the main app
 app.include_router(api_router)
 
+app.add_middleware(AppSettingsMiddleware)
+
 app.add_middleware(
     CORSMiddleware,
     allow_credentials=True,
     allow_origins=["*"],
     allow_methods=["*"],
-    allow_headers=["*"]
+    allow_headers=["*"],
+    expose_headers=["Server-Timing"],
 )
 
 # Configure logging
@@ -0,0 +1,72 @@
+"""
+Settings Cache
+Keeps the global `app_settings` document in memory so request paths can
+consult it at zero database cost. Writers bump a `version` field; every
+process polls that single field and reloads when it changes, so all workers
+converge within SETTINGS_POLL_SECONDS.
+"""
+
+from typing import Any, Dict, Optional
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+SETTINGS_POLL_SECONDS = 5
+
+DEFAULT_SETTINGS = {
+    "allow_user_additions": True,
+    "booster_price": 0.99,
+    "super_booster_price": 4.99,
+    "booster_votes": 100,
+    "super_booster_votes": 1000,
+    "maintenance_mode": False,
+}
+
+
+class SettingsCache:
+    def __init__(self):
+        self.settings: Dict[str, Any] = dict(DEFAULT_SETTINGS)
+        self.version = None
+        self._poller: Optional[asyncio.Task] = None
+
+    def get(self, key: str) -> Any:
+        return self.settings.get(key, DEFAULT_SETTINGS.get(key))
+
+    @property
+    def maintenance_mode(self) -> bool:
+        return bool(self.get("maintenance_mode"))
+
+    @property
+    def allow_user_additions(self) -> bool:
+        return bool(self.get("allow_user_additions"))
+
+    async def load(self, db):
+        doc = await db.app_settings.find_one({"_id": "global"}) or {}
+        self.settings = {key: doc.get(key, default) for key, default in DEFAULT_SETTINGS.items()}
+        self.version = doc.get("version", 0)
+
+    async def start(self, db):
+        """Load settings and start polling for changes made by other workers"""
+        await self.load(db)
+        self._poller = asyncio.create_task(self._poll(db))
+        logger.info(f"Settings loaded (version {self.version}, maintenance_mode={self.maintenance_mode})")
+
+    async def _poll(self, db):
+        while True:
+            await asyncio.sleep(SETTINGS_POLL_SECONDS)
+            try:
+                doc = await db.app_settings.find_one({"_id": "global"}, {"version": 1})
+                if (doc or {}).get("version", 0) != self.version:
+                    await self.load(db)
+                    logger.info(f"Settings reloaded (version {self.version})")
+            except Exception as e:
+                logger.error(f"Settings poll error: {e}")
+
+    def shutdown(self):
+        if self._poller:
+            self._poller.cancel()
+
+
+# Singleton instance
+settings_cache = SettingsCache()
@@ -0,0 +1,209 @@
+"""
+Slow Query Log
+A CommandListener that keeps every MongoDB command slower than
+SLOW_QUERY_MS in a ring buffer, with the route or scheduled task that issued
+it, its query shape (values replaced by "?"), duration and documents
+returned. The first time a shape turns up slow, its plan is captured with
+`explain` (queryPlanner only, the query is not re-run) in the background.
+"""
+
+from collections import deque
+from contextvars import ContextVar
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+import asyncio
+import json
+import logging
+import os
+
+from pymongo import monitoring
+
+from request_timing import active_timing
+
+logger = logging.getLogger(__name__)
+
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "100"))
+SLOW_QUERY_BUFFER = int(os.getenv("SLOW_QUERY_BUFFER", "1000"))
+# Distinct shapes whose plans are kept
+MAX_EXPLAINED_SHAPES = 500
+EXPLAIN_INTERVAL_SECONDS = 5
+
+# Commands whose filter/pipeline is worth a shape and an explain
+SHAPED = {
+    "find": ("filter", "sort", "projection"),
+    "aggregate": ("pipeline",),
+    "count": ("query",),
+    "distinct": ("key", "query"),
+    "findAndModify": ("query", "sort"),
+}
+IGNORED = {"explain", "hello", "isMaster", "ping", "endSessions", "killCursors"}
+
+# Name of the scheduled task or job issuing commands outside a request
+current_operation: ContextVar[Optional[str]] = ContextVar("current_operation", default=None)
+
+
+def normalize(value: Any) -> Any:
+    """Keep the structure of a query, replace literal values with "?" """
+    if isinstance(value, dict):
+        return {k: normalize(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        # $in: [...] and friends: one placeholder whatever the length
+        items = [normalize(v) for v in value]
+        if all(item == "?" for item in items):
+            return ["?"] if items else []
+        return items
+    return "?"
+
+
+def query_shape(command_name: str, command: Dict[str, Any]) -> str:
+    collection = command.get(command_name)
+    if command_name in SHAPED:
+        parts = {field: normalize(command[field]) for field in SHAPED[command_name] if field in command}
+    elif command_name in ("update", "delete"):
+        statements = command.get("updates") or command.get("deletes") or [{}]
+        parts = {"q": normalize(statements[0].get("q", {}))}
+    else:
+        parts = {}
+    return f"{collection}.{command_name} {json.dumps(parts, default=str)}" if parts else f"{collection}.{command_name}"
+
+
+def _returned(command_name: str, reply: Dict[str, Any]) -> int:
+    cursor = reply.get("cursor")
+    if cursor:
+        return len(cursor.get("firstBatch") or cursor.get("nextBatch") or [])
+    return int(reply.get("n", 0) or 0)
+
+
+def _explainable(command_name: str, command: Dict[str, Any]) -> Dict[str, Any]:
+    keep = {command_name, "filter", "sort", "projection", "limit", "skip", "pipeline", "cursor", "query", "key",
+            "hint", "collation"}
+    return {k: v for k, v in command.items() if k in keep}
+
+
+def plan_summary(explain: Dict[str, Any]) -> Dict[str, Any]:
+    """Stages and indexes of the winning plan, from any explain layout"""
+    stages, indexes = [], set()
+
+    def walk(node):
+        if isinstance(node, dict):
+            if "stage" in node:
+                stages.append(node["stage"])
+                if node.get("indexName"):
+                    indexes.add(node["indexName"])
+            for key, value in node.items():
+                if key != "rejectedPlans":
+                    walk(value)
+        elif isinstance(node, list):
+            for value in node:
+                walk(value)
+
+    walk(explain)
+    return {"stages": stages, "indexes": sorted(indexes), "collscan": "COLLSCAN" in stages}
+
+
+class SlowQueryLog(monitoring.CommandListener):
+    def __init__(self, threshold_ms: float = SLOW_QUERY_MS, size: int = SLOW_QUERY_BUFFER):
+        self.threshold_ms = threshold_ms
+        self.entries: deque = deque(maxlen=size)
+        self.plans: Dict[str, Dict[str, Any]] = {}
+        self._pending: Dict[int, tuple] = {}
+        self._to_explain: Dict[str, tuple] = {}
+        self._explainer: Optional[asyncio.Task] = None
+
+    # ---- listener, called from the driver's threads ----
+
+    def started(self, event):
+        if event.command_name not in IGNORED:
+            timing = active_timing()
+            origin = timing.route if timing else (current_operation.get() or "background")
+            self._pending[event.request_id] = (event.command, origin)
+
+    def succeeded(self, event):
+        self._finish(event, event.reply)
+
+    def failed(self, event):
+        self._finish(event, {})
+
+    def _finish(self, event, reply):
+        pending = self._pending.pop(event.request_id, None)
+        if pending is None:
+            return
+        duration_ms = event.duration_micros / 1000
+        if duration_ms < self.threshold_ms:
+            return
+        command, origin = pending
+        name = event.command_name
+        shape = query_shape(name, command)
+        self.entries.append({
+            "at": datetime.utcnow(),
+            "origin": origin,
+            "command": name,
+            "collection": command.get("collection" if name == "getMore" else name),
+            "shape": shape,
+            "duration_ms": round(duration_ms, 2),
+            "docs_returned": _returned(name, reply),
+            "failed": not reply,
+        })
+        if (name in SHAPED and shape not in self.plans and shape not in self._to_explain
+                and len(self.plans) < MAX_EXPLAINED_SHAPES):
+            self._to_explain[shape] = (event.database_name, _explainable(name, command))
+
+    # ---- background explain ----
+
+    def start(self, client):
+        self._explainer = asyncio.create_task(self._explain_loop(client))
+
+    def shutdown(self):
+        if self._explainer:
+            self._explainer.cancel()
+
+    async def _explain_loop(self, client):
+        while True:
+            await asyncio.sleep(EXPLAIN_INTERVAL_SECONDS)
+            while self._to_explain:
+                shape = next(iter(self._to_explain))
+                database, command = self._to_explain.pop(shape)
+                try:
+                    explain = await client[database].command("explain", command, verbosity="queryPlanner")
+                    self.plans[shape] = plan_summary(explain.get("queryPlanner", explain))
+                    logger.warning(f"🐢 New slow query shape: {shape} -> {self.plans[shape]}")
+                except Exception as e:
+                    self.plans[shape] = {"error": str(e)}
+
+    # ---- report ----
+
+    def report(self, limit: int = 50) -> List[Dict[str, Any]]:
+        """Buffered slow commands grouped by shape, slowest total time first"""
+        groups: Dict[str, Dict[str, Any]] = {}
+        for entry in list(self.entries):
+            group = groups.setdefault(entry["shape"], {
+                "shape": entry["shape"],
+                "command": entry["command"],
+                "collection": entry["collection"],
+                "count": 0,
+                "total_ms": 0.0,
+                "max_ms": 0.0,
+                "docs_returned": 0,
+                "origins": set(),
+                "last_seen": entry["at"],
+            })
+            group["count"] += 1
+            group["total_ms"] += entry["duration_ms"]
+            group["max_ms"] = max(group["max_ms"], entry["duration_ms"])
+            group["docs_returned"] += entry["docs_returned"]
+            group["origins"].add(entry["origin"])
+            group["last_seen"] = max(group["last_seen"], entry["at"])
+
+        rows = sorted(groups.values(), key=lambda g: g["total_ms"], reverse=True)[:limit]
+        for group in rows:
+            group["avg_ms"] = round(group["total_ms"] / group["count"], 2)
+            group["total_ms"] = round(group["total_ms"], 2)
+            group["avg_docs_returned"] = round(group.pop("docs_returned") / group["count"], 1)
+            group["origins"] = sorted(group["origins"])
+            group["last_seen"] = group["last_seen"].isoformat()
+            group["plan"] = self.plans.get(group["shape"])
+        return rows
+
+
+# Singleton instance
+slow_query_log = SlowQueryLog()
@@ -0,0 +1,135 @@
+"""
+Trends Refresh Pipeline
+Applies a list of trending names to the persons collection in bulk.
+Shared by the daily scheduler job and the admin refresh endpoint.
+"""
+
+from datetime import datetime
+from typing import Any, Dict, List
+import logging
+
+from bson import ObjectId
+from pymongo import InsertOne, UpdateOne
+from pymongo.errors import BulkWriteError
+
+from scoring import score_fields
+from utils import slugify
+
+logger = logging.getLogger(__name__)
+
+
+def legacy_slug(name: str) -> str:
+    """Slug format the scheduler used to write (keeps accented letters)"""
+    slug = name.strip().lower()
+    slug = ''.join(c for c in slug if c.isalnum() or c == ' ')
+    return slug.replace(' ', '-')
+
+
+def new_trending_person(name: str, slug: str, now: datetime) -> Dict[str, Any]:
+    return {
+        "_id": ObjectId(),
+        "name": name,
+        "slug": slug,
+        "category": "other",  # Default category
+        "approved": True,
+        "created_at": now,
+        "updated_at": now,
+        **score_fields(0, 0),
+        "likes": 0,
+        "dislikes": 0,
+        "total_votes": 0,
+        "source": "trending",  # Mark as auto-added from trends
+        "is_trending": True,
+        "trending_since": now,
+    }
+
+
+async def apply_trending_names(db, trending_names: List[str]) -> Dict[str, Any]:
+    """
+    Mark the given names as trending, auto-adding unknown ones
+
+    All names are resolved with one `$in` query on slug, marks and inserts go
+    through one bulk_write and initial ticks through one insert_many. The new
+    set is marked before the previous one is unmarked, so readers never see
+    an empty trending list.
+    """
+    now = datetime.utcnow()
+
+    # One entry per canonical slug, keeping the first spelling seen
+    by_slug: Dict[str, str] = {}
+    for name in trending_names:
+        slug = slugify(name)
+        if slug and slug not in by_slug:
+            by_slug[slug] = name
+
+    # Match persons stored under either slug format
+    lookup = {}
+    for slug, name in by_slug.items():
+        lookup[slug] = slug
+        lookup.setdefault(legacy_slug(name), slug)
+    existing = await db.persons.find(
+        {"slug": {"$in": list(lookup.keys())}},
+        {"_id": 1, "slug": 1}
+    ).to_list(length=len(lookup))
+    existing_ids: Dict[str, ObjectId] = {}
+    for doc in existing:
+        existing_ids.setdefault(lookup[doc["slug"]], doc["_id"])
+
+    mark = {"$set": {"is_trending": True, "trending_since": now, "updated_at": now}}
+    ops = []
+    op_slugs = []
+    new_docs = []
+    for slug, name in by_slug.items():
+        if slug in existing_ids:
+            ops.append(UpdateOne({"_id": existing_ids[slug]}, mark))
+        else:
+            doc = new_trending_person(name, slug, now)
+            new_docs.append(doc)
+            ops.append(InsertOne(doc))
+        op_slugs.append(slug)
+
+    inserted = list(new_docs)
+    if ops:
+        try:
+            await db.persons.bulk_write(ops, ordered=False)
+        except BulkWriteError as e:
+            errors = e.details.get("writeErrors", [])
+            if any(err.get("code") != 11000 for err in errors):
+                raise
+            # Someone added these slugs concurrently: mark theirs instead
+            dup_slugs = {op_slugs[err["index"]] for err in errors}
+            inserted = [d for d in new_docs if d["slug"] not in dup_slugs]
+            await db.persons.update_many({"slug": {"$in": list(dup_slugs)}}, mark)
+            for doc in await db.persons.find({"slug": {"$in": list(dup_slugs)}}, {"_id": 1, "slug": 1}).to_list(length=len(dup_slugs)):
+                existing_ids[doc["slug"]] = doc["_id"]
+
+    if inserted:
+        await db.person_ticks.insert_many([
+            {"person_id": doc["_id"], "score": doc["score"], "created_at": now}
+            for doc in inserted
+        ])
+
+    # Unmark the previous set only now that the new one is in place
+    trending_ids = list(existing_ids.values()) + [doc["_id"] for doc in inserted]
+    await db.persons.update_many(
+        {"is_trending": True, "_id": {"$nin": trending_ids}},
+        {"$set": {"is_trending": False}}
+    )
+
+    # Update last refresh timestamp
+    await db.app_settings.update_one(
+        {"_id": "global"},
+        {"$set": {"last_trends_refresh": now}},
+        upsert=True
+    )
+
+    added_count = len(inserted)
+    updated_count = len(trending_ids) - added_count
+    logger.info(f"Trends applied: {added_count} added, {updated_count} updated")
+
+    return {
+        "trending_names": list(by_slug.values()),
+        "added": added_count,
+        "updated": updated_count,
+        "timestamp": now,
+    }
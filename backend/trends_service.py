@@ -4,96 +4,206 @@ Fetches trending personalities from Google Trends and updates the database
 """
 
 from pytrends.request import TrendReq
+from concurrent.futures import Future, ThreadPoolExecutor
 from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict
+import asyncio
+import json
 import logging
-import re
+import os
+import threading
+import time
+
+import pandas as pd
+
+from name_classifier import NameClassifier
 
 logger = logging.getLogger(__name__)
 
-# Common patterns to identify person names vs topics/events
-PERSON_INDICATORS = [
-    # Titles
-    r'\b(Mr|Mrs|Ms|Dr|Prof|President|Prime Minister|King|Queen|Prince|Princess)\b',
-    # Common name patterns (capitalized words)
-    r'^[A-Z][a-z]+\s+[A-Z][a-z]+',
-    # Avoid common non-person terms
-]
+# Blocking pytrends calls run in this many dedicated threads
+TRENDS_WORKERS = int(os.getenv("TRENDS_WORKERS", "4"))
+# Hard limit for one fetch attempt (seconds), and retry policy
+TRENDS_TIMEOUT_SECONDS = float(os.getenv("TRENDS_TIMEOUT_SECONDS", "30"))
+TRENDS_MAX_ATTEMPTS = int(os.getenv("TRENDS_MAX_ATTEMPTS", "3"))
+TRENDS_BACKOFF_SECONDS = float(os.getenv("TRENDS_BACKOFF_SECONDS", "2"))
+
+# Regions to fetch, as "pytrends_region:weight" pairs
+TRENDS_REGIONS = os.getenv("TRENDS_REGIONS", "united_states:1.0")
+# Last successful fetch, reused within the freshness window and on failures
+TRENDS_SNAPSHOT_PATH = Path(os.getenv(
+    "TRENDS_SNAPSHOT_PATH",
+    str(Path(__file__).parent / ".cache" / "trends_snapshot.json"),
+))
+TRENDS_SNAPSHOT_MAX_AGE = timedelta(minutes=int(os.getenv("TRENDS_SNAPSHOT_MAX_AGE_MINUTES", "30")))
+
+
+def parse_regions(spec: str):
+    """Parse "united_states:1.0,france:0.5" into [("united_states", 1.0), ("france", 0.5)]"""
+    regions = []
+    for part in spec.split(','):
+        part = part.strip()
+        if not part:
+            continue
+        name, _, weight = part.partition(':')
+        regions.append((name.strip(), float(weight) if weight else 1.0))
+    return regions
+
+
+def merge_candidates(results, weights, limit=50):
+    """
+    Merge per-region trending lists into one ranked, deduplicated list
+
+    Each term earns weight * (1 - rank / len) from every region it appears
+    in, so a term trending high in several regions beats a single-region hit.
+    The first spelling seen is kept.
+    """
+    scores = {}
+    spelling = {}
+    for region, terms in results.items():
+        weight = weights.get(region, 1.0)
+        n = len(terms)
+        for rank, term in enumerate(terms):
+            key = term.strip().lower()
+            if not key:
+                continue
+            spelling.setdefault(key, term.strip())
+            scores[key] = scores.get(key, 0.0) + weight * (1 - rank / n)
+    ranked = sorted(scores, key=lambda k: scores[k], reverse=True)
+    return [spelling[k] for k in ranked[:limit]]
+
+
+class PytrendsTransport:
+    """Talks to Google Trends through pytrends (blocking requests + pandas)"""
+
+    def __init__(self, timeout=(5, TRENDS_TIMEOUT_SECONDS)):
+        self.timeout = timeout
+        self._local = threading.local()
+
+    @property
+    def client(self):
+        # TrendReq fetches a cookie from Google on creation, so build it lazily;
+        # it keeps per-request state, so each trends thread gets its own
+        client = getattr(self._local, "client", None)
+        if client is None:
+            client = self._local.client = TrendReq(hl='en-US', tz=0, timeout=self.timeout)
+        return client
+
+    def trending_searches(self, pn='united_states'):
+        return self.client.trending_searches(pn=pn)
 
-NON_PERSON_KEYWORDS = [
-    'weather', 'election', 'game', 'movie', 'series', 'show', 'concert',
-    'festival', 'championship', 'cup', 'olympics', 'news', 'update',
-    'covid', 'virus', 'storm', 'hurricane', 'earthquake', 'war',
-    'stock', 'market', 'price', 'app', 'iphone', 'samsung', 'vs',
-    'how to', 'what is', 'where', 'when', 'why', 'match', 'live',
-]
+
+class StubTransport:
+    """
+    Local stand-in for PytrendsTransport, used by tests
+
+    Returns fixed terms after blocking for `delay` seconds, the way a slow
+    HTTP call to Google would. Set `fail_times` to make the first calls raise.
+    """
+
+    def __init__(self, terms=None, delay=0.0, fail_times=0):
+        # A list is returned for every region; a dict maps region -> list
+        self.terms = terms if isinstance(terms, dict) else list(terms or [])
+        self.delay = delay
+        self.fail_times = fail_times
+        self.calls = 0
+
+    def trending_searches(self, pn='united_states'):
+        self.calls += 1
+        time.sleep(self.delay)
+        if self.calls <= self.fail_times:
+            raise ConnectionError("stub transport failure")
+        terms = self.terms.get(pn, []) if isinstance(self.terms, dict) else self.terms
+        return pd.DataFrame({0: terms})
 
 
 class GoogleTrendsService:
-    def __init__(self):
-        """Initialize pytrends with global settings"""
-        self.pytrends = TrendReq(hl='en-US', tz=0)
+    def __init__(self, transport=None, regions=None, snapshot_path=None, classifier=None):
+        """Initialize the service; the pytrends session is created on first use"""
+        self.transport = transport or PytrendsTransport()
+        self.classifier = classifier or NameClassifier()
+        self.regions = regions or parse_regions(TRENDS_REGIONS)
+        self.snapshot_path = Path(snapshot_path or TRENDS_SNAPSHOT_PATH)
+        self._executor = None
+        self._closed = False
+        # region -> pytrends call in a trends thread, kept until the thread is done
+        self._in_flight: Dict[str, Future] = {}
+
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=TRENDS_WORKERS, thread_name_prefix="trends")
+        return self._executor
     
     def is_likely_person_name(self, term: str) -> bool:
         """
         Heuristic to determine if a search term is likely a person's name
         """
-        term_lower = term.lower()
-        
-        # Exclude non-person keywords
-        for keyword in NON_PERSON_KEYWORDS:
-            if keyword in term_lower:
-                return False
-        
-        # Check if it contains numbers (less likely to be a person)
-        if any(char.isdigit() for char in term):
-            return False
-        
-        # Check if it has at least 2 words (First Last name pattern)
-        words = term.split()
-        if len(words) < 2:
-            return False
-        
-        # Check if words are capitalized (proper nouns)
-        if not all(word[0].isupper() for word in words if word):
-            return False
-        
-        return True
+        return self.classifier.is_person(term)
     
     def fetch_trending_searches(self, limit=50):
         """
-        Fetch trending searches from Google Trends
-        Returns a list of trending terms
+        Fetch trending searches from Google Trends for every configured region
+        Returns a merged list of trending terms
         """
+        results = {}
+        for region, _ in self.regions:
+            try:
+                results[region] = self._fetch_region(region, limit)
+            except Exception as e:
+                logger.error(f"Error fetching trending searches for {region}: {e}")
+        return merge_candidates(results, dict(self.regions), limit) if results else []
+    
+    def _fetch_region(self, region, limit=50):
+        """Fetch one region; lets transport errors propagate"""
+        trending_searches_df = self.transport.trending_searches(pn=region)
+        
+        if trending_searches_df is not None and not trending_searches_df.empty:
+            # Get top N trending searches
+            trending_list = trending_searches_df[0].head(limit).tolist()
+            logger.info(f"Fetched {len(trending_list)} trending searches for {region}")
+            return trending_list
+        else:
+            logger.warning(f"No trending searches found for {region}")
+            return []
+    
+    def load_snapshot(self):
+        """Return the last saved snapshot ({"fetched_at", "regions", "terms"}) or None"""
         try:
-            # Get trending searches (global)
-            trending_searches_df = self.pytrends.trending_searches(pn='united_states')
-            
-            if trending_searches_df is not None and not trending_searches_df.empty:
-                # Get top N trending searches
-                trending_list = trending_searches_df[0].head(limit).tolist()
-                logger.info(f"Fetched {len(trending_list)} trending searches")
-                return trending_list
-            else:
-                logger.warning("No trending searches found")
-                return []
-                
+            with open(self.snapshot_path) as f:
+                data = json.load(f)
+            data["fetched_at"] = datetime.fromisoformat(data["fetched_at"])
+            return data
+        except FileNotFoundError:
+            return None
         except Exception as e:
-            logger.error(f"Error fetching trending searches: {e}")
-            return []
+            logger.warning(f"Ignoring unreadable trends snapshot: {e}")
+            return None
+    
+    def save_snapshot(self, terms, regions):
+        """Write the snapshot atomically so a crash never leaves a torn file"""
+        try:
+            self.snapshot_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.snapshot_path.with_suffix(".tmp")
+            with open(tmp, "w") as f:
+                json.dump({
+                    "fetched_at": datetime.utcnow().isoformat(),
+                    "regions": regions,
+                    "terms": terms,
+                }, f)
+            os.replace(tmp, self.snapshot_path)
+        except Exception as e:
+            logger.warning(f"Could not save trends snapshot: {e}")
     
     def filter_personalities(self, trending_list):
         """
         Filter trending searches to keep only likely person names
         """
-        personalities = []
-        
-        for term in trending_list:
-            if self.is_likely_person_name(term):
-                personalities.append(term)
-                logger.info(f"Identified as person: {term}")
-            else:
-                logger.debug(f"Filtered out non-person: {term}")
+        verdicts = self.classifier.classify(trending_list)
+        personalities = [term for term, keep in zip(trending_list, verdicts) if keep]
+        self.classifier.save()
         
+        logger.info(f"Identified {len(personalities)} persons among {len(trending_list)} trending terms")
         return personalities
     
     def get_trending_personalities(self, limit=20):
@@ -117,6 +227,79 @@ class GoogleTrendsService:
         except Exception as e:
             logger.error(f"Error getting trending personalities: {e}")
             return []
+    
+    async def get_trending_personalities_async(self, limit=20, max_age=None):
+        """
+        Non-blocking variant for the event loop
+        Regions are fetched concurrently in the trends thread pool, each with
+        a hard timeout per attempt and exponential backoff between attempts.
+        With `max_age`, a snapshot younger than that is reused instead of
+        calling Google. If every region fails or comes back empty, the last
+        snapshot is used whatever its age; [] is returned only when there is none.
+        """
+        if self._closed:
+            return []
+        
+        # Snapshot I/O and classification run in the default pool rather than
+        # the trends one, where they could queue behind hung Google calls
+        loop = asyncio.get_running_loop()
+        if max_age is not None:
+            snapshot = await loop.run_in_executor(None, self.load_snapshot)
+            if snapshot and datetime.utcnow() - snapshot["fetched_at"] <= max_age:
+                logger.info(f"Using trends snapshot from {snapshot['fetched_at'].isoformat()}")
+                return (await loop.run_in_executor(None, self.filter_personalities, snapshot["terms"]))[:limit]
+        
+        fetched = await asyncio.gather(*(self._fetch_region_async(region) for region, _ in self.regions))
+        # Regions answering with no terms don't replace a useful snapshot
+        results = {region: terms for (region, _), terms in zip(self.regions, fetched) if terms}
+        
+        if results:
+            terms = merge_candidates(results, dict(self.regions))
+            await loop.run_in_executor(None, self.save_snapshot, terms, list(results))
+        else:
+            snapshot = await loop.run_in_executor(None, self.load_snapshot)
+            if not snapshot:
+                logger.error("Giving up on trends fetch, no snapshot to fall back to")
+                return []
+            logger.warning(f"Trends fetch failed, falling back to snapshot from {snapshot['fetched_at'].isoformat()}")
+            terms = snapshot["terms"]
+        
+        return (await loop.run_in_executor(None, self.filter_personalities, terms))[:limit]
+    
+    async def _fetch_region_async(self, region):
+        """
+        Fetch one region with timeout and retries; None when all attempts fail
+
+        A timed-out call keeps running in its thread, so a region gets no new
+        call (retry or later refresh) until that one has returned: a slow
+        region holds one trends thread at most, never the whole pool.
+        """
+        for attempt in range(1, TRENDS_MAX_ATTEMPTS + 1):
+            previous = self._in_flight.get(region)
+            if previous is not None and not previous.done():
+                logger.warning(f"Trends fetch for {region} still running from an earlier attempt, not retrying")
+                return None
+            try:
+                future = self._in_flight[region] = self.executor.submit(self._fetch_region, region)
+                return await asyncio.wait_for(asyncio.wrap_future(future), timeout=TRENDS_TIMEOUT_SECONDS)
+            except asyncio.TimeoutError:
+                logger.warning(f"Trends fetch for {region} timed out (attempt {attempt}/{TRENDS_MAX_ATTEMPTS})")
+            except Exception as e:
+                logger.warning(f"Trends fetch for {region} failed (attempt {attempt}/{TRENDS_MAX_ATTEMPTS}): {e}")
+            
+            if attempt < TRENDS_MAX_ATTEMPTS and not self._closed:
+                await asyncio.sleep(TRENDS_BACKOFF_SECONDS * 2 ** (attempt - 1))
+            if self._closed:
+                break
+        
+        return None
+    
+    def shutdown(self):
+        """Stop accepting fetches and drop queued ones; running threads finish on their own timeout"""
+        self._closed = True
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
 
 
 # Singleton instance
@@ -0,0 +1,13 @@
+"""
+Shared helpers for the Popular backend
+"""
+
+import re
+
+
+def slugify(name: str) -> str:
+    s = name.strip().lower()
+    s = re.sub(r"[^a-z0-9\s-]", "", s)
+    s = re.sub(r"[\s-]+", "-", s)
+    s = s.strip('-')
+    return s
@@ -0,0 +1,122 @@
+"""
+Sharded Vote Counters
+Optional write path for hot persons. With VOTE_SHARD_COUNT > 0, a vote no
+longer updates the person document (one document lock shared by every
+voter) but increments one of N shard documents in `vote_shards`, chosen at
+random. A background folder periodically moves the shard counts into
+`persons`, recomputes score and controversy, and writes one chart tick per
+person per fold.
+
+Readers see eventually consistent totals, at most VOTE_SHARD_FOLD_SECONDS
+behind. Folding takes each shard's counts with one atomic swap to zero, so
+folders in several processes never count a vote twice; counts lost to a
+crash between the swap and the person update are restored by the next
+hourly counter reconciliation, which also checks the persons voted on since
+its previous run.
+"""
+
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+import asyncio
+import logging
+import os
+import random
+
+from pymongo import ReturnDocument
+
+from scoring import score_fields
+from slow_queries import current_operation
+
+logger = logging.getLogger(__name__)
+
+# Shards per person; 0 keeps the direct update of the person document
+VOTE_SHARD_COUNT = int(os.getenv("VOTE_SHARD_COUNT", "0"))
+VOTE_SHARD_FOLD_SECONDS = float(os.getenv("VOTE_SHARD_FOLD_SECONDS", "5"))
+
+COUNTERS = ("likes", "dislikes", "total_votes")
+
+
+class ShardedCounters:
+    def __init__(self, count: int = VOTE_SHARD_COUNT, fold_seconds: float = VOTE_SHARD_FOLD_SECONDS):
+        self.count = count
+        self.fold_seconds = fold_seconds
+        self._folder: Optional[asyncio.Task] = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.count > 0
+
+    async def increment(self, db, person_id, inc: Dict[str, int]):
+        """Add a vote's counter changes to a random shard of the person"""
+        await db.vote_shards.update_one(
+            {"person_id": person_id, "shard": random.randrange(self.count)},
+            {"$inc": {field: int(inc.get(field, 0)) for field in COUNTERS}, "$set": {"dirty": True}},
+            upsert=True,
+        )
+
+    async def pending(self, db, person_ids: List[Any]) -> Dict[Any, Dict[str, int]]:
+        """person_id -> counts not folded into persons yet"""
+        pipeline = [
+            {"$match": {"person_id": {"$in": person_ids}, "dirty": True}},
+            {"$group": {"_id": "$person_id", **{field: {"$sum": f"${field}"} for field in COUNTERS}}},
+        ]
+        rows = await db.vote_shards.aggregate(pipeline).to_list(length=None)
+        return {row.pop("_id"): row for row in rows}
+
+    async def fold(self, db) -> Dict[str, int]:
+        """Move every dirty shard's counts into its person; returns counts of shards and persons folded"""
+        dirty = await db.vote_shards.find({"dirty": True}, {"_id": 1}).to_list(length=None)
+        taken: Dict[Any, Dict[str, int]] = {}
+        for shard in dirty:
+            # Swap the counts to zero; increments landing after this stay for the next fold
+            doc = await db.vote_shards.find_one_and_update(
+                {"_id": shard["_id"], "dirty": True},
+                {"$set": {**{field: 0 for field in COUNTERS}, "dirty": False}},
+                return_document=ReturnDocument.BEFORE,
+            )
+            if doc:
+                sums = taken.setdefault(doc["person_id"], dict.fromkeys(COUNTERS, 0))
+                for field in COUNTERS:
+                    sums[field] += int(doc.get(field, 0))
+
+        now = datetime.utcnow()
+        for person_id, inc in taken.items():
+            person = await db.persons.find_one_and_update(
+                {"_id": person_id},
+                {"$inc": inc, "$set": {"updated_at": now}},
+                projection={"likes": 1, "dislikes": 1},
+                return_document=ReturnDocument.AFTER,
+            )
+            if not person:
+                continue  # deleted meanwhile
+            likes, dislikes = int(person.get("likes", 0)), int(person.get("dislikes", 0))
+            derived = score_fields(likes, dislikes)
+            # A direct writer that changed the counters since sets the score itself
+            await db.persons.update_one({"_id": person_id, "likes": likes, "dislikes": dislikes}, {"$set": derived})
+            await db.person_ticks.insert_one({"person_id": person_id, "score": derived["score"], "created_at": now})
+        return {"shards": len(dirty), "persons": len(taken)}
+
+    # ---- background folder ----
+
+    def start(self, db):
+        """Fold in the background; also runs while disabled so shards left from before get folded"""
+        self._folder = asyncio.create_task(self._fold_loop(db))
+
+    def shutdown(self):
+        if self._folder:
+            self._folder.cancel()
+
+    async def _fold_loop(self, db):
+        current_operation.set("vote_shards:fold")
+        while True:
+            await asyncio.sleep(self.fold_seconds)
+            try:
+                folded = await self.fold(db)
+                if folded["persons"]:
+                    logger.debug(f"Folded {folded['shards']} vote shards into {folded['persons']} persons")
+            except Exception as e:
+                logger.error(f"Vote shard fold error: {e}")
+
+
+# Singleton instance
+vote_shards = ShardedCounters()
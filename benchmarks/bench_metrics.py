@@ -0,0 +1,142 @@
+"""
+Benchmark: instrumentation overhead on the vote path, as deployed
+
+A vote request passes the CORS and settings middlewares, an instrumented
+route handler (metrics and Server-Timing) and sends seven MongoDB commands,
+each published to the three command listeners of the server's client
+(metrics, request timing, slow query log). Requests are driven straight
+through the ASGI apps, without a client or server in between.
+
+Every layer is added one at a time to a plain FastAPI app with the same
+endpoint, so each row is what that layer adds to one request and the last
+row the whole instrumentation stack. Listener rows include building the
+pymongo events, which the driver skips when no listener is registered.
+
+    python benchmarks/bench_metrics.py [--requests 20000] [--repeat 5]
+"""
+
+from datetime import timedelta
+from pathlib import Path
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+from fastapi import APIRouter, FastAPI
+from fastapi.routing import APIRoute
+from pymongo import monitoring
+from starlette.middleware.cors import CORSMiddleware
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+VOTE_PATH = "/api/people/{person_id}/vote"
+VOTE_COMMANDS = [("find", "persons"), ("find", "votes"), ("insert", "votes"), ("update", "persons"),
+                 ("insert", "person_ticks"), ("insert", "vote_events"), ("find", "persons")]
+COMMAND_DURATION = timedelta(microseconds=800)
+ADDRESS = ("localhost", 27017)
+
+
+def make_app(route_class=APIRoute, settings_middleware=False, listeners=()) -> FastAPI:
+    """The vote route behind the server's middlewares, with the chosen instrumentation layers"""
+    import server
+
+    publisher = monitoring._EventListeners(list(listeners)) if listeners else None
+    request_ids = iter(range(1, 1 << 62))
+
+    async def vote(person_id: str):
+        if publisher:
+            # what the driver publishes for the vote's commands
+            for name, collection in VOTE_COMMANDS:
+                request_id = next(request_ids)
+                publisher.publish_command_start({name: collection, "$db": "popular"}, "popular", request_id, ADDRESS)
+                publisher.publish_command_success(COMMAND_DURATION, {"ok": 1, "n": 1}, name, request_id, ADDRESS, None)
+        return {"id": person_id, "score": 50.0}
+
+    app = FastAPI()
+    router = APIRouter(prefix="/api", route_class=route_class)
+    router.add_api_route(VOTE_PATH.removeprefix("/api"), vote, methods=["POST"])
+    app.include_router(router)
+    if settings_middleware:
+        app.add_middleware(server.AppSettingsMiddleware)
+    app.add_middleware(CORSMiddleware, allow_credentials=True, allow_origins=["*"], allow_methods=["*"],
+                       allow_headers=["*"], expose_headers=["Server-Timing"])
+    return app
+
+
+async def time_requests(app, n: int) -> float:
+    """Seconds per request through the ASGI app"""
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "scheme": "http",
+        "method": "POST", "path": "/api/people/64b7f0c2a1b2c3d4e5f60718/vote",
+        "raw_path": b"/api/people/64b7f0c2a1b2c3d4e5f60718/vote", "root_path": "", "query_string": b"",
+        "headers": [(b"host", b"bench"), (b"x-device-id", b"bench-device")],
+        "client": ("127.0.0.1", 50000), "server": ("bench", 80),
+    }
+    never = asyncio.Event()
+
+    async def receive():
+        if request["sent"]:
+            await never.wait()  # like a server waiting for the client to disconnect
+        request["sent"] = True
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            assert message["status"] == 200, message
+
+    start = time.perf_counter()
+    for _ in range(n):
+        request = {"sent": False}
+        await app(dict(scope), receive, send)
+    return (time.perf_counter() - start) / n
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=20000)
+    parser.add_argument("--repeat", type=int, default=5, help="runs per variant; the fastest is kept")
+    args = parser.parse_args()
+
+    os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+    os.environ.setdefault("DB_NAME", "popular_bench")
+    import server
+    from metrics import InstrumentedRoute
+
+    listeners = [server.mongo_metrics, server.timing_listener, server.slow_query_log]
+    route = {"route_class": InstrumentedRoute}
+    variants = {
+        "plain": make_app(),
+        "route": make_app(**route),
+        "route+metrics listener": make_app(**route, listeners=[server.mongo_metrics]),
+        "route+timing listener": make_app(**route, listeners=[server.timing_listener]),
+        "route+slow query listener": make_app(**route, listeners=[server.slow_query_log]),
+        "route+listeners": make_app(**route, listeners=listeners),
+        "deployed": make_app(**route, settings_middleware=True, listeners=listeners),
+    }
+
+    async def run():
+        best = {}
+        for _ in range(args.repeat):
+            # interleaved so drift in machine load hits every variant alike
+            for name, app in variants.items():
+                seconds = await time_requests(app, args.requests)
+                best[name] = min(best.get(name, seconds), seconds)
+        return best
+
+    best = asyncio.run(run())
+
+    def row(label, seconds):
+        print(f"{label:<36} {seconds * 1e6:8.2f} µs/request")
+
+    row("plain request (reference)", best["plain"])
+    row("route wrapper (metrics, timing)", best["route"] - best["plain"])
+    for name in ("metrics", "timing", "slow query"):
+        row(f"{name} listener (7 cmds)", best[f"route+{name} listener"] - best["route"])
+    row("all listeners (7 cmds)", best["route+listeners"] - best["route"])
+    row("settings middleware", best["deployed"] - best["route+listeners"])
+    row("total instrumentation", best["deployed"] - best["plain"])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""
+Benchmark: person-name classification throughput on 10k candidate terms
+
+Compares the old per-keyword substring loop with the compiled scalar path,
+the vectorized pandas path and a warm decision cache.
+
+    python benchmarks/bench_name_classifier.py [--terms 10000]
+"""
+
+import argparse
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+from name_classifier import NON_PERSON_KEYWORDS, NameClassifier, classify_series, classify_term  # noqa: E402
+
+FIRST = ["Taylor", "Lionel", "Emma", "Kylian", "Serena", "Barack", "Greta", "Elon", "Prince", "Dr"]
+LAST = ["Swift", "Messi", "Watson", "Mbappe", "Williams", "Obama", "Thunberg", "Musk", "Harry", "Dre"]
+TOPICS = ["weather", "election results", "world cup", "iphone 16", "stock market", "how to vote", "live score"]
+
+
+def legacy_is_likely_person_name(term: str) -> bool:
+    """The original implementation, kept for comparison"""
+    term_lower = term.lower()
+    for keyword in NON_PERSON_KEYWORDS:
+        if keyword in term_lower:
+            return False
+    if any(char.isdigit() for char in term):
+        return False
+    words = term.split()
+    if len(words) < 2:
+        return False
+    if not all(word[0].isupper() for word in words if word):
+        return False
+    return True
+
+
+def make_terms(n: int, seed: int = 42):
+    rng = random.Random(seed)
+    terms = []
+    for i in range(n):
+        if rng.random() < 0.6:
+            terms.append(f"{rng.choice(FIRST)} {rng.choice(LAST)}{'' if rng.random() < 0.5 else ' ' + str(i)}")
+        else:
+            terms.append(f"{rng.choice(TOPICS)} {i}")
+    return terms
+
+
+def timed(label, fn, n):
+    start = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<28} {elapsed * 1000:8.1f} ms  {n / elapsed:12,.0f} terms/s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--terms", type=int, default=10000)
+    args = parser.parse_args()
+
+    terms = make_terms(args.terms)
+    series = pd.Series(terms)
+
+    timed("legacy substring loop", lambda: [legacy_is_likely_person_name(t) for t in terms], len(terms))
+    timed("compiled scalar", lambda: [classify_term(t) for t in terms], len(terms))
+    timed("vectorized pandas", lambda: classify_series(series), len(terms))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        classifier = NameClassifier(Path(tmp) / "names.json")
+        timed("cache (cold)", lambda: classifier.classify(terms), len(terms))
+        timed("cache (warm)", lambda: classifier.classify(terms), len(terms))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,338 @@
+"""
+Synthetic dataset generator for scale testing
+
+Fills persons, votes, vote_events, person_ticks, searches, user_credits and
+credit_transactions with production-like volume:
+  - Zipfian popularity: the person of rank r gets votes and searches in
+    proportion to 1 / r^zipf
+  - diurnal curves: timestamps spread over --days, following a daily cycle
+    that peaks in the evening (UTC)
+  - device reuse: votes come from a pool of --devices devices, a few heavy
+    voters and a long tail
+Person counters (likes, dislikes, total_votes) match the generated votes,
+score and controversy follow scoring.py. Documents are written with parallel insert_many batches; the same
+--seed and --end always produce the same data, including ObjectIds.
+
+    python benchmarks/generate_dataset.py --db popular_scale --persons 20000 --votes 5000000 --drop
+"""
+
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterator, List
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+import numpy as np
+from bson import ObjectId
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+from indexes import sync_indexes  # noqa: E402
+from scoring import compute_score, controversy_array, score_array  # noqa: E402
+from utils import slugify  # noqa: E402
+
+COLLECTIONS = ["persons", "votes", "vote_events", "person_ticks", "searches", "user_credits", "credit_transactions"]
+CATEGORIES = np.array(["politics", "culture", "business", "sport", "other"])
+SOURCES = np.array(["seed", "user_added", "trending", "self_boosted"])
+SOURCE_WEIGHTS = [0.5, 0.35, 0.1, 0.05]
+FIRST = ["Alex", "Maria", "Chen", "Fatou", "Ivan", "Lucia", "Omar", "Priya", "Kenji", "Amara", "Noah", "Sofia"]
+LAST = ["Martin", "Garcia", "Wang", "Diallo", "Petrov", "Rossi", "Haddad", "Patel", "Sato", "Okafor", "Smith"]
+SEARCH_NOISE = ["weather", "news", "election", "world cup", "stock market", "concert tickets"]
+
+# Relative activity per UTC hour: quiet at night, peak around 20:00
+DIURNAL = np.array([0.3, 0.2, 0.15, 0.1, 0.1, 0.15, 0.3, 0.5, 0.7, 0.8, 0.85, 0.9,
+                    1.0, 0.95, 0.9, 0.9, 0.95, 1.0, 1.1, 1.2, 1.3, 1.2, 0.9, 0.5])
+
+
+def zipf_weights(n: int, s: float) -> np.ndarray:
+    weights = 1.0 / np.arange(1, n + 1) ** s
+    return weights / weights.sum()
+
+
+def diurnal_timestamps(rng: np.random.Generator, n: int, end: datetime, days: int) -> np.ndarray:
+    """n timestamps (as datetime64[ms]) over the `days` whole days before `end`, following DIURNAL"""
+    start = np.datetime64(end.replace(hour=0, minute=0, second=0, microsecond=0) - timedelta(days=days), "ms")
+    day = rng.integers(0, days, n).astype("timedelta64[D]")
+    hour = rng.choice(24, n, p=DIURNAL / DIURNAL.sum()).astype("timedelta64[h]")
+    ms = rng.integers(0, 3_600_000, n).astype("timedelta64[ms]")
+    return start + day + hour + ms
+
+
+def object_id(when: datetime, seed: int, tag: int, sequence: int) -> ObjectId:
+    """Deterministic ObjectId: creation second, then seed, collection tag and sequence"""
+    seconds = int(when.replace(tzinfo=timezone.utc).timestamp())
+    return ObjectId(f"{seconds:08x}{seed & 0xffff:04x}{tag:02x}{sequence:010x}")
+
+
+def to_datetimes(stamps: np.ndarray) -> List[datetime]:
+    return stamps.astype("datetime64[ms]").tolist()
+
+
+class Generator:
+    def __init__(self, args):
+        self.args = args
+        self.now = args.end
+        seeds = np.random.SeedSequence(args.seed).spawn(len(COLLECTIONS))
+        self.rngs = {name: np.random.default_rng(s) for name, s in zip(COLLECTIONS, seeds)}
+        self.popularity = zipf_weights(args.persons, args.zipf)
+
+    # ---- persons and votes ----
+
+    def votes(self):
+        """Unique (person, device) pairs with a value each, as arrays"""
+        rng = self.rngs["votes"]
+        args = self.args
+        device_weights = zipf_weights(args.devices, args.device_reuse)
+        target = min(args.votes, args.persons * args.devices)
+        # a device votes once per person: draw pairs until enough are distinct
+        keys = np.empty(0, dtype=np.int64)
+        while len(keys) < target:
+            draw = max(target - len(keys), 1000) * 2
+            persons = rng.choice(args.persons, draw, p=self.popularity)
+            devices = rng.choice(args.devices, draw, p=device_weights)
+            keys = np.concatenate([keys, persons.astype(np.int64) * args.devices + devices])
+            _, first = np.unique(keys, return_index=True)
+            keys = keys[np.sort(first)]
+        keys = keys[:target]
+        persons, devices = keys // args.devices, keys % args.devices
+        # each person has a baseline approval, votes follow it
+        approval = self.rngs["persons"].beta(2, 2, args.persons)
+        values = np.where(rng.random(len(persons)) < approval[persons], 1, -1)
+        stamps = diurnal_timestamps(rng, len(persons), self.now, args.days)
+        return persons, devices, values, stamps
+
+    def person_docs(self, persons: np.ndarray, values: np.ndarray) -> Iterator[Dict[str, Any]]:
+        rng = self.rngs["persons"]
+        n = self.args.persons
+        likes = np.bincount(persons[values > 0], minlength=n)
+        dislikes = np.bincount(persons[values < 0], minlength=n)
+        totals = likes + dislikes
+        scores = score_array(likes, dislikes)
+        controversy = controversy_array(likes, dislikes)
+        categories = rng.choice(CATEGORIES, n)
+        sources = rng.choice(SOURCES, n, p=SOURCE_WEIGHTS)
+        created = diurnal_timestamps(rng, n, self.now, max(self.args.days * 4, 30))
+        created_at = to_datetimes(created)
+        self.person_ids = [object_id(when, self.args.seed, 0, i) for i, when in enumerate(created_at)]
+        first = rng.integers(0, len(FIRST), n)
+        last = rng.integers(0, len(LAST), n)
+        self.names = [f"{FIRST[f]} {LAST[l]} {i}" for i, (f, l) in enumerate(zip(first, last))]
+        for i in range(n):
+            yield {
+                "_id": self.person_ids[i],
+                "name": self.names[i],
+                "slug": slugify(self.names[i]),
+                "category": str(categories[i]),
+                "approved": True,
+                "source": str(sources[i]),
+                "is_trending": bool(sources[i] == "trending" and i < 200),
+                "likes": int(likes[i]),
+                "dislikes": int(dislikes[i]),
+                "total_votes": int(totals[i]),
+                "extra_likes": 0,
+                "extra_dislikes": 0,
+                "score": float(scores[i]),
+                "controversy": float(controversy[i]),
+                "created_at": created_at[i],
+                "updated_at": self.now,
+            }
+
+    def vote_docs(self, persons, devices, values, stamps) -> Iterator[Dict[str, Any]]:
+        rows = zip(persons.tolist(), devices.tolist(), values.tolist(), to_datetimes(stamps))
+        for person, device, value, created_at in rows:
+            yield {
+                "person_id": self.person_ids[person],
+                "device_id": f"device-{device}",
+                "value": value,
+                "created_at": created_at,
+                "updated_at": created_at,
+            }
+
+    def event_docs(self, persons, devices, values, stamps) -> Iterator[Dict[str, Any]]:
+        rows = zip(persons.tolist(), devices.tolist(), values.tolist(), to_datetimes(stamps))
+        for person, device, value, created_at in rows:
+            yield {
+                "person_id": self.person_ids[person],
+                "device_id": f"device-{device}",
+                "delta": value,
+                "created_at": created_at,
+            }
+
+    def tick_docs(self, persons, values, stamps) -> Iterator[Dict[str, Any]]:
+        """One tick per sampled vote, with the person's running score at that time"""
+        rng = self.rngs["person_ticks"]
+        order = np.argsort(stamps, kind="stable")
+        keep = (rng.random(len(order)) < self.args.ticks_per_vote).tolist()
+        likes = [0] * self.args.persons
+        dislikes = [0] * self.args.persons
+        rows = zip(persons[order].tolist(), values[order].tolist(), to_datetimes(stamps[order]), keep)
+        for person, value, created_at, kept in rows:
+            if value > 0:
+                likes[person] += 1
+            else:
+                dislikes[person] += 1
+            if kept:
+                yield {
+                    "person_id": self.person_ids[person],
+                    "score": compute_score(likes[person], dislikes[person]),
+                    "created_at": created_at,
+                }
+
+    # ---- searches and credits ----
+
+    def search_docs(self) -> Iterator[Dict[str, Any]]:
+        rng = self.rngs["searches"]
+        n = self.args.searches
+        who = rng.choice(self.args.persons, n, p=self.popularity)
+        noise = rng.random(n) < 0.1
+        created_at = to_datetimes(diurnal_timestamps(rng, n, self.now, self.args.days))
+        devices = rng.integers(0, self.args.devices, n)
+        for i in range(n):
+            yield {
+                "query": SEARCH_NOISE[who[i] % len(SEARCH_NOISE)] if noise[i] else self.names[who[i]],
+                "device_id": f"device-{devices[i]}",
+                "created_at": created_at[i],
+            }
+
+    def credit_docs(self):
+        rng = self.rngs["credit_transactions"]
+        n, users = self.args.transactions, self.args.users
+        buyer = rng.choice(users, n, p=zipf_weights(users, 1.0))
+        is_purchase = rng.random(n) < 0.3
+        super_pack = rng.random(n) < 0.2
+        targets = rng.choice(self.args.persons, n, p=self.popularity)
+        created_at = to_datetimes(diurnal_timestamps(rng, n, self.now, self.args.days))
+
+        balances = np.zeros(users, dtype=np.int64)
+        transactions = []
+        for i in range(n):
+            user = f"user-{buyer[i]}"
+            if is_purchase[i]:
+                amount, price, pack = (1000, 4.99, "super_booster") if super_pack[i] else (100, 0.99, "booster")
+                balances[buyer[i]] += amount
+                transactions.append({
+                    "user_id": user, "type": "purchase", "amount": amount, "price": price, "pack": pack,
+                    "description": f"Purchased {amount} premium vote(s)", "timestamp": created_at[i],
+                    "status": "completed",
+                })
+            else:
+                balances[buyer[i]] -= 1
+                transactions.append({
+                    "user_id": user, "type": "use", "amount": -1,
+                    "description": f"Premium vote x100 for {self.names[targets[i]]}",
+                    "person_id": str(self.person_ids[targets[i]]), "timestamp": created_at[i],
+                    "status": "completed",
+                })
+        credits = [
+            {"user_id": f"user-{u}", "balance": int(max(balances[u], 0)), "is_premium": True,
+             "created_at": self.now, "updated_at": self.now}
+            for u in range(users)
+        ]
+        return credits, transactions
+
+
+async def insert_all(db, collection: str, docs: Iterator[Dict[str, Any]], batch_size: int, workers: int,
+                     seed: int) -> int:
+    """insert_many in batches, with up to `workers` batches in flight"""
+    tag = COLLECTIONS.index(collection)
+    semaphore = asyncio.Semaphore(workers)
+    tasks = []
+    total = 0
+    start = time.monotonic()
+
+    async def insert(batch):
+        try:
+            await db[collection].insert_many(batch, ordered=False)
+        finally:
+            semaphore.release()
+
+    batch: List[Dict[str, Any]] = []
+    for sequence, doc in enumerate(docs):
+        if "_id" not in doc:
+            when = doc.get("created_at") or doc["timestamp"]
+            doc["_id"] = object_id(when, seed, tag, sequence)
+        batch.append(doc)
+        if len(batch) >= batch_size:
+            await semaphore.acquire()
+            tasks.append(asyncio.create_task(insert(batch)))
+            total += len(batch)
+            batch = []
+    if batch:
+        await semaphore.acquire()
+        tasks.append(asyncio.create_task(insert(batch)))
+        total += len(batch)
+    await asyncio.gather(*tasks)
+    elapsed = time.monotonic() - start
+    print(f"{collection:<22} {total:>12,} docs  {elapsed:7.1f} s  {total / max(elapsed, 1e-9):>10,.0f} docs/s")
+    return total
+
+
+async def generate(db, args) -> Dict[str, int]:
+    existing = await db.persons.estimated_document_count()
+    if existing and not args.drop:
+        raise SystemExit(f"{db.name}.persons already has {existing} documents; pass --drop to replace them")
+    if args.drop:
+        await asyncio.gather(*(db.drop_collection(c) for c in COLLECTIONS))
+
+    gen = Generator(args)
+    persons, devices, values, stamps = gen.votes()
+    write = lambda name, docs: insert_all(db, name, docs, args.batch_size, args.workers, args.seed)  # noqa: E731
+
+    counts = {"persons": await write("persons", gen.person_docs(persons, values))}
+    counts["votes"] = await write("votes", gen.vote_docs(persons, devices, values, stamps))
+    counts["vote_events"] = await write("vote_events", gen.event_docs(persons, devices, values, stamps))
+    counts["person_ticks"] = await write("person_ticks", gen.tick_docs(persons, values, stamps))
+    counts["searches"] = await write("searches", gen.search_docs())
+    credits, transactions = gen.credit_docs()
+    counts["user_credits"] = await write("user_credits", iter(credits))
+    counts["credit_transactions"] = await write("credit_transactions", iter(transactions))
+
+    if not args.skip_indexes:
+        start = time.monotonic()
+        await sync_indexes(db)
+        print(f"{'indexes':<22} {'':>12}       {time.monotonic() - start:7.1f} s")
+    return counts
+
+
+def main():
+    from dotenv import load_dotenv
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    load_dotenv(Path(__file__).resolve().parent.parent / "backend" / ".env")
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mongo-url", default=os.getenv("MONGO_URL", "mongodb://localhost:27017"))
+    parser.add_argument("--db", default="popular_scale", help="target database (never defaults to DB_NAME)")
+    parser.add_argument("--persons", type=int, default=10000)
+    parser.add_argument("--votes", type=int, default=1_000_000)
+    parser.add_argument("--devices", type=int, default=200_000)
+    parser.add_argument("--searches", type=int, default=500_000)
+    parser.add_argument("--users", type=int, default=5000)
+    parser.add_argument("--transactions", type=int, default=100_000)
+    parser.add_argument("--days", type=int, default=30, help="history length")
+    parser.add_argument("--zipf", type=float, default=1.1, help="popularity exponent")
+    parser.add_argument("--device-reuse", type=float, default=0.8, help="device activity exponent")
+    parser.add_argument("--ticks-per-vote", type=float, default=1.0, help="fraction of votes that write a tick")
+    parser.add_argument("--batch-size", type=int, default=10000)
+    parser.add_argument("--workers", type=int, default=8, help="insert_many batches in flight")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--end", type=datetime.fromisoformat,
+                        default=datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0),
+                        help="UTC end of the history (default: today 00:00, so runs on the same day match)")
+    parser.add_argument("--drop", action="store_true", help="drop the generated collections first")
+    parser.add_argument("--skip-indexes", action="store_true")
+    args = parser.parse_args()
+
+    client = AsyncIOMotorClient(args.mongo_url)
+    try:
+        start = time.monotonic()
+        counts = asyncio.run(generate(client[args.db], args))
+        print(f"{'total':<22} {sum(counts.values()):>12,} docs  {time.monotonic() - start:7.1f} s")
+    finally:
+        client.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,341 @@
+"""
+Load test: replay realistic request mixes against the API and report
+throughput and p50/p95/p99 latency per route
+
+By default the app is driven in-process through an ASGI client, backed by
+an in-memory Motor stand-in (mongomock-motor) or a local mongod
+(--mongo-url; a throwaway database is seeded and dropped). With --base-url
+the requests go to a running server instead (e.g. a local uvicorn), whose
+database must already hold data (see generate_dataset.py).
+
+Mixes:
+    votes     vote storm on one person from many devices
+    browse    people lists, name search, suggestions, controversial
+    charts    person charts, trends, trending now
+    premium   credit purchase, premium votes, balance and history
+    all       a weighted blend of the above
+
+    python benchmarks/loadtest.py --mix all --duration 20 --concurrency 32 --out results.json
+    python benchmarks/loadtest.py --mix votes --baseline benchmarks/baselines/loadtest_votes.json
+
+benchmarks/baselines/loadtest_votes.json is the votes mix recorded in-process
+against the in-memory stand-in (--duration 10 --concurrency 16). Like every
+baseline it only means something on the machine that recorded it: record
+one there first with --out, then compare with --baseline.
+"""
+
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Tuple
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+# (route template, weight, request builder); a builder returns (method, url, kwargs)
+Action = Tuple[str, float, Callable[["LoadContext", random.Random], Tuple[str, str, Dict[str, Any]]]]
+
+CATEGORIES = ["politics", "culture", "business", "sport", "other"]
+
+
+class LoadContext:
+    def __init__(self, person_ids: List[str], names: List[str], users: List[str]):
+        self.person_ids = person_ids
+        self.names = names
+        self.users = users
+        # the person every vote storm hits
+        self.hot_person = person_ids[0]
+
+
+def _vote(ctx, rng):
+    return "POST", f"/api/people/{ctx.hot_person}/vote", {
+        "json": {"value": rng.choice([1, -1])},
+        "headers": {"X-Device-ID": f"load-device-{rng.randrange(100000)}"},
+    }
+
+
+def _list(ctx, rng):
+    return "GET", "/api/people", {"params": {"limit": 20, "category": rng.choice(CATEGORIES + ["all"])}}
+
+
+def _people_search(ctx, rng):
+    return "GET", "/api/people", {"params": {"query": rng.choice(ctx.names).split()[0]}}
+
+
+def _search(ctx, rng):
+    return "GET", "/api/search", {"params": {"query": rng.choice(ctx.names)[:4]}}
+
+
+def _suggestions(ctx, rng):
+    return "GET", "/api/search-suggestions", {"params": {"window": "24h"}}
+
+
+def _controversial(ctx, rng):
+    return "GET", "/api/controversial", {}
+
+
+def _chart(ctx, rng):
+    return "GET", f"/api/people/{rng.choice(ctx.person_ids)}/chart", {"params": {"window": rng.choice(["60m", "24h"])}}
+
+
+def _trends(ctx, rng):
+    return "GET", "/api/trends", {"params": {"window": rng.choice(["60m", "24h"])}}
+
+
+def _trending_now(ctx, rng):
+    return "GET", "/api/trending-now", {}
+
+
+def _purchase(ctx, rng):
+    return "POST", "/api/credits/purchase", {
+        "json": {"user_id": rng.choice(ctx.users), "pack": "booster", "amount": 100, "price": 0.99},
+    }
+
+
+def _use_credit(ctx, rng):
+    index = rng.randrange(len(ctx.person_ids))
+    return "POST", "/api/credits/use", {
+        "json": {"person_id": ctx.person_ids[index], "person_name": ctx.names[index], "vote": 1},
+        "headers": {"user-id": rng.choice(ctx.users)},
+    }
+
+
+def _balance(ctx, rng):
+    return "GET", f"/api/credits/balance/{rng.choice(ctx.users)}", {}
+
+
+def _history(ctx, rng):
+    return "GET", f"/api/credits/history/{rng.choice(ctx.users)}", {}
+
+
+MIXES: Dict[str, List[Action]] = {
+    "votes": [
+        ("POST /api/people/{person_id}/vote", 1.0, _vote),
+    ],
+    "browse": [
+        ("GET /api/people", 4, _list),
+        ("GET /api/people?query", 2, _people_search),
+        ("GET /api/search", 2, _search),
+        ("GET /api/search-suggestions", 1, _suggestions),
+        ("GET /api/controversial", 1, _controversial),
+    ],
+    "charts": [
+        ("GET /api/people/{person_id}/chart", 4, _chart),
+        ("GET /api/trends", 2, _trends),
+        ("GET /api/trending-now", 1, _trending_now),
+    ],
+    "premium": [
+        ("POST /api/credits/purchase", 1, _purchase),
+        ("POST /api/credits/use", 2, _use_credit),
+        ("GET /api/credits/balance/{user_id}", 3, _balance),
+        ("GET /api/credits/history/{user_id}", 1, _history),
+    ],
+}
+MIXES["all"] = (
+    [(r, w * 3, b) for r, w, b in MIXES["votes"]]
+    + [(r, w * 4, b) for r, w, b in MIXES["browse"]]
+    + [(r, w * 2, b) for r, w, b in MIXES["charts"]]
+    + MIXES["premium"]
+)
+
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(q / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def summarize(samples: Dict[str, List[Tuple[float, int]]], elapsed: float) -> Dict[str, Any]:
+    routes = {}
+    for route, rows in sorted(samples.items()):
+        latencies = sorted(ms for ms, _ in rows)
+        statuses: Dict[str, int] = {}
+        for _, status in rows:
+            statuses[str(status)] = statuses.get(str(status), 0) + 1
+        routes[route] = {
+            "requests": len(rows),
+            "rps": round(len(rows) / elapsed, 1),
+            "p50_ms": round(percentile(latencies, 50), 2),
+            "p95_ms": round(percentile(latencies, 95), 2),
+            "p99_ms": round(percentile(latencies, 99), 2),
+            "max_ms": round(latencies[-1], 2),
+            "errors": sum(n for s, n in statuses.items() if s == "error" or int(s) >= 500),
+            "statuses": statuses,
+        }
+    total = sum(r["requests"] for r in routes.values())
+    return {"elapsed_s": round(elapsed, 2), "requests": total, "rps": round(total / elapsed, 1), "routes": routes}
+
+
+async def run_load(client, ctx: LoadContext, mix: List[Action], duration: float, concurrency: int, seed: int):
+    samples: Dict[str, List[Tuple[float, int]]] = {}
+    weights = [w for _, w, _ in mix]
+    deadline = time.perf_counter() + duration
+
+    async def worker(n: int):
+        rng = random.Random(seed * 1000 + n)
+        while time.perf_counter() < deadline:
+            route, _, build = rng.choices(mix, weights)[0]
+            method, url, kwargs = build(ctx, rng)
+            start = time.perf_counter()
+            try:
+                response = await client.request(method, url, **kwargs)
+                status = response.status_code
+            except Exception:
+                status = "error"
+            samples.setdefault(route, []).append(((time.perf_counter() - start) * 1000, status))
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker(n) for n in range(concurrency)))
+    return summarize(samples, time.perf_counter() - start)
+
+
+async def seed_database(db, persons: int, seed: int) -> LoadContext:
+    """A small dataset for load runs: persons with ticks, searches and funded users"""
+    rng = random.Random(seed)
+    now = datetime.utcnow()
+    names = [f"{rng.choice(['Alex', 'Sam', 'Maria', 'Chen', 'Fatou', 'Ivan'])} Load{i}" for i in range(persons)]
+    docs = []
+    for i, name in enumerate(names):
+        likes, dislikes = rng.randint(0, 500), rng.randint(0, 500)
+        docs.append({
+            "name": name, "slug": f"load-{i}", "category": rng.choice(CATEGORIES), "approved": True,
+            "source": "seed", "likes": likes, "dislikes": dislikes, "total_votes": likes + dislikes,
+            "score": round(100 * likes / max(likes + dislikes, 1) / 25) * 25,
+            "created_at": now - timedelta(days=rng.randint(0, 90)), "updated_at": now,
+        })
+    ids = (await db.persons.insert_many(docs)).inserted_ids
+    await db.person_ticks.insert_many([
+        {"person_id": rng.choice(ids), "score": rng.choice([0, 25, 50, 75, 100]),
+         "created_at": now - timedelta(minutes=rng.randint(0, 60 * 24))}
+        for _ in range(persons * 10)
+    ])
+    await db.searches.insert_many([
+        {"query": rng.choice(names), "created_at": now - timedelta(minutes=rng.randint(0, 60 * 24))}
+        for _ in range(persons * 2)
+    ])
+    users = [f"load-user-{u}" for u in range(50)]
+    await db.user_credits.insert_many([
+        {"user_id": u, "balance": 1_000_000, "total_purchased": 0, "is_premium": True, "created_at": now}
+        for u in users
+    ])
+    return LoadContext([str(i) for i in ids], names, users)
+
+
+async def context_from_server(client) -> LoadContext:
+    people = (await client.get("/api/people", params={"limit": 50})).json()
+    if not people:
+        raise SystemExit("The target server has no people; seed its database first")
+    return LoadContext([p["id"] for p in people], [p["name"] for p in people], [f"load-user-{u}" for u in range(50)])
+
+
+def diff_against(baseline: Dict[str, Any], result: Dict[str, Any], max_regression: float) -> List[str]:
+    """Print a per-route comparison; returns the regressions beyond max_regression percent"""
+    regressions = []
+    print(f"\n{'route':<40} {'metric':<8} {'baseline':>10} {'now':>10} {'change':>8}")
+    for route, now in result["routes"].items():
+        before = baseline.get("routes", {}).get(route)
+        if not before:
+            print(f"{route:<40} (new route)")
+            continue
+        for metric, higher_is_worse in (("rps", False), ("p50_ms", True), ("p95_ms", True), ("p99_ms", True)):
+            old, new = before[metric], now[metric]
+            change = (new - old) / old * 100 if old else 0.0
+            print(f"{route:<40} {metric:<8} {old:>10} {new:>10} {change:>+7.1f}%")
+            if (change if higher_is_worse else -change) > max_regression:
+                regressions.append(f"{route} {metric} {change:+.1f}%")
+    return regressions
+
+
+def print_report(result: Dict[str, Any]):
+    print(f"\n{'route':<40} {'reqs':>7} {'rps':>8} {'p50':>8} {'p95':>8} {'p99':>8} {'err':>5}")
+    for route, r in result["routes"].items():
+        print(f"{route:<40} {r['requests']:>7} {r['rps']:>8} {r['p50_ms']:>8} {r['p95_ms']:>8} {r['p99_ms']:>8} "
+              f"{r['errors']:>5}")
+    print(f"{'total':<40} {result['requests']:>7} {result['rps']:>8}")
+
+
+async def main_async(args) -> Dict[str, Any]:
+    import httpx
+
+    mix = MIXES[args.mix]
+    if args.base_url:
+        async with httpx.AsyncClient(base_url=args.base_url, timeout=30) as client:
+            ctx = await context_from_server(client)
+            return await run_load(client, ctx, mix, args.duration, args.concurrency, args.seed)
+
+    os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+    os.environ.setdefault("DB_NAME", "popular_loadtest")
+    import server
+
+    if args.mongo_url:
+        from motor.motor_asyncio import AsyncIOMotorClient
+        mongo = AsyncIOMotorClient(args.mongo_url)
+    else:
+        from mongomock_motor import AsyncMongoMockClient
+        mongo = AsyncMongoMockClient()
+    db_name = f"loadtest_{os.getpid()}"
+    server.client, server.db = mongo, mongo[db_name]
+    shards = getattr(args, "vote_shards", 0)
+    if shards:
+        server.vote_shards.count = shards
+        server.vote_shards.start(server.db)
+    try:
+        ctx = await seed_database(server.db, args.persons, args.seed)
+        transport = httpx.ASGITransport(app=server.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://loadtest", timeout=30) as client:
+            return await run_load(client, ctx, mix, args.duration, args.concurrency, args.seed)
+    finally:
+        server.admin_stats_cache.shutdown()
+        server.vote_shards.shutdown()
+        await mongo.drop_database(db_name)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mix", choices=list(MIXES), default="all")
+    parser.add_argument("--duration", type=float, default=10, help="seconds")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--persons", type=int, default=500, help="persons seeded for in-process runs")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--vote-shards", type=int, default=0,
+                        help="in-process runs: sharded vote counters with N shards per person")
+    target = parser.add_mutually_exclusive_group()
+    target.add_argument("--mongo-url", help="local mongod for in-process runs (default: in-memory stand-in)")
+    target.add_argument("--base-url", help="drive a running server instead, e.g. http://localhost:8001")
+    parser.add_argument("--out", type=Path, help="write results as JSON")
+    parser.add_argument("--baseline", type=Path, help="JSON results to diff against")
+    parser.add_argument("--max-regression", type=float, default=20, help="percent; exit 1 beyond it")
+    args = parser.parse_args()
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+
+    result = asyncio.run(main_async(args))
+    result["meta"] = {
+        "mix": args.mix,
+        "concurrency": args.concurrency,
+        "backend": "http" if args.base_url else ("mongod" if args.mongo_url else "in-memory"),
+        "at": datetime.utcnow().isoformat(),
+    }
+    print_report(result)
+
+    if args.out:
+        args.out.parent.mkdir(parents=True, exist_ok=True)
+        args.out.write_text(json.dumps(result, indent=2))
+    if args.baseline:
+        baseline = json.loads(args.baseline.read_text())
+        if baseline.get("meta", {}).get("backend") != result["meta"]["backend"]:
+            print(f"\n⚠️ baseline was recorded against {baseline.get('meta', {}).get('backend')}")
+        regressions = diff_against(baseline, result, args.max_regression)
+        if regressions:
+            print("\nRegressions:\n  " + "\n  ".join(regressions))
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,184 @@
+"""
+Micro-benchmarks: pure-Python helpers on the request path
+
+Each benchmark runs a helper over a fixed set of representative inputs.
+pyperf-style: loops are calibrated so one run lasts at least --min-time,
+then --runs runs are timed, and the median time per call is reported with
+its spread. Comparisons use the fastest run, which is the least sensitive to
+noise from other processes.
+
+Baselines are stored as JSON (benchmarks/baselines/microbench.json by
+default). --compare prints the change against a baseline and exits 1 when a
+benchmark got slower than --max-regression. Baselines are only meaningful
+on the machine that recorded them: re-record before comparing elsewhere.
+
+    python benchmarks/microbench.py [--filter slugify] [--save [PATH]] [--compare [PATH]]
+"""
+
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+
+from bson import ObjectId
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+DEFAULT_BASELINE = Path(__file__).resolve().parent / "baselines" / "microbench.json"
+
+NAMES = [
+    "Taylor Swift", "  Jean-Luc   Mélenchon ", "Dr. Dre", "AC/DC", "Beyoncé Knowles-Carter",
+    "elon musk", "Kylian Mbappé", "Prince of Wales", "Lionel Andrés Messi", "50 Cent",
+]
+WINDOWS = ["60m", "24h", "15m", "168h", "7d", "2d"]
+CHART_WINDOWS = ["60m", "24h", "15m", "168h", "6h", "1h"]
+# (likes, dislikes) as seen by vote_person, from a new person to a heavily voted one
+VOTE_COUNTS = [(0, 0), (1, 0), (0, 1), (3, 2), (17, 40), (250, 251), (9000, 1200), (123456, 98765)]
+TERMS = [
+    "Taylor Swift", "weather today", "Lionel Messi", "iphone 16", "Kylian Mbappe", "Warriors vs Lakers",
+    "Prince of Wales", "election results", "Madonna", "Beyoncé Knowles", "world cup 2026", "Greta Thunberg",
+]
+
+
+def person_docs() -> List[Dict[str, Any]]:
+    now = datetime(2026, 1, 1)
+    return [
+        {"_id": ObjectId(), "name": name, "slug": name.lower(), "category": "culture", "approved": True,
+         "score": 75, "likes": 30 + i, "dislikes": 10, "total_votes": 40 + i, "created_at": now,
+         "updated_at": now, "source": "seed" if i % 2 else "user_added"}
+        for i, name in enumerate(NAMES)
+    ]
+
+
+def build_benchmarks() -> Dict[str, Callable[[], Any]]:
+    """name -> zero-argument callable running the helper over its inputs"""
+    os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+    os.environ.setdefault("DB_NAME", "popular_microbench")
+    import server
+    from name_classifier import NameClassifier, classify_term
+    from scoring import compute_score
+    from trends_service import GoogleTrendsService, StubTransport
+    from utils import slugify
+
+    docs = person_docs()
+    cache_dir = tempfile.mkdtemp(prefix="microbench-")
+    service = GoogleTrendsService(transport=StubTransport(), classifier=NameClassifier(Path(cache_dir) / "names.json"))
+    for term in TERMS:
+        service.is_likely_person_name(term)  # warm the decision cache
+
+    return {
+        "slugify": lambda: [slugify(name) for name in NAMES],
+        "parse_window": lambda: [server.parse_window(w) for w in WINDOWS],
+        "parse_recent_window": lambda: [server.parse_recent_window(w) for w in CHART_WINDOWS],
+        "vote_score": lambda: [compute_score(likes, dislikes) for likes, dislikes in VOTE_COUNTS],
+        "person_to_out": lambda: [server.person_to_out(doc) for doc in docs],
+        "is_likely_person_name": lambda: [service.is_likely_person_name(term) for term in TERMS],
+        "classify_term_uncached": lambda: [classify_term(term) for term in TERMS],
+    }
+
+
+def calibrate(fn: Callable[[], Any], min_time: float) -> int:
+    loops = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(loops):
+            fn()
+        if time.perf_counter() - start >= min_time:
+            return loops
+        loops *= 2
+
+
+def measure(fn: Callable[[], Any], runs: int, min_time: float) -> Dict[str, Any]:
+    """Median and spread of the time per call, in nanoseconds"""
+    loops = calibrate(fn, min_time)
+    per_call = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        for _ in range(loops):
+            fn()
+        per_call.append((time.perf_counter() - start) / loops * 1e9)
+    return {
+        "median_ns": round(statistics.median(per_call), 1),
+        "stdev_ns": round(statistics.stdev(per_call), 1) if runs > 1 else 0.0,
+        "min_ns": round(min(per_call), 1),
+        "loops": loops,
+        "runs": runs,
+    }
+
+
+def run_suite(names: Optional[List[str]] = None, runs: int = 10, min_time: float = 0.05) -> Dict[str, Dict[str, Any]]:
+    benchmarks = build_benchmarks()
+    results = {}
+    for name, fn in benchmarks.items():
+        if names and not any(part in name for part in names):
+            continue
+        results[name] = measure(fn, runs, min_time)
+    return results
+
+
+def compare(baseline: Dict[str, Dict[str, Any]], results: Dict[str, Dict[str, Any]],
+            max_regression: float) -> List[Dict[str, Any]]:
+    """One row per benchmark present in both; `regressed` when slower than allowed"""
+    rows = []
+    for name, result in results.items():
+        before = baseline.get(name)
+        if not before:
+            continue
+        change = result["min_ns"] / before["min_ns"] - 1
+        rows.append({"name": name, "before_ns": before["min_ns"], "after_ns": result["min_ns"],
+                     "change": change, "regressed": change > max_regression})
+    return rows
+
+
+def metadata() -> Dict[str, Any]:
+    return {
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "machine": platform.machine(),
+        "platform": platform.platform(),
+        "recorded_at": datetime.utcnow().isoformat(timespec="seconds"),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--filter", action="append", help="only benchmarks whose name contains this (repeatable)")
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--min-time", type=float, default=0.05, help="seconds per run")
+    parser.add_argument("--save", nargs="?", const=DEFAULT_BASELINE, type=Path, help="store results as baseline")
+    parser.add_argument("--compare", nargs="?", const=DEFAULT_BASELINE, type=Path, help="compare with a baseline")
+    parser.add_argument("--max-regression", type=float, default=0.20, help="allowed slowdown, as a fraction")
+    args = parser.parse_args()
+
+    results = run_suite(args.filter, args.runs, args.min_time)
+    for name, r in results.items():
+        print(f"{name:<26} {r['median_ns'] / 1000:9.2f} µs/call  ± {r['stdev_ns'] / 1000:6.2f}  "
+              f"(min {r['min_ns'] / 1000:.2f}, {r['runs']} runs x {r['loops']} loops)")
+
+    status = 0
+    if args.compare:
+        stored = json.loads(args.compare.read_text())
+        print(f"\nvs {args.compare} (Python {stored['meta']['python']}, {stored['meta']['recorded_at']})")
+        for row in compare(stored["benchmarks"], results, args.max_regression):
+            flag = "  REGRESSION" if row["regressed"] else ""
+            print(f"{row['name']:<26} {row['before_ns'] / 1000:9.2f} -> {row['after_ns'] / 1000:9.2f} µs (min)  "
+                  f"{row['change']:+7.1%}{flag}")
+            if row["regressed"]:
+                status = 1
+
+    if args.save:
+        args.save.parent.mkdir(parents=True, exist_ok=True)
+        args.save.write_text(json.dumps({"meta": metadata(), "benchmarks": results}, indent=2) + "\n")
+        print(f"\nBaseline saved to {args.save}")
+    sys.exit(status)
+
+
+if __name__ == "__main__":
+    main()
@@ -67,6 +67,20 @@ interface Settings {
 
 type Tab = 'dashboard' | 'moderation' | 'activity' | 'settings';
 
+// Long admin operations run as background jobs; poll until they finish
+const waitForJob = async (jobId: string, timeoutMs = 120000) => {
+  const deadline = Date.now() + timeoutMs;
+  while (Date.now() < deadline) {
+    const res = await fetch(API(`/admin/jobs/${jobId}`));
+    if (res.ok) {
+      const job = await res.json();
+      if (job.status !== 'queued' && job.status !== 'running') return job;
+    }
+    await new Promise((resolve) => setTimeout(resolve, 1000));
+  }
+  return null;
+};
+
 export default function Admin() {
   const router = useRouter();
   const [authenticated, setAuthenticated] = useState(false);
@@ -268,6 +282,12 @@ export default function Admin() {
             try {
               const res = await fetch(API(`/admin/person/${person.id}`), { method: 'DELETE' });
               if (res.ok) {
+                const { job_id } = await res.json();
+                const job = await waitForJob(job_id);
+                if (!job || job.status !== 'succeeded') {
+                  Alert.alert('Error', job?.error || 'Deletion failed');
+                  return;
+                }
                 Alert.alert('✅ Deleted', `"${person.name}" has been deleted`);
                 loadData();
               } else {
@@ -345,7 +365,13 @@ export default function Admin() {
             try {
               const res = await fetch(API('/admin/refresh-trends'), { method: 'POST' });
               if (res.ok) {
-                const result = await res.json();
+                const { job_id } = await res.json();
+                const job = await waitForJob(job_id);
+                if (!job || job.status !== 'succeeded') {
+                  Alert.alert('Error', job?.error || 'Refresh failed');
+                  return;
+                }
+                const result = job.result;
                 Alert.alert(
                   '✅ Trends Refreshed !',
                   `${result.added} new personalities added\n${result.updated} updated as trending`,
@@ -0,0 +1,46 @@
+import os
+import sys
+from pathlib import Path
+
+import httpx
+import pytest
+
+# The backend is a flat set of modules run from its own directory
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+
+class FakeEvent:
+    """Stand-in for the pymongo command events passed to a CommandListener"""
+
+    def __init__(self, request_id, command_name, command=None, reply=None, duration_micros=0):
+        self.request_id = request_id
+        self.command_name = command_name
+        self.command = command or {}
+        self.reply = reply or {}
+        self.duration_micros = duration_micros
+        self.database_name = "popular"
+
+
+@pytest.fixture
+def fake_event():
+    return FakeEvent
+
+
+@pytest.fixture
+def asgi_client():
+    """Factory of httpx clients calling an ASGI app in process"""
+    def client(app):
+        return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test")
+    return client
+
+
+@pytest.fixture
+def server(monkeypatch):
+    """The server module, its database swapped for an in-memory one"""
+    mongomock_motor = pytest.importorskip("mongomock_motor")
+    os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+    os.environ.setdefault("DB_NAME", "popular_test")
+    import server
+
+    monkeypatch.setattr(server, "db", mongomock_motor.AsyncMongoMockClient()["server_test"])
+    return server
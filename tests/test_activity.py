@@ -0,0 +1,56 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+from bson import ObjectId
+
+from activity import ActivityTail
+
+mongomock_motor = pytest.importorskip("mongomock_motor")
+
+
+def test_cursor_is_shared_by_workers_and_keeps_ties():
+    db = mongomock_motor.AsyncMongoMockClient()["activity_test"]
+    first, second = ActivityTail(), ActivityTail()
+
+    async def run():
+        await first.record(db, "purchase", user_id="u1")
+        latest = await second.since(db)
+        cursor = latest[-1]["cursor"]
+        await second.record(db, "person_added", name="Someone")
+        # two events sharing a timestamp
+        tie = datetime.utcnow() + timedelta(seconds=1)
+        await db.activity_events.insert_many([
+            {"_id": ObjectId(), "type": "use", "timestamp": tie, "user_id": "u2"},
+            {"_id": ObjectId(), "type": "use", "timestamp": tie, "user_id": "u3"},
+        ])
+        page = await first.since(db, cursor, limit=2)
+        rest = await second.since(db, page[-1]["cursor"])
+        return latest, page, rest, await first.last_cursor(db)
+
+    latest, page, rest, last = asyncio.run(run())
+    assert [e["user_id"] for e in latest] == ["u1"]
+    assert [e.get("user_id") for e in page + rest] == [None, "u2", "u3"]
+    assert rest[-1]["cursor"] == last
+    assert page[0]["type"] == "person_added" and "_id" not in page[0]
+
+
+def test_recent_activity_pages_through_equal_timestamps(server, asgi_client):
+    at = datetime.utcnow().replace(microsecond=0)
+
+    async def run():
+        await server.db.credit_transactions.insert_many([
+            {"type": "use", "user_id": f"u{i}", "description": "vote", "timestamp": at} for i in range(5)
+        ])
+        seen = []
+        params = {"limit": 2}
+        async with asgi_client(server.app) as client:
+            while True:
+                body = (await client.get("/api/admin/activity/recent", params=params)).json()
+                seen += [e["user_id"] for e in body["stream"]]
+                if not body["next_before"]:
+                    return seen
+                params = {"limit": 2, "before": body["next_before"], "before_id": body["next_before_id"]}
+
+    seen = asyncio.run(run())
+    assert sorted(seen) == [f"u{i}" for i in range(5)]
@@ -0,0 +1,91 @@
+import asyncio
+from datetime import datetime
+from types import SimpleNamespace
+
+import pytest
+
+import admin_stats
+from admin_stats import AdminStatsCache, compute_admin_stats
+
+mongomock_motor = pytest.importorskip("mongomock_motor")
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def computes(monkeypatch):
+    """Number of stats computations; each takes a moment so concurrent reads overlap"""
+    calls = []
+
+    async def compute(db):
+        calls.append(db)
+        await asyncio.sleep(0.01)
+        return {"total_people": len(calls)}
+
+    monkeypatch.setattr(admin_stats, "compute_admin_stats", compute)
+    return calls
+
+
+def test_snapshot_is_served_for_the_ttl(monkeypatch, computes):
+    clock = Clock()
+    monkeypatch.setattr(admin_stats, "time", SimpleNamespace(monotonic=clock))
+    cache = AdminStatsCache(ttl_seconds=30)
+
+    async def run():
+        first = await asyncio.gather(*(cache.get("db") for _ in range(5)))
+        clock.now += 29
+        cached = await cache.get("db")
+        clock.now += 2
+        expired = await cache.get("db")
+        cache.invalidate("person-id")
+        invalidated = await cache.get("db")
+        cache.shutdown()
+        return first, cached, expired, invalidated
+
+    first, cached, expired, invalidated = asyncio.run(run())
+    assert [s["total_people"] for s in first] == [1] * 5  # concurrent readers share one computation
+    assert (cached["total_people"], expired["total_people"], invalidated["total_people"]) == (1, 2, 3)
+
+
+def test_refresher_recomputes_ahead_of_reads_until_idle(monkeypatch, computes):
+    monkeypatch.setattr(admin_stats, "REFRESHER_IDLE_SECONDS", 0.3)
+    cache = AdminStatsCache(ttl_seconds=0.1)
+
+    async def run():
+        await cache.get("db")
+        await asyncio.sleep(0.25)
+        refreshed = len(computes)
+        await asyncio.sleep(0.4)
+        idle = len(computes)
+        await asyncio.sleep(0.2)
+        return refreshed, cache._refresher.done(), idle, len(computes)
+
+    refreshed, stopped, idle, total = asyncio.run(run())
+    assert refreshed >= 3  # the read's computation plus refreshes every ttl / 2
+    assert stopped and total == idle
+
+
+def test_stats_are_computed_in_one_pass():
+    db = mongomock_motor.AsyncMongoMockClient()["admin_stats_test"]
+    now = datetime.utcnow()
+
+    async def run():
+        await db.persons.insert_many([
+            {"name": "A", "total_votes": 3, "likes": 2, "dislikes": 1, "created_at": now},
+            {"name": "B", "total_votes": 4, "likes": 4, "dislikes": 0, "created_at": datetime(2020, 1, 1)},
+        ])
+        await db.credit_transactions.insert_many([
+            {"type": "purchase", "user_id": "u1", "price": 0.99, "timestamp": now},
+            {"type": "use", "user_id": "u2", "timestamp": now},
+            {"type": "purchase", "user_id": "u3", "price": 4.99, "timestamp": datetime(2020, 1, 1)},
+        ])
+        return await compute_admin_stats(db)
+
+    assert asyncio.run(run()) == {"total_people": 2, "total_votes": 7, "active_users_24h": 2,
+                                  "revenue_24h": "0.99", "new_people_24h": 1}
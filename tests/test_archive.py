@@ -0,0 +1,79 @@
+import asyncio
+import time
+from datetime import datetime, timedelta
+
+import pytest
+from bson import ObjectId
+
+import archive
+from archive import export_closed_partitions, export_partition, load_range, partition_path
+
+mongomock_motor = pytest.importorskip("mongomock_motor")
+
+TODAY = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def ticks(day, count, person_id):
+    return [{"person_id": person_id, "score": float(i % 101), "created_at": day + timedelta(minutes=i)}
+            for i in range(count)]
+
+
+def test_export_round_trips_through_load_range(tmp_path, monkeypatch):
+    monkeypatch.setattr(archive, "EXPORT_BATCH_SIZE", 7)
+    db = mongomock_motor.AsyncMongoMockClient()["archive_test"]
+    day = TODAY - timedelta(days=3)
+    person_id = ObjectId()
+
+    async def run():
+        await db.person_ticks.insert_many(ticks(day, 20, person_id) + ticks(day + timedelta(days=1), 5, person_id))
+        return await export_partition(db, "person_ticks", day, root=tmp_path)
+
+    rows = asyncio.run(run())
+    df = load_range("person_ticks", day + timedelta(minutes=5), day + timedelta(days=1), root=tmp_path)
+
+    assert rows == 20
+    assert not partition_path("person_ticks", day, tmp_path).with_suffix(".tmp").exists()
+    assert len(df) == 15
+    assert set(df["person_id"]) == {str(person_id)}
+    assert df["score"].tolist() == [float(i) for i in range(5, 20)]
+
+
+def test_only_missing_closed_days_are_exported(tmp_path):
+    db = mongomock_motor.AsyncMongoMockClient()["archive_closed_test"]
+
+    async def run():
+        await db.vote_events.insert_many([
+            {"person_id": ObjectId(), "device_id": f"d{i}", "delta": 1, "created_at": day + timedelta(hours=1)}
+            for i, day in enumerate([TODAY - timedelta(days=2), TODAY - timedelta(days=1), TODAY])
+        ])
+        first = await export_closed_partitions(db, "vote_events", root=tmp_path)
+        again = await export_closed_partitions(db, "vote_events", root=tmp_path)
+        return first, again
+
+    first, again = asyncio.run(run())
+    assert list(first.values()) == [1, 1]  # today is still open
+    assert again == {}
+
+
+def test_export_does_not_block_the_event_loop(tmp_path, monkeypatch):
+    def slow_write(writer, collection, docs):
+        time.sleep(0.3)
+        writer.write_batch(archive._to_record_batch(collection, docs))
+
+    monkeypatch.setattr(archive, "_write_batch", slow_write)
+    db = mongomock_motor.AsyncMongoMockClient()["archive_loop_test"]
+    day = TODAY - timedelta(days=1)
+
+    async def main():
+        await db.person_ticks.insert_many(ticks(day, 10, ObjectId()))
+        worst = 0.0
+        export = asyncio.create_task(export_partition(db, "person_ticks", day, root=tmp_path))
+        while not export.done():
+            start = time.perf_counter()
+            await asyncio.sleep(0.01)
+            worst = max(worst, time.perf_counter() - start - 0.01)
+        return await export, worst
+
+    rows, worst_lag = asyncio.run(main())
+    assert rows == 10
+    assert worst_lag < 0.1
@@ -0,0 +1,57 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+
+import daily_stats
+from daily_stats import ROLLING_ID, ROLLING_MAX_AGE, get_rolling_stats, refresh_daily_stats
+
+mongomock_motor = pytest.importorskip("mongomock_motor")
+
+
+@pytest.fixture
+def computed(monkeypatch):
+    """Windows passed to compute_stats; its $lookup sub-pipeline is beyond mongomock"""
+    windows = []
+
+    async def compute_stats(db, start, end):
+        windows.append((start, end))
+        return {"votes_24h": len(windows)}
+
+    monkeypatch.setattr(daily_stats, "compute_stats", compute_stats)
+    return windows
+
+
+def test_rolling_stats_are_recomputed_only_when_stale(computed):
+    db = mongomock_motor.AsyncMongoMockClient()["daily_stats_rolling_test"]
+
+    async def run():
+        missing = await get_rolling_stats(db)
+        fresh = await get_rolling_stats(db)
+        stale_at = datetime.utcnow() - ROLLING_MAX_AGE - timedelta(minutes=1)
+        await db.daily_stats.update_one({"_id": ROLLING_ID}, {"$set": {"computed_at": stale_at}})
+        stale = await get_rolling_stats(db)
+        return missing, fresh, stale, await db.daily_stats.find_one({"_id": ROLLING_ID})
+
+    missing, fresh, stale, stored = asyncio.run(run())
+    assert (missing["votes_24h"], fresh["votes_24h"], stale["votes_24h"]) == (1, 1, 2)
+    assert stored["votes_24h"] == 2
+    start, end = computed[-1]
+    assert end - start == timedelta(days=1)
+
+
+def test_refresh_recomputes_yesterday_until_final(computed):
+    db = mongomock_motor.AsyncMongoMockClient()["daily_stats_refresh_test"]
+    yesterday = datetime.utcnow() - timedelta(days=1)
+    day_start = yesterday.replace(hour=0, minute=0, second=0, microsecond=0)
+
+    async def run():
+        await refresh_daily_stats(db)
+        first = len(computed)
+        await refresh_daily_stats(db)
+        return first, len(computed) - first, await db.daily_stats.find_one({"_id": f"{yesterday:%Y-%m-%d}"})
+
+    first, second, stored = asyncio.run(run())
+    assert (first, second) == (3, 2)  # rolling, today and yesterday, then yesterday is final
+    assert stored["final"] and stored["day"] == day_start
+    assert (day_start, day_start + timedelta(days=1)) in computed
@@ -0,0 +1,43 @@
+import asyncio
+
+import pytest
+
+from jobs import JOB_ORPHANED, JOB_QUEUED, JOB_SUCCEEDED, JobRunner
+
+mongomock_motor = pytest.importorskip("mongomock_motor")
+
+
+def test_shutdown_releases_running_jobs():
+    db = mongomock_motor.AsyncMongoMockClient()["jobs_test"]
+
+    async def run():
+        async def slow(ctx):
+            await asyncio.sleep(3600)
+
+        runner = JobRunner()
+        runner.register("resumable", slow, resumable=True)
+        runner.register("one_shot", slow)
+        await runner.start(db)
+        resumable = await runner.submit("resumable")
+        one_shot = await runner.submit("one_shot")
+        while await db.jobs.count_documents({"status": "running"}) < 2:
+            await asyncio.sleep(0.01)
+        await runner.shutdown()
+        released = {job["_id"]: job for job in await db.jobs.find().to_list(length=None)}
+
+        # the next process resumes the queued job right away
+        async def quick(ctx):
+            return {"ok": True}
+
+        restarted = JobRunner()
+        restarted.register("resumable", quick, resumable=True)
+        restarted.register("one_shot", quick)
+        await restarted.start(db)
+        await asyncio.gather(*restarted._tasks.values())
+        await restarted.shutdown()
+        return resumable, one_shot, released, await db.jobs.find_one({"_id": resumable})
+
+    resumable, one_shot, released, resumed = asyncio.run(run())
+    assert released[resumable]["status"] == JOB_QUEUED and released[resumable]["worker"] is None
+    assert released[one_shot]["status"] == JOB_ORPHANED
+    assert resumed["status"] == JOB_SUCCEEDED and resumed["attempts"] == 2
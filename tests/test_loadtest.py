@@ -0,0 +1,40 @@
+import asyncio
+import importlib.util
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("mongomock_motor")
+
+spec = importlib.util.spec_from_file_location(
+    "loadtest", Path(__file__).resolve().parent.parent / "benchmarks" / "loadtest.py"
+)
+loadtest = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(loadtest)
+
+
+def test_in_process_run_reports_every_route_of_the_mix():
+    args = SimpleNamespace(mix="charts", duration=0.5, concurrency=4, persons=30, seed=1,
+                           mongo_url=None, base_url=None)
+    result = asyncio.run(loadtest.main_async(args))
+
+    assert set(result["routes"]) <= {route for route, _, _ in loadtest.MIXES["charts"]}
+    for route in result["routes"].values():
+        assert route["errors"] == 0
+        assert route["p50_ms"] <= route["p95_ms"] <= route["p99_ms"] <= route["max_ms"]
+
+
+def test_baseline_diff_flags_regressions():
+    baseline = {"routes": {"GET /api/trends": {"rps": 100, "p50_ms": 10, "p95_ms": 20, "p99_ms": 30}}}
+    result = {"routes": {"GET /api/trends": {"rps": 95, "p50_ms": 10, "p95_ms": 30, "p99_ms": 31}}}
+    assert loadtest.diff_against(baseline, result, max_regression=20) == ["GET /api/trends p95_ms +50.0%"]
+
+
+def test_stored_votes_baseline_matches_the_mix():
+    import json
+
+    path = Path(__file__).resolve().parent.parent / "benchmarks" / "baselines" / "loadtest_votes.json"
+    baseline = json.loads(path.read_text())
+    assert baseline["meta"]["mix"] == "votes"
+    assert set(baseline["routes"]) == {route for route, _, _ in loadtest.MIXES["votes"]}
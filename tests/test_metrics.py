@@ -0,0 +1,62 @@
+import asyncio
+
+from fastapi import APIRouter, FastAPI, HTTPException
+
+import metrics
+from metrics import Histogram, InstrumentedRoute, MongoMetricsListener, Registry
+
+
+def test_histogram_exposition_is_cumulative():
+    registry = Registry()
+    hist = registry.register(Histogram("latency_seconds", "test", ("route",), buckets=(0.1, 1.0)))
+    for value in (0.05, 0.5, 0.5, 3.0):
+        hist.observe(("/a",), value)
+
+    text = registry.exposition()
+    assert '# TYPE latency_seconds histogram' in text
+    assert 'latency_seconds_bucket{route="/a",le="0.1"} 1' in text
+    assert 'latency_seconds_bucket{route="/a",le="1.0"} 3' in text
+    assert 'latency_seconds_bucket{route="/a",le="+Inf"} 4' in text
+    assert 'latency_seconds_count{route="/a"} 4' in text
+
+
+def test_instrumented_route_records_template_and_status(asgi_client):
+    router = APIRouter(prefix="/api", route_class=InstrumentedRoute)
+
+    @router.get("/people/{person_id}")
+    async def get_person(person_id: str, limit: int = 10):
+        if person_id == "missing":
+            raise HTTPException(status_code=404)
+        return {"id": person_id}
+
+    app = FastAPI()
+    app.include_router(router)
+
+    async def run():
+        async with asgi_client(app) as client:
+            await client.get("/api/people/1")
+            await client.get("/api/people/2")
+            await client.get("/api/people/missing")
+            await client.get("/api/people/3", params={"limit": "many"})
+
+    asyncio.run(run())
+
+    labels = ("GET", "/api/people/{person_id}")
+    assert metrics.http_requests.values[labels + ("200",)] == 2
+    assert metrics.http_requests.values[labels + ("404",)] == 1
+    assert metrics.http_requests.values[labels + ("422",)] == 1
+    assert labels + ("500",) not in metrics.http_requests.values
+    assert metrics.http_in_flight.values[labels] == 0
+    assert sum(metrics.http_latency.series[labels][0]) == 4
+
+
+def test_mongo_listener_labels_by_collection_and_command(fake_event):
+    listener = MongoMetricsListener()
+    listener.started(fake_event(1, "find", {"find": "plans_persons"}))
+    listener.succeeded(fake_event(1, "find", duration_micros=1500))
+    listener.started(fake_event(2, "getMore", {"getMore": 123, "collection": "plans_persons"}))
+    listener.failed(fake_event(2, "getMore", duration_micros=200))
+
+    assert sum(metrics.mongo_latency.series[("plans_persons", "find")][0]) == 1
+    assert metrics.mongo_failures.values[("plans_persons", "getMore")] == 1
+    assert metrics.mongo_latency.series[("plans_persons", "find")][1] == 0.0015
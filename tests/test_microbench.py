@@ -0,0 +1,47 @@
+import importlib.util
+import json
+import os
+from datetime import timedelta
+from pathlib import Path
+
+import pytest
+
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+os.environ.setdefault("DB_NAME", "popular_test")
+
+spec = importlib.util.spec_from_file_location(
+    "microbench", Path(__file__).resolve().parent.parent / "benchmarks" / "microbench.py"
+)
+microbench = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(microbench)
+
+
+def test_suite_runs_and_matches_stored_baseline():
+    results = microbench.run_suite(runs=2, min_time=0.001)
+
+    baseline = json.loads(microbench.DEFAULT_BASELINE.read_text())
+    assert set(results) == set(baseline["benchmarks"])
+    for result in results.values():
+        assert 0 < result["min_ns"] <= result["median_ns"]
+
+
+def test_recent_window_matches_parse_window():
+    from fastapi import HTTPException
+
+    import server
+
+    for window in microbench.CHART_WINDOWS:
+        assert server.parse_recent_window(window) == server.parse_window(window)
+    with pytest.raises(HTTPException):
+        server.parse_recent_window("7d")  # charts only take minutes and hours
+    assert server.parse_window("7d") == timedelta(days=7)
+
+
+def test_compare_flags_regressions():
+    baseline = {"slugify": {"min_ns": 1000}, "parse_window": {"min_ns": 1000}}
+    results = {"slugify": {"min_ns": 1300}, "parse_window": {"min_ns": 900}, "new": {"min_ns": 5}}
+    rows = {row["name"]: row for row in microbench.compare(baseline, results, max_regression=0.2)}
+
+    assert set(rows) == {"slugify", "parse_window"}
+    assert rows["slugify"]["regressed"]
+    assert not rows["parse_window"]["regressed"]
@@ -0,0 +1,85 @@
+import pandas as pd
+import pytest
+
+from name_classifier import NameClassifier, classify_series, classify_term
+
+
+TERMS = [
+    "Taylor Swift", "weather today", "Lionel Messi", "iphone 16", "Kylian Mbappe",
+    "Warriors vs Lakers", "Prince of Wales", "election results", "Madonna",
+    "taylor swift", "Edward Norton", "World Cup", "Beyoncé Knowles", "",
+]
+
+
+def test_classify_term():
+    assert classify_term("Taylor Swift")
+    assert classify_term("Kylian Mbappe")  # 'app' only counts as a whole word
+    assert classify_term("Prince of Wales")  # title indicator
+    assert not classify_term("Madonna")
+    assert not classify_term("taylor swift")
+    assert not classify_term("iphone 16")
+    assert not classify_term("Warriors vs Lakers")
+    assert not classify_term("election results")
+    assert not classify_term("Premier League games")
+
+
+@pytest.mark.parametrize("term", [
+    "Taylor Swift tickets", "Taylor Swift net worth", "Dr pepper recall", "King of the Hill", "Queen of the South",
+])
+def test_indicators_must_match_the_whole_term(term):
+    assert not classify_term(term)
+    assert not classify_series(pd.Series([term])).iloc[0]
+
+
+def test_series_matches_scalar():
+    verdicts = classify_series(pd.Series(TERMS))
+    assert verdicts.tolist() == [classify_term(t) for t in TERMS]
+
+
+def test_decisions_are_cached_on_disk(tmp_path):
+    path = tmp_path / "names.json"
+    classifier = NameClassifier(path)
+    assert classifier.classify(["Taylor Swift", "weather today"]) == [True, False]
+    classifier.save()
+
+    reloaded = NameClassifier(path)
+    reloaded._load()
+    assert reloaded._decisions == {"Taylor Swift": True, "weather today": False}
+    assert reloaded.is_person("Taylor Swift")
+
+
+def test_concurrent_refreshes_share_the_cache(tmp_path, monkeypatch, caplog):
+    import sys
+    import threading
+
+    import name_classifier
+
+    monkeypatch.setattr(name_classifier, "NAME_CACHE_MAX_ENTRIES", 20)
+    switch_interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)  # switch threads as often as possible
+    classifier = NameClassifier(tmp_path / "names.json")
+    errors = []
+
+    def refresh(worker):
+        try:
+            for round_ in range(30):
+                batch = [f"Person {worker} {round_} {i}" for i in range(10)] + ["Taylor Swift"]
+                assert classifier.classify(batch)[-1] is True
+                classifier.save()
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=refresh, args=(n,)) for n in range(4)]
+    try:
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    finally:
+        sys.setswitchinterval(switch_interval)
+
+    assert errors == []
+    assert "Could not save" not in caplog.text
+    reloaded = NameClassifier(tmp_path / "names.json")
+    reloaded._load()
+    assert 0 < len(reloaded._decisions) <= 20
@@ -0,0 +1,58 @@
+import asyncio
+
+import pytest
+from bson import ObjectId
+
+import person_cleanup
+from person_cleanup import cascade_delete_person, on_person_deleted
+
+mongomock_motor = pytest.importorskip("mongomock_motor")
+
+
+def test_cascade_deletes_in_chunks_archives_credits_and_runs_hooks(monkeypatch):
+    db = mongomock_motor.AsyncMongoMockClient()["person_cleanup_test"]
+    gone, kept = ObjectId(), ObjectId()
+    monkeypatch.setattr(person_cleanup, "CHUNK_SIZE", 3)
+    monkeypatch.setattr(person_cleanup, "person_deleted_hooks", [])
+    pauses = []
+
+    async def pause(seconds):
+        pauses.append(seconds)
+
+    monkeypatch.setattr(person_cleanup.asyncio, "sleep", pause)
+    deleted = []
+
+    @on_person_deleted
+    def broken(person_id):
+        raise RuntimeError("cache unavailable")
+
+    @on_person_deleted
+    async def drop_cache(person_id):
+        deleted.append(person_id)
+
+    async def run():
+        await db.persons.insert_many([{"_id": gone, "name": "Gone"}, {"_id": kept, "name": "Kept"}])
+        for oid, votes, ticks, credits in ((gone, 7, 5, 4), (kept, 2, 1, 1)):
+            await db.votes.insert_many([{"person_id": oid, "device_id": f"d{i}"} for i in range(votes)])
+            await db.ticks.insert_many([{"person_id": str(oid), "score": i} for i in range(ticks)])
+            await db.credit_transactions.insert_many([{"person_id": str(oid), "amount": -1} for _ in range(credits)])
+        chunks = {}
+
+        async def progress(step, steps, name):
+            chunks[name] = len(pauses) - sum(chunks.values())
+
+        counts = await cascade_delete_person(db, str(gone), progress)
+        remaining = {name: await db[name].count_documents({}) for name in ("persons", "votes", "ticks")}
+        archived = await db.credit_transactions_archive.find({}, {"_id": 0}).to_list(None)
+        credits = await db.credit_transactions.find({}, {"_id": 0, "person_id": 1}).to_list(None)
+        return counts, chunks, remaining, archived, credits
+
+    counts, chunks, remaining, archived, credits = asyncio.run(run())
+    assert counts == {"persons": 1, "person_ticks": 0, "vote_events": 0, "votes": 7, "vote_shards": 0,
+                      "ticks": 5, "credit_transactions": 4}
+    assert (chunks["votes"], chunks["ticks"], chunks["credit_transactions"]) == (3, 2, 2)
+    assert remaining == {"persons": 1, "votes": 2, "ticks": 1}
+    assert credits == [{"person_id": str(kept)}]
+    assert len(archived) == 4
+    assert all(doc["person_id"] == str(gone) and doc["archive_reason"] == "person_deleted" for doc in archived)
+    assert deleted == [str(gone)]
@@ -0,0 +1,54 @@
+import asyncio
+import time
+
+import pytest
+
+from profiler import ProfilerBusy, SamplingProfiler
+
+
+def busy_handler():
+    end = time.perf_counter() + 0.3
+    while time.perf_counter() < end:
+        pass
+
+
+def other_work():
+    end = time.perf_counter() + 0.3
+    while time.perf_counter() < end:
+        pass
+
+
+async def run_profile(code=None):
+    profiler = SamplingProfiler(interval=0.002)
+
+    async def load():
+        await asyncio.sleep(0.05)
+        busy_handler()
+        other_work()
+
+    profile, _ = await asyncio.gather(profiler.profile_loop(0.8, code), load())
+    return profile
+
+
+def test_collapsed_profile_shows_hot_function():
+    profile = asyncio.run(run_profile())
+    collapsed = profile.collapsed()
+    assert "busy_handler (test_profiler.py" in collapsed
+    assert all(line.rsplit(" ", 1)[1].isdigit() for line in collapsed.strip().splitlines())
+
+
+def test_code_filter_keeps_only_matching_samples():
+    profile = asyncio.run(run_profile(busy_handler.__code__))
+    assert profile.stacks
+    assert all(any(name == "busy_handler" for name, _, _ in stack) for stack in profile.stacks)
+
+    doc = profile.speedscope()
+    assert doc["profiles"][0]["type"] == "sampled"
+    assert len(doc["profiles"][0]["samples"]) == len(doc["profiles"][0]["weights"])
+
+
+def test_one_profile_at_a_time():
+    profiler = SamplingProfiler()
+    profiler._lock.acquire()
+    with pytest.raises(ProfilerBusy):
+        profiler.sample(0, 0.1)
@@ -0,0 +1,373 @@
+"""
+Query-plan regression suite
+
+Seeds a throwaway database on a local mongod with a synthetic dataset, drives
+every API route through the ASGI app while a pymongo CommandListener records
+the commands each one sends, then explains every read/write and fails when a
+plan scans a whole collection or examines far more documents than it returns.
+
+Needs a running mongod: QUERY_PLAN_MONGO_URL (default mongodb://localhost:27017).
+The plan tests are skipped when none is reachable.
+"""
+
+import asyncio
+import os
+import random
+from datetime import datetime, timedelta
+
+import pytest
+from bson import SON
+from pymongo import MongoClient, monitoring
+
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+os.environ.setdefault("DB_NAME", "popular_test")
+
+import server  # noqa: E402
+from indexes import sync_indexes  # noqa: E402
+
+
+MONGO_URL = os.getenv("QUERY_PLAN_MONGO_URL", "mongodb://localhost:27017")
+DB_NAME = f"query_plans_{os.getpid()}"
+# A plan may examine at most this many documents per document it returns
+MAX_EXAMINED_RATIO = float(os.getenv("QUERY_PLAN_MAX_EXAMINED_RATIO", "10"))
+
+SEED = 42
+N_PERSONS = 2000
+N_DEVICES = 500
+N_USERS = 50
+
+EXPLAINABLE = {"find", "aggregate", "count", "distinct", "update", "delete", "findAndModify"}
+# Aggregations containing these stages summarize what they read; only their
+# plans (not their examined/returned ratio) are checked
+SUMMARY_STAGES = {"$group", "$count", "$facet", "$bucket", "$sortByCount"}
+STRIP_FIELDS = {"lsid", "$db", "$clusterTime", "$readPreference", "txnNumber", "writeConcern", "readConcern"}
+
+PERSON = "{person_id}"
+USER = "{user_id}"
+USER_ID = "user-1"
+
+# (id, method, path, request kwargs); ids double as pytest ids. Several calls
+# may exercise the same route with different parameters.
+ROUTE_CALLS = [
+    ("status list", "GET", "/api/status", {}),
+    ("status create", "POST", "/api/status", {"json": {"client_name": "plans"}}),
+    ("people list", "GET", "/api/people", {"params": {"limit": 20}}),
+    ("people by category", "GET", "/api/people", {"params": {"category": "sport"}}),
+    ("people search", "GET", "/api/people", {"params": {"query": "Person 17"}}),
+    ("people outsiders", "GET", "/api/people", {"params": {"category": "outsider", "include_outsiders": True}}),
+    ("person add", "POST", "/api/people", {"json": {"name": "Plan Probe", "category": "other"}}),
+    ("person get", "GET", f"/api/people/{PERSON}", {}),
+    ("vote", "POST", f"/api/people/{PERSON}/vote", {"json": {"value": 1}, "headers": {"X-Device-ID": "device-1"}}),
+    ("chart 24h", "GET", f"/api/people/{PERSON}/chart", {"params": {"window": "24h"}}),
+    ("chart long range", "GET", f"/api/people/{PERSON}/chart", {"params": {"window": "3000h"}}),
+    ("trends", "GET", "/api/trends", {"params": {"window": "24h"}}),
+    ("trending now", "GET", "/api/trending-now", {}),
+    ("controversial", "GET", "/api/controversial", {}),
+    ("search record", "POST", "/api/searches", {"json": {"query": "Person 3"}}),
+    ("search", "GET", "/api/search", {"params": {"query": "Person 4"}}),
+    ("search suggestions", "GET", "/api/search-suggestions", {}),
+    ("search suggestions by category", "GET", "/api/search-suggestions/by-category", {}),
+    ("outsiders", "GET", "/api/outsiders", {}),
+    ("last searches", "GET", "/api/last-searches", {}),
+    ("credits purchase", "POST", "/api/credits/purchase",
+     {"json": {"user_id": USER, "pack": "booster", "amount": 100, "price": 0.99}}),
+    ("credits balance", "GET", "/api/credits/balance/{user_id}", {}),
+    ("credits use", "POST", "/api/credits/use",
+     {"json": {"person_id": PERSON, "person_name": "Person 0", "vote": 1}, "headers": {"user-id": USER}}),
+    ("credits history", "GET", "/api/credits/history/{user_id}", {}),
+    ("boost myself", "POST", "/api/boost-myself", {"json": {"user_id": USER, "name": "Plan Booster"}}),
+    ("trending personalities", "GET", "/api/trending-personalities", {}),
+    ("admin stats", "GET", "/api/admin/stats", {}),
+    ("admin boost votes", "POST", "/api/admin/boost-votes", {"json": {"person_id": PERSON, "amount": 5}}),
+    ("admin reset person", "POST", f"/api/admin/person/{PERSON}/reset", {}),
+    ("admin activity", "GET", "/api/admin/activity/recent", {}),
+    ("admin activity page", "GET", "/api/admin/activity/recent", {"params": {"before": "{before}"}}),
+    ("admin activity tie page", "GET", "/api/admin/activity/recent",
+     {"params": {"before": "{before}", "before_id": "ffffffffffffffffffffffff"}}),
+    ("admin activity live", "GET", "/api/admin/activity/live", {}),
+    ("admin search", "GET", "/api/admin/search", {"params": {"q": "Person 5", "sort_by": "votes"}}),
+    ("admin search by source", "GET", "/api/admin/search", {"params": {"source": "user_added", "sort_by": "date"}}),
+    ("admin settings", "GET", "/api/admin/settings", {}),
+    ("admin settings update", "POST", "/api/admin/settings", {"json": {}}),
+    ("admin scheduler status", "GET", "/api/admin/scheduler-status", {}),
+    ("admin fix categories", "POST", "/api/admin/fix-categories", {}),
+    ("admin jobs", "GET", "/api/admin/jobs", {}),
+    ("admin reconciliation report", "GET", "/api/admin/reconcile-counters", {}),
+    ("reports stats", "GET", "/api/reports/stats", {}),
+    ("reports history", "GET", "/api/reports/history", {}),
+]
+
+# Routes not driven by the suite, with the reason
+NOT_EXERCISED = {
+    ("GET", "/api/"): "no database access",
+    ("GET", "/api/admin/indexes"): "diagnostic $indexStats, not a user query",
+    ("GET", "/api/admin/profile"): "no database access",
+    ("GET", "/api/admin/slow-queries"): "reads the in-memory slow query log",
+    ("GET", "/api/admin/jobs/{job_id}"): "reads through the job runner's own handle",
+    ("DELETE", "/api/admin/person/{person_id}"): "runs as a background job",
+    ("POST", "/api/admin/refresh-trends"): "runs as a background job",
+    ("POST", "/api/admin/initialize-votes"): "runs as a background job",
+    ("POST", "/api/admin/init-votes"): "runs as a background job",
+    ("POST", "/api/admin/recompute-scores"): "runs as a background job",
+    ("POST", "/api/admin/reconcile-counters"): "runs as a background job",
+    ("POST", "/api/reports/daily"): "sends email",
+}
+
+# Calls that send no explainable command (inserts only), with the reason;
+# every other call must record at least one
+NO_QUERIES = {
+    "status create": "inserts a status check",
+    "search record": "inserts a search",
+}
+
+# Plans known to scan, keyed by (call id, collection). Each entry is a
+# debt to pay down; new scans anywhere else fail the suite.
+KNOWN_SCANS = {
+    ("status list", "status_checks"): "unfiltered legacy listing",
+    ("people search", "persons"): "unanchored case-insensitive regex on name",
+    ("search", "persons"): "unanchored case-insensitive regex on name",
+    ("search suggestions by category", "persons"): "$lookup on persons.name, which has no equality index",
+    ("outsiders", "persons"): "$or including the unindexed `boosted` flag",
+    ("admin search", "persons"): "unanchored case-insensitive regex on name",
+    ("admin fix categories", "persons"): "case-insensitive regex cannot use an index",
+    ("admin stats", "persons"): "whole-collection totals",
+    ("reports stats", "persons"): "total people count inside $facet",
+}
+
+
+class CommandRecorder(monitoring.CommandListener):
+    """Records the explainable commands sent while `call_id` is set"""
+
+    def __init__(self):
+        self.call_id = None
+        self.pending = {}
+        self.commands = []
+
+    def started(self, event):
+        if self.call_id and event.command_name in EXPLAINABLE:
+            command = SON((k, v) for k, v in event.command.items() if k not in STRIP_FIELDS)
+            self.pending[event.request_id] = (self.call_id, event.command_name, command)
+
+    def succeeded(self, event):
+        entry = self.pending.pop(event.request_id, None)
+        if entry:
+            call_id, name, command = entry
+            self.commands.append({
+                "call_id": call_id,
+                "name": name,
+                "collection": command[name],
+                "command": command,
+                "returned": _returned(name, event.reply),
+            })
+
+    def failed(self, event):
+        self.pending.pop(event.request_id, None)
+
+
+def _returned(name, reply):
+    if name in ("find", "aggregate"):
+        return len(reply.get("cursor", {}).get("firstBatch", []))
+    if name == "findAndModify":
+        return 1 if reply.get("value") else 0
+    if name in ("count", "distinct"):
+        return 1
+    return reply.get("n", 0)
+
+
+def _walk(node):
+    if isinstance(node, dict):
+        yield node
+        for value in node.values():
+            yield from _walk(value)
+    elif isinstance(node, list):
+        for value in node:
+            yield from _walk(value)
+
+
+def plan_problems(record, explain):
+    """COLLSCANs and excessive docs-examined ratios in an explain output"""
+    problems = []
+    examined = 0
+    for node in _walk(explain):
+        if node.get("stage") == "COLLSCAN":
+            problems.append("COLLSCAN")
+        if node.get("collectionScans", 0) > 0:
+            problems.append("COLLSCAN in $lookup")
+        if isinstance(node.get("totalDocsExamined"), int):
+            examined += node["totalDocsExamined"]
+
+    command = record["command"]
+    summary = record["name"] in ("count", "distinct") or (
+        record["name"] == "aggregate"
+        and any(stage_name in SUMMARY_STAGES for stage in command["pipeline"] for stage_name in stage)
+    )
+    returned = max(record["returned"], 1)
+    if not summary and examined > MAX_EXAMINED_RATIO * returned:
+        problems.append(f"examined {examined} documents for {record['returned']} returned")
+    return sorted(set(problems))
+
+
+def seed(db):
+    rng = random.Random(SEED)
+    now = datetime.utcnow()
+    categories = ["politics", "culture", "business", "sport", "other"]
+    sources = ["seed"] * 6 + ["user_added"] * 3 + ["self_boosted"]
+
+    persons = []
+    for i in range(N_PERSONS):
+        likes, dislikes = rng.randint(0, 200), rng.randint(0, 200)
+        persons.append({
+            "name": f"Person {i}",
+            "slug": f"person-{i}",
+            "category": rng.choice(categories),
+            "approved": True,
+            "source": rng.choice(sources),
+            "is_trending": rng.random() < 0.01,
+            "likes": likes,
+            "dislikes": dislikes,
+            "total_votes": likes + dislikes,
+            "score": round(100 * likes / max(likes + dislikes, 1) / 25) * 25,
+            "created_at": now - timedelta(days=rng.randint(0, 365)),
+            "updated_at": now,
+        })
+    ids = db.persons.insert_many(persons).inserted_ids
+
+    votes = {}
+    for _ in range(N_DEVICES * 10):
+        key = (rng.choice(ids), f"device-{rng.randrange(N_DEVICES)}")
+        votes[key] = {"person_id": key[0], "device_id": key[1], "value": rng.choice([1, -1]),
+                      "created_at": now, "updated_at": now}
+    db.votes.insert_many(list(votes.values()))
+
+    db.vote_events.insert_many([
+        {"person_id": v["person_id"], "device_id": v["device_id"], "delta": v["value"],
+         "created_at": now - timedelta(minutes=rng.randint(0, 60 * 48))}
+        for v in votes.values()
+    ])
+    db.person_ticks.insert_many([
+        {"person_id": rng.choice(ids[:200]), "score": rng.choice([0, 25, 50, 75, 100]),
+         "created_at": now - timedelta(minutes=rng.randint(0, 60 * 72))}
+        for _ in range(10000)
+    ])
+    db.person_ticks_hourly.insert_many([
+        {"person_id": ids[0], "hour": (now - timedelta(days=d)).replace(minute=0, second=0, microsecond=0),
+         "open": 50.0, "close": 50.0, "min": 50.0, "max": 50.0, "count": 1}
+        for d in range(100, 120)
+    ])
+    db.searches.insert_many([
+        {"query": f"Person {rng.randrange(N_PERSONS)}", "device_id": f"device-{rng.randrange(N_DEVICES)}",
+         "created_at": now - timedelta(minutes=rng.randint(0, 60 * 48))}
+        for _ in range(5000)
+    ])
+    db.user_credits.insert_many([
+        {"user_id": f"user-{u}", "balance": 10, "total_purchased": 10, "is_premium": True, "created_at": now}
+        for u in range(N_USERS)
+    ])
+    db.credit_transactions.insert_many([
+        {"user_id": f"user-{rng.randrange(N_USERS)}", "type": rng.choice(["purchase", "use"]),
+         "amount": 100, "price": 0.99, "description": "seed", "person_id": rng.choice(ids),
+         "timestamp": now - timedelta(minutes=rng.randint(0, 60 * 72))}
+        for _ in range(3000)
+    ])
+    db.status_checks.insert_many([
+        {"id": str(i), "client_name": "seed", "timestamp": now - timedelta(hours=i)} for i in range(50)
+    ])
+    db.app_settings.insert_one({"_id": "global", "version": 1})
+    return ids
+
+
+async def drive_routes(recorder, person_id):
+    """Call every ROUTE_CALLS entry; returns call id -> response status"""
+    import httpx
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    client = AsyncIOMotorClient(MONGO_URL, event_listeners=[recorder])
+    original = server.client, server.db
+    server.client, server.db = client, client[DB_NAME]
+    try:
+        await sync_indexes(server.db)
+        transport = httpx.ASGITransport(app=server.app)
+        statuses = {}
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as http:
+            before = (datetime.utcnow() - timedelta(days=30)).isoformat()
+            for call_id, method, path, kwargs in ROUTE_CALLS:
+                recorder.call_id = call_id
+                kwargs = _fill(kwargs, person_id, before)
+                response = await http.request(method, path.replace(PERSON, person_id).replace(USER, USER_ID), **kwargs)
+                statuses[call_id] = response.status_code
+                recorder.call_id = None
+        return statuses
+    finally:
+        server.admin_stats_cache.shutdown()
+        server.client, server.db = original
+        client.close()
+
+
+def _fill(value, person_id, before):
+    if isinstance(value, dict):
+        return {k: _fill(v, person_id, before) for k, v in value.items()}
+    if value == PERSON:
+        return person_id
+    if value == USER:
+        return USER_ID
+    if value == "{before}":
+        return before
+    return value
+
+
+@pytest.fixture(scope="module")
+def plans():
+    """Response status and explain output of every recorded command, by call id"""
+    sync_client = MongoClient(MONGO_URL, serverSelectionTimeoutMS=500)
+    try:
+        sync_client.admin.command("ping")
+    except Exception:
+        pytest.skip(f"no mongod reachable at {MONGO_URL}")
+
+    db = sync_client[DB_NAME]
+    try:
+        ids = seed(db)
+        recorder = CommandRecorder()
+        statuses = asyncio.run(drive_routes(recorder, str(ids[0])))
+
+        results = {call_id: {"status": status, "plans": []} for call_id, status in statuses.items()}
+        for record in recorder.commands:
+            explain = db.command("explain", record["command"], verbosity="executionStats")
+            results[record["call_id"]]["plans"].append((record, explain))
+        yield results
+    finally:
+        sync_client.drop_database(DB_NAME)
+        sync_client.close()
+
+
+def test_no_queries_lists_existing_calls():
+    assert set(NO_QUERIES) <= {call[0] for call in ROUTE_CALLS}
+
+
+def test_every_route_is_exercised():
+    called = {(method, path) for _, method, path, _ in ROUTE_CALLS}
+    routes = {
+        (method, route.path)
+        for route in server.app.routes
+        if route.path.startswith("/api/")
+        for method in getattr(route, "methods", ())
+    }
+    missing = routes - called - set(NOT_EXERCISED)
+    assert not missing, f"routes missing from ROUTE_CALLS or NOT_EXERCISED: {sorted(missing)}"
+
+
+@pytest.mark.parametrize("call_id", [call[0] for call in ROUTE_CALLS])
+def test_query_plans(plans, call_id):
+    call = plans[call_id]
+    # An erroring route, or one rejecting the request before its queries, has no plans worth checking
+    assert call["status"] < 500, f"{call_id} answered {call['status']}"
+    if call_id not in NO_QUERIES:
+        assert call["plans"], f"{call_id} sent no query (answered {call['status']}); list it in NO_QUERIES if expected"
+
+    failures = []
+    for record, explain in call["plans"]:
+        if (call_id, record["collection"]) in KNOWN_SCANS:
+            continue
+        for problem in plan_problems(record, explain):
+            failures.append(f"{record['name']} on {record['collection']}: {problem}\n  {dict(record['command'])}")
+    assert not failures, "\n".join(failures)
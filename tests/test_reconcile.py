@@ -0,0 +1,56 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+
+from reconcile import reconcile_counters, run_reconciliation
+
+mongomock_motor = pytest.importorskip("mongomock_motor")
+
+OLD = datetime.utcnow() - timedelta(hours=2)
+
+
+def votes(person_id, likes, dislikes):
+    return ([{"person_id": person_id, "device_id": f"l{i}", "value": 1} for i in range(likes)]
+            + [{"person_id": person_id, "device_id": f"d{i}", "value": -1} for i in range(dislikes)])
+
+
+def test_drift_is_reported_then_repaired():
+    db = mongomock_motor.AsyncMongoMockClient()["reconcile_test"]
+
+    async def run():
+        await db.persons.insert_many([
+            # in sync, including 100 premium likes
+            {"_id": 1, "likes": 103, "dislikes": 1, "total_votes": 104, "extra_likes": 100, "extra_dislikes": 0,
+             "updated_at": OLD},
+            # lost an increment
+            {"_id": 2, "likes": 2, "dislikes": 1, "total_votes": 3, "extra_likes": 0, "extra_dislikes": 0,
+             "updated_at": OLD},
+            # never reconciled: baselined, not repaired
+            {"_id": 3, "likes": 50, "dislikes": 0, "total_votes": 50, "updated_at": OLD},
+            # vote in flight
+            {"_id": 4, "likes": 0, "dislikes": 0, "total_votes": 0, "extra_likes": 0, "extra_dislikes": 0,
+             "updated_at": datetime.utcnow()},
+        ])
+        await db.votes.insert_many(votes(1, 3, 1) + votes(2, 3, 1) + votes(3, 5, 0) + votes(4, 1, 0))
+
+        dry = await reconcile_counters(db, repair=False, chunk_size=2)
+        untouched = await db.persons.find_one({"_id": 2})
+        report = await run_reconciliation(db)
+        docs = {d["_id"]: d for d in await db.persons.find({}).to_list(None)}
+        again = await reconcile_counters(db)
+        return dry, untouched, report, docs, again
+
+    dry, untouched, report, docs, again = asyncio.run(run())
+
+    assert (dry["checked"], dry["drifted"], dry["baselined"], dry["skipped_recent"]) == (4, 1, 1, 1)
+    assert dry["drifts"][0]["expected"] == {"likes": 3, "dislikes": 1, "total_votes": 4}
+    assert untouched["likes"] == 2
+
+    assert report["mode"] == "full" and report["repaired"] == 2
+    assert (docs[2]["likes"], docs[2]["total_votes"], docs[2]["score"]) == (3, 4, 75.0)
+    assert (docs[3]["likes"], docs[3]["extra_likes"]) == (50, 45)
+
+    # the next run only looks at recently updated persons, and finds no drift
+    assert again["mode"] == "incremental"
+    assert again["checked"] == 1 and again["drifted"] == 0
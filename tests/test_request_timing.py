@@ -0,0 +1,55 @@
+import asyncio
+
+import pytest
+from fastapi import APIRouter, FastAPI
+
+import request_timing
+from metrics import InstrumentedRoute
+from request_timing import current_timing, timing_listener
+
+
+@pytest.fixture
+def app(fake_event):
+    router = APIRouter(prefix="/api", route_class=InstrumentedRoute)
+
+    @router.get("/trends")
+    async def trends():
+        # stand-in for two MongoDB round trips of 5 ms each
+        for request_id in (1, 2):
+            timing_listener.started(fake_event(request_id, "find", {"find": "person_ticks"}))
+            timing_listener.succeeded(fake_event(request_id, "find", duration_micros=5000))
+        return [{"person_id": "1", "delta": 25.0}]
+
+    app = FastAPI()
+    app.include_router(router)
+    return app
+
+
+@pytest.fixture
+def get(app, asgi_client):
+    def get(headers=None):
+        async def run():
+            async with asgi_client(app) as client:
+                return await client.get("/api/trends", headers=headers)
+        return asyncio.run(run())
+    return get
+
+
+def test_server_timing_header_breaks_down_request(get):
+    response = get()
+
+    phases = dict(part.split(";", 1) for part in response.headers["server-timing"].split(", "))
+    assert set(phases) == {"db", "app", "serialize", "total"}
+    assert phases["db"] == 'dur=10.00;desc="2 queries"'
+    assert response.json() == [{"person_id": "1", "delta": 25.0}]
+    assert current_timing.get() is None
+
+
+def test_debug_envelope_only_when_enabled(monkeypatch, get):
+    assert get({"X-Debug-Timing": "1"}).json() == [{"person_id": "1", "delta": 25.0}]
+
+    monkeypatch.setattr(request_timing, "DEBUG_ENABLED", True)
+    body = get({"X-Debug-Timing": "1"}).json()
+    assert body["data"] == [{"person_id": "1", "delta": 25.0}]
+    assert body["timing"]["db_count"] == 2
+    assert body["timing"]["commands"][0] == {"command": "find", "collection": "person_ticks", "ms": 5.0}
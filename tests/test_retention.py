@@ -0,0 +1,149 @@
+"""
+Retention tests
+
+The chunked deletes and the chart's merge of hourly summaries run on
+mongomock. The rollups need $dateTrunc and $merge, which mongomock lacks:
+they run against RETENTION_TEST_MONGO_URL (default mongodb://localhost:27017)
+and are skipped when no mongod is reachable there.
+"""
+
+import asyncio
+import os
+from datetime import datetime, timedelta
+
+import pytest
+from bson import ObjectId
+from pymongo import MongoClient
+
+import retention
+from retention import delete_older_than, enforce_retention, retention_cutoff, rollup
+
+mongomock_motor = pytest.importorskip("mongomock_motor")
+
+MONGO_URL = os.getenv("RETENTION_TEST_MONGO_URL", "mongodb://localhost:27017")
+TIME_FIELD = retention.TIME_FIELDS["person_ticks"]
+
+
+@pytest.fixture
+def no_pause(monkeypatch):
+    pauses = []
+
+    async def pause(seconds):
+        pauses.append(seconds)
+
+    monkeypatch.setattr(retention.asyncio, "sleep", pause)
+    return pauses
+
+
+@pytest.fixture
+def mongo_db():
+    """A throwaway database on a real mongod, dropped afterwards"""
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    sync_client = MongoClient(MONGO_URL, serverSelectionTimeoutMS=500)
+    try:
+        sync_client.admin.command("ping")
+    except Exception:
+        pytest.skip(f"no mongod reachable at {MONGO_URL}")
+    name = f"retention_{os.getpid()}"
+    try:
+        yield lambda: AsyncIOMotorClient(MONGO_URL)[name]
+    finally:
+        sync_client.drop_database(name)
+        sync_client.close()
+
+
+def seed_ticks(person_id, cutoff):
+    """Two old hours of three ticks each, and two recent ticks"""
+    old = [cutoff - timedelta(hours=h, minutes=50 - 20 * i) for h in (1, 2) for i in range(3)]
+    recent = [cutoff + timedelta(minutes=m) for m in (5, 65)]
+    return [{"person_id": person_id, "score": 50.0 + i, "created_at": at} for i, at in enumerate(old + recent)]
+
+
+def test_delete_older_than_removes_old_rows_in_chunks(monkeypatch, no_pause):
+    db = mongomock_motor.AsyncMongoMockClient()["retention_delete_test"]
+    monkeypatch.setattr(retention, "DELETE_CHUNK_SIZE", 2)
+    cutoff = datetime(2024, 1, 10)
+
+    async def run():
+        await db.status_checks.insert_many([{"timestamp": cutoff - timedelta(minutes=i)} for i in range(1, 6)])
+        await db.status_checks.insert_many([{"timestamp": cutoff + timedelta(minutes=i)} for i in range(2)])
+        removed = await delete_older_than(db, "status_checks", cutoff)
+        return removed, await db.status_checks.count_documents({})
+
+    assert asyncio.run(run()) == (5, 2)
+    assert len(no_pause) == 3  # chunks of 2, 2 and 1
+
+
+def test_chart_counts_a_summarized_hour_once(server, asgi_client):
+    raw_cutoff = retention_cutoff("person_ticks")
+    hour = raw_cutoff - timedelta(hours=2)
+
+    async def run():
+        person = await server.db.persons.insert_one({"name": "Old Person", "score": 60.0})
+        oid = person.inserted_id
+        # rolled up, then the delete stopped before these raw ticks of the same hour
+        await server.db.person_ticks_hourly.insert_one({"person_id": oid, "hour": hour, "open": 50.0,
+                                                        "close": 55.0, "min": 50.0, "max": 55.0, "count": 3})
+        await server.db.person_ticks.insert_many([
+            {"person_id": oid, "score": 54.0, "created_at": hour + timedelta(minutes=40)},
+            {"person_id": oid, "score": 55.0, "created_at": hour + timedelta(minutes=50)},
+            # an hour the rollup has not reached, and a recent tick
+            {"person_id": oid, "score": 57.0, "created_at": hour + timedelta(hours=1, minutes=10)},
+            {"person_id": oid, "score": 60.0, "created_at": datetime.utcnow() - timedelta(minutes=5)},
+        ])
+        window = f"{(retention.RETENTION_DAYS['person_ticks'] + 2) * 24}h"
+        async with asgi_client(server.app) as client:
+            return (await client.get(f"/api/people/{oid}/chart", params={"window": window})).json()
+
+    body = asyncio.run(run())
+    assert [p["score"] for p in body["points"]] == [55.0, 57.0, 60.0]
+    assert body["points"][0]["t"] == hour.isoformat() + "Z"
+
+
+def test_rollup_summarizes_old_hours(mongo_db):
+    cutoff = datetime(2024, 1, 10)
+    person_id = ObjectId()
+
+    async def run():
+        db = mongo_db()
+        await db.person_ticks.insert_many(seed_ticks(person_id, cutoff))
+        added = await rollup(db, "person_ticks", cutoff)
+        again = await rollup(db, "person_ticks", cutoff)
+        buckets = await db.person_ticks_hourly.find({}, {"_id": 0}).sort("hour", 1).to_list(None)
+        return added, again, buckets
+
+    added, again, buckets = asyncio.run(run())
+    assert (added, again) == (2, 0)
+    assert [(b["hour"], b["count"]) for b in buckets] == [(cutoff - timedelta(hours=3), 3),
+                                                          (cutoff - timedelta(hours=2), 3)]
+    first = buckets[0]
+    assert (first["person_id"], first["open"], first["close"], first["min"], first["max"]) == \
+        (person_id, 53.0, 55.0, 53.0, 55.0)
+
+
+def test_rerun_after_failed_delete_keeps_the_summaries(monkeypatch, mongo_db, no_pause):
+    monkeypatch.setitem(retention.RETENTION_DAYS, "person_ticks", 1)
+    cutoff = retention_cutoff("person_ticks")
+    person_id = ObjectId()
+    real_delete = retention.delete_older_than
+
+    async def interrupted_delete(db, collection, cutoff):
+        # the first chunk goes through, then the primary steps down
+        await db[collection].delete_one({TIME_FIELD: {"$lt": cutoff}})
+        raise RuntimeError("not primary")
+
+    async def run():
+        db = mongo_db()
+        await db.person_ticks.insert_many(seed_ticks(person_id, cutoff))
+        monkeypatch.setattr(retention, "delete_older_than", interrupted_delete)
+        with pytest.raises(RuntimeError):
+            await enforce_retention(db, "person_ticks")
+        monkeypatch.setattr(retention, "delete_older_than", real_delete)
+        report = await enforce_retention(db, "person_ticks")
+        buckets = await db.person_ticks_hourly.find({"person_id": person_id}).to_list(None)
+        return report, buckets, await db.person_ticks.count_documents({})
+
+    report, buckets, raw_left = asyncio.run(run())
+    assert (report["summary_buckets_added"], report["removed"], raw_left) == (0, 5, 2)
+    assert sorted(b["count"] for b in buckets) == [3, 3]
@@ -0,0 +1,74 @@
+import asyncio
+
+import numpy as np
+import pytest
+
+from scoring import (
+    compute_controversy, compute_score, controversy_array, recompute_all, score_array, score_fields,
+)
+
+
+def test_scalar_rules():
+    assert compute_score(0, 0) == 50.0
+    assert compute_score(3, 1) == 75.0
+    assert compute_score(1, 2) == 25.0  # 33.3 rounds down
+    assert compute_score(1, 1) == 50.0
+    assert compute_score(100, 0) == 100.0
+    assert compute_controversy(4, 5) == 0.0  # below the minimum vote count
+    assert compute_controversy(6, 4) == 0.4
+    assert score_fields(500, 500) == {"score": 50.0, "controversy": 0.5}
+
+
+def test_vectorized_matches_scalar():
+    grid = np.array([(likes, dislikes) for likes in range(0, 60) for dislikes in range(0, 60)]
+                    + [(123456, 98765), (7, 1), (1, 7), (5, 3)])
+    likes, dislikes = grid[:, 0], grid[:, 1]
+
+    assert score_array(likes, dislikes).tolist() == [compute_score(l, d) for l, d in grid.tolist()]
+    assert controversy_array(likes, dislikes).tolist() == [compute_controversy(l, d) for l, d in grid.tolist()]
+
+
+def test_recompute_all_writes_only_changed_rows():
+    mongomock_motor = pytest.importorskip("mongomock_motor")
+    db = mongomock_motor.AsyncMongoMockClient()["scoring_test"]
+
+    async def run():
+        await db.persons.insert_many([
+            {"_id": 1, "likes": 3, "dislikes": 1, **score_fields(3, 1)},  # up to date
+            {"_id": 2, "likes": 3, "dislikes": 1, "score": 75},  # int score, missing controversy
+            {"_id": 3, "likes": 90, "dislikes": 10, "score": 90.0},  # unrounded legacy score
+            {"_id": 4, "score": 100.0},  # seed person without votes
+        ])
+        result = await recompute_all(db, batch_size=2)
+        docs = {d["_id"]: d for d in await db.persons.find({}).to_list(None)}
+        return result, docs
+
+    result, docs = asyncio.run(run())
+    assert result["persons"] == 4
+    assert result["changed"] == 3
+    assert docs[2]["controversy"] == 0.0
+    assert docs[3]["score"] == 100.0 and docs[3]["controversy"] == 0.1
+    assert docs[4]["score"] == 50.0
+
+
+def test_recompute_all_skips_persons_voted_on_meanwhile():
+    mongomock_motor = pytest.importorskip("mongomock_motor")
+    db = mongomock_motor.AsyncMongoMockClient()["scoring_race_test"]
+
+    async def run():
+        await db.persons.insert_many([
+            {"_id": 1, "likes": 3, "dislikes": 1, "score": 0.0},
+            {"_id": 2, "likes": 3, "dislikes": 1, "score": 0.0},
+        ])
+
+        async def vote_after_first_batch(done, total):
+            if done == 1:
+                # a vote writes new counts and their score between the read and the second batch
+                await db.persons.update_one({"_id": 2}, {"$set": {"likes": 4, **score_fields(4, 1)}})
+
+        result = await recompute_all(db, batch_size=1, progress=vote_after_first_batch)
+        return result, await db.persons.find_one({"_id": 2})
+
+    result, person = asyncio.run(run())
+    assert result["changed"] == 2 and result["updated"] == 1
+    assert person["score"] == score_fields(4, 1)["score"]
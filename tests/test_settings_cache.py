@@ -0,0 +1,60 @@
+import asyncio
+
+import pytest
+
+import settings_cache as settings_module
+from settings_cache import DEFAULT_SETTINGS, SettingsCache
+
+mongomock_motor = pytest.importorskip("mongomock_motor")
+
+
+def test_settings_reload_after_version_bump(monkeypatch):
+    db = mongomock_motor.AsyncMongoMockClient()["settings_cache_test"]
+    monkeypatch.setattr(settings_module, "SETTINGS_POLL_SECONDS", 0.01)
+    cache = SettingsCache()
+
+    async def run():
+        await db.app_settings.insert_one({"_id": "global", "version": 1, "booster_price": 1.49})
+        await cache.start(db)
+        loaded = (cache.version, cache.get("booster_price"), cache.maintenance_mode)
+        # written without a version bump: not picked up
+        await db.app_settings.update_one({"_id": "global"}, {"$set": {"maintenance_mode": True}})
+        await asyncio.sleep(0.05)
+        unbumped = cache.maintenance_mode
+        await db.app_settings.update_one({"_id": "global"}, {"$inc": {"version": 1}})
+        await asyncio.sleep(0.05)
+        cache.shutdown()
+        return loaded, unbumped, (cache.version, cache.maintenance_mode)
+
+    loaded, unbumped, reloaded = asyncio.run(run())
+    assert loaded == (1, 1.49, False)
+    assert unbumped is False
+    assert reloaded == (2, True)
+    assert cache.get("booster_votes") == DEFAULT_SETTINGS["booster_votes"]
+
+
+def request_statuses(server, asgi_client, calls):
+    async def run():
+        async with asgi_client(server.app) as client:
+            return [(await client.request(method, path, json={})).status_code for method, path in calls]
+    return asyncio.run(run())
+
+
+def test_maintenance_mode_refuses_public_api_calls(monkeypatch, server, asgi_client):
+    monkeypatch.setattr(server.settings_cache, "settings", {**DEFAULT_SETTINGS, "maintenance_mode": True})
+
+    public, root, admin = request_statuses(server, asgi_client, [
+        ("GET", "/api/people"), ("GET", "/api/"), ("GET", "/api/admin/stats"),
+    ])
+    assert public == 503
+    assert root == 200 and admin != 503
+
+
+def test_disabled_additions_refuse_only_the_adding_routes(monkeypatch, server, asgi_client):
+    monkeypatch.setattr(server.settings_cache, "settings", {**DEFAULT_SETTINGS, "allow_user_additions": False})
+
+    add, boost, add_slash, listing = request_statuses(server, asgi_client, [
+        ("POST", "/api/people"), ("POST", "/api/boost-myself"), ("POST", "/api/people/"), ("GET", "/api/people"),
+    ])
+    assert (add, boost, add_slash) == (403, 403, 403)
+    assert listing == 200
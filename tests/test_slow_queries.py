@@ -0,0 +1,45 @@
+import asyncio
+
+from slow_queries import SlowQueryLog, current_operation, plan_summary, query_shape
+
+
+def test_query_shape_normalizes_values():
+    a = query_shape("find", {"find": "persons", "filter": {"name": {"$regex": "taylor", "$options": "i"}},
+                             "sort": {"score": -1}, "limit": 10})
+    b = query_shape("find", {"find": "persons", "filter": {"name": {"$regex": "messi", "$options": "i"}},
+                             "sort": {"score": -1}, "limit": 20})
+    assert a == b == 'persons.find {"filter": {"name": {"$regex": "?", "$options": "?"}}, "sort": {"score": "?"}}'
+    assert query_shape("find", {"find": "persons", "filter": {"_id": {"$in": [1, 2, 3]}}}) == \
+        'persons.find {"filter": {"_id": {"$in": ["?"]}}}'
+
+
+def test_slow_commands_grouped_by_shape_with_origin(fake_event):
+    log = SlowQueryLog(threshold_ms=50)
+
+    def run(request_id, pattern, micros):
+        command = {"find": "persons", "filter": {"name": {"$regex": pattern}}}
+        log.started(fake_event(request_id, "find", command))
+        log.succeeded(fake_event(request_id, "find", reply={"cursor": {"firstBatch": [{}, {}]}},
+                                 duration_micros=micros))
+
+    async def scheduled():
+        current_operation.set("scheduler:daily_trends_refresh")
+        run(1, "a", 120_000)
+
+    asyncio.run(scheduled())
+    run(2, "b", 80_000)
+    run(3, "c", 10_000)  # under the threshold
+
+    [group] = log.report()
+    assert group["count"] == 2
+    assert group["max_ms"] == 120.0
+    assert group["avg_docs_returned"] == 2
+    assert group["origins"] == ["background", "scheduler:daily_trends_refresh"]
+    # a new slow shape is queued for one explain
+    assert list(log._to_explain) == [group["shape"]]
+
+
+def test_plan_summary_flags_collscan():
+    explain = {"winningPlan": {"stage": "SORT", "inputStage": {"stage": "COLLSCAN"}},
+               "rejectedPlans": [{"stage": "IXSCAN", "indexName": "x"}]}
+    assert plan_summary(explain) == {"stages": ["SORT", "COLLSCAN"], "indexes": [], "collscan": True}
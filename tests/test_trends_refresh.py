@@ -0,0 +1,21 @@
+import asyncio
+
+import pytest
+
+from trends_refresh import apply_trending_names
+
+mongomock_motor = pytest.importorskip("mongomock_motor")
+
+
+def test_new_person_chart_starts_from_its_stored_score():
+    db = mongomock_motor.AsyncMongoMockClient()["trends_refresh_test"]
+
+    async def run():
+        await apply_trending_names(db, ["Taylor Swift"])
+        person = await db.persons.find_one({"slug": "taylor-swift"})
+        tick = await db.person_ticks.find_one({"person_id": person["_id"]})
+        return person, tick
+
+    person, tick = asyncio.run(run())
+    assert person["is_trending"]
+    assert tick["score"] == person["score"]
@@ -0,0 +1,180 @@
+import asyncio
+import json
+import time
+from datetime import datetime, timedelta
+
+import pytest
+
+import trends_service as ts
+from name_classifier import NameClassifier
+from trends_service import GoogleTrendsService, StubTransport, merge_candidates, parse_regions
+
+
+TERMS = ["Taylor Swift", "weather today", "Lionel Messi", "iphone 16"]
+
+
+@pytest.fixture
+def make_service(tmp_path):
+    def make(transport, **kwargs):
+        return GoogleTrendsService(
+            transport=transport,
+            snapshot_path=tmp_path / "snapshot.json",
+            classifier=NameClassifier(tmp_path / "names.json"),
+            **kwargs,
+        )
+    return make
+
+
+def test_async_fetch_filters_personalities(make_service):
+    service = make_service(StubTransport(TERMS))
+    names = asyncio.run(service.get_trending_personalities_async(limit=20))
+    assert names == ["Taylor Swift", "Lionel Messi"]
+
+
+def test_event_loop_latency_stays_flat_during_refresh(make_service):
+    service = make_service(StubTransport(TERMS, delay=0.5))
+
+    async def probe_latency(stop):
+        worst = 0.0
+        while not stop.is_set():
+            start = time.perf_counter()
+            await asyncio.sleep(0.01)
+            worst = max(worst, time.perf_counter() - start - 0.01)
+        return worst
+
+    async def main():
+        stop = asyncio.Event()
+        probe = asyncio.create_task(probe_latency(stop))
+        names = await service.get_trending_personalities_async()
+        stop.set()
+        return names, await probe
+
+    names, worst_lag = asyncio.run(main())
+    assert names == ["Taylor Swift", "Lionel Messi"]
+    # A blocking call on the loop would stall the probe for the full 0.5s
+    assert worst_lag < 0.1
+
+
+def test_retries_with_backoff(make_service, monkeypatch):
+    monkeypatch.setattr(ts, "TRENDS_BACKOFF_SECONDS", 0.01)
+    transport = StubTransport(TERMS, fail_times=2)
+    service = make_service(transport)
+    names = asyncio.run(service.get_trending_personalities_async())
+    assert transport.calls == 3
+    assert names == ["Taylor Swift", "Lionel Messi"]
+
+
+def test_timeout_gives_up(make_service, monkeypatch):
+    monkeypatch.setattr(ts, "TRENDS_TIMEOUT_SECONDS", 0.05)
+    monkeypatch.setattr(ts, "TRENDS_MAX_ATTEMPTS", 2)
+    monkeypatch.setattr(ts, "TRENDS_BACKOFF_SECONDS", 0.01)
+    service = make_service(StubTransport(TERMS, delay=0.3))
+    assert asyncio.run(service.get_trending_personalities_async()) == []
+    service.shutdown()
+
+
+def test_shutdown_rejects_new_fetches(make_service):
+    service = make_service(StubTransport(TERMS))
+    service.shutdown()
+    assert asyncio.run(service.get_trending_personalities_async()) == []
+
+
+def test_parse_regions():
+    assert parse_regions("united_states:1.0, france:0.5,japan") == [
+        ("united_states", 1.0), ("france", 0.5), ("japan", 1.0)
+    ]
+
+
+def test_merge_candidates_dedupes_and_weights():
+    merged = merge_candidates(
+        {"us": ["Taylor Swift", "Lionel Messi"], "fr": ["lionel messi", "Kylian Mbappe"]},
+        {"us": 1.0, "fr": 0.8},
+    )
+    assert merged == ["Lionel Messi", "Taylor Swift", "Kylian Mbappe"]
+
+
+def test_regions_fetched_concurrently(make_service):
+    regions = [("us", 1.0), ("fr", 1.0), ("uk", 1.0)]
+    transport = StubTransport({"us": ["Taylor Swift"], "fr": ["Zinedine Zidane"], "uk": ["Harry Kane"]}, delay=0.3)
+    service = make_service(transport, regions=regions)
+    start = time.perf_counter()
+    names = asyncio.run(service.get_trending_personalities_async())
+    assert sorted(names) == ["Harry Kane", "Taylor Swift", "Zinedine Zidane"]
+    assert time.perf_counter() - start < 0.8
+
+
+def test_fresh_snapshot_is_reused(make_service):
+    transport = StubTransport(TERMS)
+    service = make_service(transport)
+    asyncio.run(service.get_trending_personalities_async())
+    names = asyncio.run(service.get_trending_personalities_async(max_age=timedelta(minutes=5)))
+    assert transport.calls == 1
+    assert names == ["Taylor Swift", "Lionel Messi"]
+
+
+def test_failure_falls_back_to_stale_snapshot(make_service, monkeypatch, tmp_path):
+    monkeypatch.setattr(ts, "TRENDS_MAX_ATTEMPTS", 1)
+    (tmp_path / "snapshot.json").write_text(json.dumps({
+        "fetched_at": (datetime.utcnow() - timedelta(days=2)).isoformat(),
+        "regions": ["united_states"],
+        "terms": ["Roger Federer", "storm warning"],
+    }))
+    service = make_service(StubTransport(TERMS, fail_times=10))
+    assert asyncio.run(service.get_trending_personalities_async()) == ["Roger Federer"]
+
+
+def test_empty_fetch_keeps_the_snapshot(make_service, tmp_path):
+    snapshot = tmp_path / "snapshot.json"
+    snapshot.write_text(json.dumps({
+        "fetched_at": (datetime.utcnow() - timedelta(days=2)).isoformat(),
+        "regions": ["united_states"],
+        "terms": ["Roger Federer", "storm warning"],
+    }))
+    service = make_service(StubTransport([]))
+    assert asyncio.run(service.get_trending_personalities_async()) == ["Roger Federer"]
+    assert json.loads(snapshot.read_text())["terms"] == ["Roger Federer", "storm warning"]
+
+
+def test_timed_out_call_is_not_retried_while_its_thread_runs(make_service, monkeypatch):
+    monkeypatch.setattr(ts, "TRENDS_TIMEOUT_SECONDS", 0.05)
+    monkeypatch.setattr(ts, "TRENDS_MAX_ATTEMPTS", 3)
+    monkeypatch.setattr(ts, "TRENDS_BACKOFF_SECONDS", 0.01)
+    transport = StubTransport(TERMS, delay=0.4)
+    service = make_service(transport)
+
+    async def main():
+        first = await service.get_trending_personalities_async()
+        # a refresh starting while the slow call still holds its thread doesn't add another
+        second = await service.get_trending_personalities_async()
+        calls_while_running = transport.calls
+        await asyncio.sleep(0.5)
+        transport.delay = 0
+        third = await service.get_trending_personalities_async()
+        return first, second, calls_while_running, third
+
+    first, second, calls_while_running, third = asyncio.run(main())
+    service.shutdown()
+    assert first == second == []
+    assert calls_while_running == 1
+    assert third == ["Taylor Swift", "Lionel Messi"]
+
+
+def test_pytrends_client_is_per_thread(monkeypatch):
+    import threading
+
+    monkeypatch.setattr(ts, "TrendReq", lambda **kwargs: object())
+    transport = ts.PytrendsTransport()
+    barrier = threading.Barrier(2)
+    clients = []
+
+    def use():
+        barrier.wait()  # both threads build their client at the same time
+        clients.append((transport.client, transport.client))
+
+    threads = [threading.Thread(target=use) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert all(first is again for first, again in clients)
+    assert clients[0][0] is not clients[1][0]